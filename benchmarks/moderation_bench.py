@@ -0,0 +1,265 @@
+"""
+Moderation throughput benchmark for Elysium Discord Bot.
+
+Feeds synthetic message corpora through the Moderation cog's matching path
+(blocked words, custom patterns and link checks) using stand-in message
+objects, so no Discord connection or config.json is needed. Corpora vary in
+message length, blocklist size and Unicode mix.
+
+Usage:
+    python benchmarks/moderation_bench.py                 # run and compare to the baseline
+    python benchmarks/moderation_bench.py --save-baseline # run and record a new baseline
+
+Raw throughput depends on the machine, so each scenario is also timed with
+a reference workload (a naive lower/split/set lookup scan of the same corpus)
+right after it in the same process, and the gate compares the median ratio
+of the two. The run
+exits with status 1 when a scenario's ratio drops below the baseline's by
+more than the tolerance, so it can gate changes to the matching logic on any
+hardware.
+"""
+import argparse
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+BOT_DIR = Path(__file__).resolve().parent.parent / "elysium-bot"
+sys.path.insert(0, str(BOT_DIR))
+
+from cogs.moderationcog import Moderation  # noqa: E402
+from link_filter import DomainList, DomainTrie  # noqa: E402
+from moderation_rules import GuildRules  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "moderation_baseline.json"
+
+MESSAGE_LENGTHS = {"short": 30, "medium": 300, "long": 2000}
+BLOCKLIST_SIZES = {"small": 10, "medium": 1_000, "large": 10_000}
+ALPHABETS = {
+    "ascii": "abcdefghijklmnopqrstuvwxyz",
+    "mixed": "abcdefghijklmnopqrstuvwxyzéèàüößçñ" + "😀🔥👍",
+    "cjk": "的一是不了人我在有他这中大来上国个到说们为子和",
+}
+CUSTOM_PATTERNS = [r"fr[e3]{2}\s*n[i1]tr[o0]", r"\b(?:buy|cheap)\s+followers\b"]
+# Share of messages that are exact repeats (spam) and that break a rule
+REPEAT_RATE = 0.1
+VIOLATION_RATE = 0.01
+# Timed passes per scenario, the median ratio to the reference counts
+REPEATS = 5
+
+
+def make_word(rng: random.Random, alphabet: str) -> str:
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(2, 9)))
+
+
+def make_corpus(
+    rng: random.Random, alphabet: str, length: int, block_words: List[str], count: int
+) -> List[str]:
+    """Build messages of roughly the given length from random words."""
+    # Keep ordinary words clear of the blocklist so the violation rate holds
+    blocked = set(block_words)
+    vocabulary = [w for w in (make_word(rng, alphabet) for _ in range(2000)) if w not in blocked]
+    extras = ["https://example.com/page", "https://discord.gg/abcdef", "free nitro"]
+    messages: List[str] = []
+    for _ in range(count):
+        if messages and rng.random() < REPEAT_RATE:
+            messages.append(rng.choice(messages))
+            continue
+        words: List[str] = []
+        size = 0
+        while size < length:
+            word = rng.choice(vocabulary)
+            words.append(word)
+            size += len(word) + 1
+        if rng.random() < VIOLATION_RATE:
+            words.insert(rng.randrange(len(words)), rng.choice(block_words))
+        if rng.random() < 0.05:
+            words.insert(rng.randrange(len(words)), rng.choice(extras))
+        messages.append(" ".join(words))
+    return messages
+
+
+def make_rules(rng: random.Random, alphabet: str, size: int) -> GuildRules:
+    block_words = list({make_word(rng, alphabet) for _ in range(size)})
+    return GuildRules(
+        0,
+        {
+            "block_words": block_words,
+            "custom_rules": [{"pattern": p, "enabled": True} for p in CUSTOM_PATTERNS],
+            "block_invites": True,
+            # Generous budgets so the benchmark never disables its own rules
+            "pattern_budget_ms": 1000,
+            "pattern_rule_budget_ms": 1000,
+        },
+    )
+
+
+_denylist: Optional[DomainList] = None
+
+
+def make_cog() -> Moderation:
+    """A cog with empty caches, sharing one large link denylist."""
+    global _denylist
+    if _denylist is None:
+        _denylist = DomainList("")
+        _denylist.trie = DomainTrie()
+        for i in range(100_000):
+            _denylist.trie.add(f"phish{i}.example.net")
+    cog = Moderation(SimpleNamespace(user=None))
+    cog.link_denylist = _denylist
+    return cog
+
+
+def check(cog: Moderation, msg: SimpleNamespace, rules: GuildRules):
+    """The synchronous matching path run for every message."""
+    return cog.find_violation(msg.content, rules) or cog.check_message_links(msg, rules)
+
+
+def reference_scan(messages: List[SimpleNamespace], block_words: set) -> int:
+    """The reference workload: a naive word and link scan of every message."""
+    flagged = 0
+    for msg in messages:
+        content = msg.content.lower()
+        if "://" in content or any(word in block_words for word in content.split()):
+            flagged += 1
+    return flagged
+
+
+def run_scenario(
+    alphabet: str, length: int, blocklist_size: int, count: int, seed: int
+) -> Dict[str, float]:
+    rng = random.Random(seed)
+    rules = make_rules(rng, alphabet, blocklist_size)
+    corpus = make_corpus(rng, alphabet, length, list(rules.block_words), count)
+    messages = [
+        SimpleNamespace(
+            id=i, content=content, raw_mentions=[], raw_role_mentions=[], mention_everyone=False
+        )
+        for i, content in enumerate(corpus)
+    ]
+
+    # Timed passes, each starting from cold caches like a freshly loaded cog
+    # and followed by a reference pass, so both see the same machine load;
+    # the latencies and count of the last pass are reported
+    block_words = set(rules.block_words)
+    elapsed = float("inf")
+    ratios = []
+    for _ in range(REPEATS):
+        cog = make_cog()
+        latencies = []
+        flagged = 0
+        started = time.perf_counter()
+        for msg in messages:
+            t0 = time.perf_counter_ns()
+            if check(cog, msg, rules):
+                flagged += 1
+            latencies.append(time.perf_counter_ns() - t0)
+        run_time = time.perf_counter() - started
+        elapsed = min(elapsed, run_time)
+
+        started = time.perf_counter()
+        reference_scan(messages, block_words)
+        ratios.append((time.perf_counter() - started) / run_time)
+
+    # Separate pass for allocations, tracemalloc would skew the timings
+    cog = make_cog()
+    tracemalloc.start()
+    for msg in messages:
+        check(cog, msg, rules)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "messages": count,
+        "flagged": flagged,
+        "msgs_per_sec": round(count / elapsed, 1),
+        # Throughput as a fraction of the reference workload's, comparable across machines
+        "relative": round(statistics.median(ratios), 4),
+        "p50_us": round(latencies[len(latencies) // 2] / 1000, 2),
+        "p99_us": round(latencies[int(len(latencies) * 0.99)] / 1000, 2),
+        "mean_us": round(statistics.fmean(latencies) / 1000, 2),
+        "alloc_peak_kib": round(peak / 1024, 1),
+        "alloc_retained_kib": round(retained / 1024, 1),
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """List the scenarios whose throughput relative to the reference workload regressed."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous or "relative" not in previous:
+            continue
+        floor = previous["relative"] * (1 - tolerance)
+        if result["relative"] < floor:
+            regressions.append(
+                f"{name}: {result['relative']:.3f}x reference vs baseline "
+                f"{previous['relative']:.3f}x"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=2000, help="messages per scenario")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed drop in throughput relative to the reference (0.2 = 20%%)",
+    )
+    args = parser.parse_args()
+
+    # Rule compilation and list loading log at INFO, keep the report readable
+    logging.basicConfig(level=logging.WARNING)
+
+    results: Dict[str, dict] = {}
+    print(
+        f"{'scenario':<24}{'msg/s':>12}{'vs ref':>8}{'p50 us':>10}{'p99 us':>10}"
+        f"{'peak KiB':>10}{'kept KiB':>10}"
+    )
+    for length_name, length in MESSAGE_LENGTHS.items():
+        for size_name, size in BLOCKLIST_SIZES.items():
+            for alphabet_name, alphabet in ALPHABETS.items():
+                name = f"{length_name}/{size_name}/{alphabet_name}"
+                result = run_scenario(alphabet, length, size, args.messages, args.seed)
+                results[name] = result
+                print(
+                    f"{name:<24}{result['msgs_per_sec']:>12}{result['relative']:>8.3f}"
+                    f"{result['p50_us']:>10}"
+                    f"{result['p99_us']:>10}{result['alloc_peak_kib']:>10}"
+                    f"{result['alloc_retained_kib']:>10}"
+                )
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=4) + "\n", encoding="utf-8")
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print("No baseline found, run with --save-baseline to record one")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("Regressions against the baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""
+On-disk cache of frequently played tracks for the music cog.
+
+Tracks that keep getting played are saved as Ogg Opus files in a cache
+directory, in the background while they play from the network. Later plays
+read the local file, so they start immediately and are not affected by
+upstream hiccups. The directory is kept under a byte budget by evicting the
+least recently played files. The processes of a cluster share the directory:
+each picks up files the others cached and skips the ones they evicted.
+"""
+import asyncio
+import logging
+import os
+import re
+import time
+from typing import Dict, Optional, Tuple
+
+from music_player import FFMPEG_PATH
+from utils import LRUCache
+
+logger = logging.getLogger(__name__)
+
+AUDIO_CACHE_MAX_MB = 1024
+# Plays needed before a track is worth a spot in the cache
+AUDIO_CACHE_MIN_PLAYS = 2
+# Long mixes would eat the budget on their own
+AUDIO_CACHE_MAX_DURATION = 15 * 60
+# Downloads running at once
+AUDIO_CACHE_FILL_WORKERS = 2
+# Tracks whose play counts are remembered while they are not cached yet
+PLAY_COUNT_SIZE = 10000
+
+_SUFFIX = ".opus"
+# Video IDs become file names, so only plain ones are cached
+_SAFE_ID = re.compile(r"[\w-]{1,64}")
+# Partial downloads are named "<id>.opus.<pid>.part" after the process writing them
+_PART = re.compile(r".+\.(\d+)\.part")
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists, but belongs to someone else
+        return True
+    return True
+
+
+class AudioCache:
+    """Byte-budgeted directory of cached tracks, evicted least recently used."""
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = AUDIO_CACHE_MAX_MB * 1024 * 1024,
+        min_plays: int = AUDIO_CACHE_MIN_PLAYS,
+    ):
+        """
+        Create the cache. Call load() to pick up files from earlier runs.
+
+        Args:
+            directory: Directory holding the cached files
+            max_bytes: Disk budget for the cached files
+            min_plays: Plays needed before a track is cached
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.min_plays = max(1, min_plays)
+        # Video ID -> (size in bytes, last played)
+        self.entries: Dict[str, Tuple[int, float]] = {}
+        self.total_bytes = 0
+        # Video ID -> plays so far, for tracks not cached yet
+        self.plays = LRUCache(PLAY_COUNT_SIZE)
+        self.filling: set = set()
+        self._fill_slots = asyncio.Semaphore(AUDIO_CACHE_FILL_WORKERS)
+
+    def path(self, video_id: str) -> str:
+        """Path of a track's cache file."""
+        return os.path.join(self.directory, video_id + _SUFFIX)
+
+    def load(self) -> int:
+        """
+        Index the files already in the cache directory. Meant to run in a thread.
+
+        Returns:
+            int: Number of cached tracks found
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        entries: Dict[str, Tuple[int, float]] = {}
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(".part"):
+                    part = _PART.fullmatch(entry.name)
+                    # Left over from an interrupted download, unless another process is writing it
+                    if not part or not _process_alive(int(part.group(1))):
+                        os.remove(entry.path)
+                elif entry.name.endswith(_SUFFIX) and entry.is_file():
+                    stat = entry.stat()
+                    entries[entry.name[: -len(_SUFFIX)]] = (stat.st_size, stat.st_mtime)
+        self.entries = entries
+        self.total_bytes = sum(size for size, _ in entries.values())
+        self._evict()
+        return len(self.entries)
+
+    def lookup(self, video_id: str) -> Optional[str]:
+        """
+        Get the local file for a track and mark it as just played.
+
+        Args:
+            video_id: YouTube video ID
+
+        Returns:
+            Optional[str]: Path to the cached file, or None on a miss
+        """
+        entry = self.entries.get(video_id)
+        path = self.path(video_id)
+        if entry is None:
+            # Another process of the cluster may have cached it
+            if video_id in self.filling or not _SAFE_ID.fullmatch(video_id):
+                return None
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                return None
+            entry = (size, 0.0)
+            self.total_bytes += size
+            self.plays.pop(video_id, None)
+        now = time.time()
+        self.entries[video_id] = (entry[0], now)
+        try:
+            # The file time carries the recency over to the next start
+            os.utime(path, (now, now))
+        except FileNotFoundError:
+            # Evicted by another process of the cluster
+            self.entries.pop(video_id, None)
+            self.total_bytes -= entry[0]
+            return None
+        except OSError:
+            pass
+        return path
+
+    def should_cache(self, video_id: str, duration: Optional[float]) -> bool:
+        """
+        Count a play of a track and decide whether to save it now.
+
+        Args:
+            video_id: YouTube video ID
+            duration: Track length in seconds, if known
+
+        Returns:
+            bool: True if the track should be downloaded into the cache
+        """
+        if video_id in self.entries or video_id in self.filling:
+            return False
+        if not _SAFE_ID.fullmatch(video_id):
+            return False
+        if not duration or duration > AUDIO_CACHE_MAX_DURATION:
+            return False
+        plays = self.plays.get(video_id, 0) + 1
+        self.plays.put(video_id, plays)
+        return plays >= self.min_plays
+
+    async def fill(self, video_id: str, stream: dict) -> None:
+        """
+        Download a track into the cache as Ogg Opus.
+
+        Args:
+            video_id: YouTube video ID
+            stream: Stream details with "url" and "acodec"
+        """
+        self.filling.add(video_id)
+        final_path = self.path(video_id)
+        part_path = f"{final_path}.{os.getpid()}.part"
+        # Opus is only remuxed, anything else is encoded once here instead of every play
+        if stream.get("acodec") == "opus":
+            codec = ["-c:a", "copy"]
+        else:
+            codec = ["-c:a", "libopus", "-b:a", "128k"]
+        process = None
+        try:
+            async with self._fill_slots:
+                process = await asyncio.create_subprocess_exec(
+                    str(FFMPEG_PATH),
+                    "-nostdin", "-loglevel", "error",
+                    "-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "5",
+                    "-i", stream["url"],
+                    "-vn", "-map_metadata", "-1", *codec, "-ar", "48000", "-ac", "2",
+                    "-f", "ogg", "-y", part_path,
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+                _, stderr = await process.communicate()
+            if process.returncode != 0:
+                raise RuntimeError(stderr.decode(errors="replace").strip()[:200])
+
+            os.replace(part_path, final_path)
+            size = os.path.getsize(final_path)
+            self.entries[video_id] = (size, time.time())
+            self.total_bytes += size
+            self.plays.pop(video_id, None)
+            self._evict()
+            logger.info(
+                f"Cached track {video_id} ({size // 1024} KiB, "
+                f"cache at {self.total_bytes // (1024 * 1024)} MiB)"
+            )
+        except asyncio.CancelledError:
+            if process and process.returncode is None:
+                process.kill()
+            raise
+        except Exception as e:
+            logger.warning(f"Could not cache track {video_id}: {e}")
+        finally:
+            self.filling.discard(video_id)
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+    def _evict(self) -> None:
+        """Remove the least recently played files until the cache fits its budget."""
+        while self.total_bytes > self.max_bytes and self.entries:
+            video_id = min(self.entries, key=lambda key: self.entries[key][1])
+            size, _ = self.entries.pop(video_id)
+            self.total_bytes -= size
+            try:
+                os.remove(self.path(video_id))
+            except FileNotFoundError:
+                pass
+            logger.debug(f"Evicted cached track {video_id}")
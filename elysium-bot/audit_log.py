@@ -0,0 +1,185 @@
+"""
+Moderation audit log for Elysium Discord Bot.
+
+Every moderation action is appended to a local SQLite database. Entries are
+buffered in memory and written in batches from a worker thread, so recording
+an action never blocks the event loop. The table is indexed by guild, user,
+rule and time, so per-user and per-rule questions only read the rows they
+are about.
+"""
+import asyncio
+import logging
+import time
+from typing import List, Optional, Tuple
+
+from sqlite_buffer import BufferedDatabase
+
+logger = logging.getLogger(__name__)
+
+# Buffered entries that trigger a flush without waiting for the timer
+AUDIT_BATCH_SIZE = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mod_actions (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    message_id INTEGER,
+    rule TEXT NOT NULL,
+    action TEXT NOT NULL,
+    reason TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_mod_actions_guild_ts ON mod_actions (guild_id, ts);
+CREATE INDEX IF NOT EXISTS ix_mod_actions_guild_user_ts ON mod_actions (guild_id, user_id, ts);
+CREATE INDEX IF NOT EXISTS ix_mod_actions_guild_rule_ts ON mod_actions (guild_id, rule, ts);
+"""
+
+_INSERT = (
+    "INSERT INTO mod_actions "
+    "(ts, guild_id, channel_id, user_id, message_id, rule, action, reason) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+class AuditLog(BufferedDatabase):
+    """Append-only store of moderation actions with buffered writes."""
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the audit database.
+
+        Args:
+            path: Path to the SQLite database file
+        """
+        super().__init__(path, _SCHEMA)
+
+    def record(
+        self,
+        guild_id: int,
+        channel_id: int,
+        user_id: int,
+        message_id: Optional[int],
+        rule: str,
+        action: str,
+        reason: str,
+    ) -> None:
+        """
+        Buffer a moderation action. Written to disk by the next flush().
+
+        Args:
+            guild_id: Guild the action happened in
+            channel_id: Channel of the offending message
+            user_id: Author of the offending message
+            message_id: Offending message, if any
+            rule: Rule that was hit, e.g. "word:spam" or "link:example.com"
+            action: Action taken (delete/alert/timeout)
+            reason: Reason shown to the moderators
+        """
+        self.queue(
+            _INSERT,
+            (int(time.time()), guild_id, channel_id, user_id, message_id, rule, action, reason),
+        )
+
+    @property
+    def needs_flush(self) -> bool:
+        """Check whether enough entries are buffered to write a batch now."""
+        return len(self.pending) >= AUDIT_BATCH_SIZE
+
+    async def count(
+        self,
+        guild_id: int,
+        since: int,
+        user_id: Optional[int] = None,
+        rule: Optional[str] = None,
+    ) -> int:
+        """
+        Count actions in a guild since a point in time.
+
+        Args:
+            guild_id: Guild to search
+            since: Unix timestamp to count from
+            user_id: Only count actions against this user
+            rule: Only count hits of this rule
+
+        Returns:
+            int: Number of matching actions
+        """
+        sql, params = self._filter(guild_id, since, user_id, rule)
+        rows = await asyncio.to_thread(
+            self._query, f"SELECT COUNT(*) FROM mod_actions {sql}", params
+        )
+        return rows[0][0]
+
+    async def top(
+        self,
+        column: str,
+        guild_id: int,
+        since: int,
+        user_id: Optional[int] = None,
+        rule: Optional[str] = None,
+        limit: int = 10,
+    ) -> List[Tuple[object, int]]:
+        """
+        Group matching actions by rule or user and count them.
+
+        Args:
+            column: "rule" or "user_id"
+            guild_id: Guild to search
+            since: Unix timestamp to count from
+            user_id: Only count actions against this user
+            rule: Only count hits of this rule
+            limit: Most groups to return
+
+        Returns:
+            list: (value, count) pairs, most frequent first
+        """
+        if column not in ("rule", "user_id"):
+            raise ValueError(f"Cannot group audit entries by {column}")
+        sql, params = self._filter(guild_id, since, user_id, rule)
+        return await asyncio.to_thread(
+            self._query,
+            f"SELECT {column}, COUNT(*) AS hits FROM mod_actions {sql} "
+            f"GROUP BY {column} ORDER BY hits DESC LIMIT ?",
+            params + (limit,),
+        )
+
+    async def recent(
+        self,
+        guild_id: int,
+        since: int,
+        user_id: Optional[int] = None,
+        rule: Optional[str] = None,
+        limit: int = 5,
+    ) -> List[tuple]:
+        """
+        Fetch the latest matching actions.
+
+        Returns:
+            list: (ts, channel_id, user_id, rule, action, reason) rows, newest first
+        """
+        sql, params = self._filter(guild_id, since, user_id, rule)
+        return await asyncio.to_thread(
+            self._query,
+            f"SELECT ts, channel_id, user_id, rule, action, reason FROM mod_actions {sql} "
+            f"ORDER BY ts DESC LIMIT ?",
+            params + (limit,),
+        )
+
+    @staticmethod
+    def _filter(
+        guild_id: int, since: int, user_id: Optional[int], rule: Optional[str]
+    ) -> Tuple[str, tuple]:
+        # Column order matches the indexes: guild, then user or rule, then time
+        clauses = ["guild_id = ?"]
+        params: list = [guild_id]
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if rule is not None:
+            clauses.append("rule = ?")
+            params.append(rule)
+        clauses.append("ts >= ?")
+        params.append(since)
+        return "WHERE " + " AND ".join(clauses), tuple(params)
@@ -0,0 +1,246 @@
+"""
+Cluster launcher for Elysium Discord Bot.
+
+Runs the bot as several worker processes, each connecting its own range of
+shards with an AutoShardedBot. Every process has its own event loop, caches
+and voice threads, so large bots use more than one CPU core. Crashed workers
+are restarted with a backoff, and stopping the launcher stops every worker.
+
+Usage:
+    python cluster.py [--shards N] [--processes P]
+"""
+import argparse
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+from requests import get
+from requests.exceptions import RequestException
+
+from sharding import (
+    CLUSTER_ID_ENV,
+    SHARD_COUNT_ENV,
+    SHARD_IDS_ENV,
+    format_shard_ids,
+    split_shards,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger("cluster")
+
+GATEWAY_URL = "https://discord.com/api/v10/gateway/bot"
+# HTTP request timeout in seconds
+REQUEST_TIMEOUT = 10
+# Discord allows one IDENTIFY per rate limit bucket every 5 seconds
+IDENTIFY_INTERVAL = 5
+# Restart backoff for crashed workers, doubled per crash in a row
+RESTART_DELAY = 5
+RESTART_DELAY_MAX = 300
+# A worker that ran this long is considered healthy again
+STABLE_AFTER = 600
+# Workers get this long to shut down before they are killed
+STOP_TIMEOUT = 30
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+def recommended_shards(token: str) -> Tuple[int, int]:
+    """
+    Ask Discord how many shards the bot should use.
+
+    Args:
+        token: Bot token
+
+    Returns:
+        tuple: (shard count, IDENTIFY requests allowed per 5 seconds)
+
+    Raises:
+        RequestException: If the request failed
+        ValueError: If the response was not understood
+    """
+    response = get(
+        GATEWAY_URL,
+        headers={"Authorization": f"Bot {token}"},
+        timeout=REQUEST_TIMEOUT,
+    )
+    response.raise_for_status()
+    data = response.json()
+    try:
+        shards = int(data["shards"])
+        max_concurrency = int(data.get("session_start_limit", {}).get("max_concurrency", 1))
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid gateway response: {data}") from e
+    return shards, max(1, max_concurrency)
+
+
+class Worker:
+    """One bot process and the shards it connects."""
+
+    def __init__(self, cluster_id: int, shard_ids: List[int], shard_count: int):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.process: Optional[subprocess.Popen] = None
+        self.started_at = 0.0
+        self.crashes = 0
+        # Monotonic time of the next restart, if the worker is waiting for one
+        self.restart_at: Optional[float] = None
+
+    def start(self) -> None:
+        """Start the worker's bot process."""
+        env = dict(os.environ)
+        env[SHARD_IDS_ENV] = format_shard_ids(self.shard_ids)
+        env[SHARD_COUNT_ENV] = str(self.shard_count)
+        env[CLUSTER_ID_ENV] = str(self.cluster_id)
+        # In its own session, so Ctrl+C in a terminal reaches the launcher only
+        # and the workers are stopped once, by stop()
+        self.process = subprocess.Popen(
+            [sys.executable, MAIN_SCRIPT],
+            cwd=os.path.dirname(MAIN_SCRIPT),
+            env=env,
+            start_new_session=True,
+        )
+        self.started_at = time.monotonic()
+        self.restart_at = None
+        logger.info(
+            f"Started cluster {self.cluster_id} (PID {self.process.pid}) with shard(s) "
+            f"{format_shard_ids(self.shard_ids)} of {self.shard_count}"
+        )
+
+    def check(self) -> None:
+        """Schedule a restart if the worker exited."""
+        if self.process is None or self.process.poll() is None:
+            return
+        code = self.process.returncode
+        self.process = None
+        if time.monotonic() - self.started_at >= STABLE_AFTER:
+            self.crashes = 0
+        delay = min(RESTART_DELAY_MAX, RESTART_DELAY * 2 ** self.crashes)
+        self.crashes += 1
+        self.restart_at = time.monotonic() + delay
+        logger.warning(
+            f"Cluster {self.cluster_id} exited with code {code}, restarting in {delay}s"
+        )
+
+    def stop(self) -> None:
+        """Ask the worker to shut down."""
+        self.restart_at = None
+        if self.process and self.process.poll() is None:
+            self.process.send_signal(signal.SIGINT)
+
+
+def run(workers: List[Worker], stagger: float) -> int:
+    """
+    Start the workers and keep them running until the launcher is stopped.
+
+    Args:
+        workers: Workers to run
+        stagger: Seconds per shard to wait between worker starts, so their
+            IDENTIFY requests stay within Discord's limit
+
+    Returns:
+        int: Exit code
+    """
+    stopping = False
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        if not stopping:
+            logger.info("Stopping cluster...")
+        stopping = True
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    for index, worker in enumerate(workers):
+        if stopping:
+            break
+        worker.start()
+        if index < len(workers) - 1:
+            deadline = time.monotonic() + stagger * len(worker.shard_ids)
+            while not stopping and time.monotonic() < deadline:
+                time.sleep(0.5)
+
+    while not stopping:
+        now = time.monotonic()
+        for worker in workers:
+            worker.check()
+            if worker.restart_at is not None and now >= worker.restart_at:
+                worker.start()
+        time.sleep(1)
+
+    for worker in workers:
+        worker.stop()
+    deadline = time.monotonic() + STOP_TIMEOUT
+    for worker in workers:
+        if worker.process is None:
+            continue
+        try:
+            worker.process.wait(timeout=max(0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            logger.warning(f"Cluster {worker.cluster_id} did not stop in time, killing it")
+            worker.process.kill()
+            worker.process.wait()
+    logger.info("Cluster stopped")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run Elysium as a multi-process cluster.")
+    parser.add_argument(
+        "--shards",
+        type=int,
+        help="total shard count (default: Discord's recommendation)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="worker processes to spread the shards over (default: CPU count)",
+    )
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    token = os.getenv("ELYSIUM_TOKEN") or ""
+    if not token:
+        logger.error("ELYSIUM_TOKEN not found in environment variables!")
+        return 1
+
+    max_concurrency = 1
+    shard_count = args.shards
+    try:
+        recommended, max_concurrency = recommended_shards(token)
+        logger.info(
+            f"Discord recommends {recommended} shard(s), "
+            f"{max_concurrency} IDENTIFY(s) per {IDENTIFY_INTERVAL}s"
+        )
+        shard_count = shard_count or recommended
+    except (RequestException, ValueError) as e:
+        if not shard_count:
+            logger.error(f"Could not get the recommended shard count: {e}")
+            return 1
+        logger.warning(f"Could not get the gateway limits, assuming one IDENTIFY at a time: {e}")
+
+    if shard_count < 1 or args.processes < 1:
+        logger.error("--shards and --processes must be at least 1")
+        return 1
+
+    ranges = split_shards(shard_count, args.processes)
+    workers = [
+        Worker(cluster_id, shard_ids, shard_count)
+        for cluster_id, shard_ids in enumerate(ranges)
+    ]
+    logger.info(f"Running {shard_count} shard(s) over {len(workers)} process(es)")
+    return run(workers, IDENTIFY_INTERVAL / max_concurrency)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,528 @@
 import datetime
 import asyncio
+import copy
+import hashlib
 import logging
-import re
-from typing import Optional
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 
-from config import get_moderation_config
-from utils import get_channel_safely
+from audit_log import AuditLog
+from config import (
+    get_data_path,
+    get_guild_moderation_config,
+    get_moderation_config,
+    update_config,
+)
+from image_hashing import ImageBlocklist, compute_hashes, pillow_available
+from link_filter import DomainList, check_links
+from moderation_rules import ACTIONS, GuildRules
+from safe_regex import PatternError, SafePattern
+from utils import LRUCache, get_channel_safely
 
 logger = logging.getLogger(__name__)
 
+# Gateway intents the cog needs, read by main.py for the low-memory mode
+REQUIRED_INTENTS = ("guild_messages", "message_content")
+
 allowed_mentions = discord.AllowedMentions(roles=True)
 
+# Discord bulk-deletes at most 100 messages per request, none older than 14 days
+BULK_DELETE_LIMIT = 100
+BULK_DELETE_MAX_AGE = datetime.timedelta(days=14)
+# How long flagged messages are collected before a channel's queue is flushed
+DELETE_FLUSH_DELAY = 1.5
+# Flagged messages listed in one alert embed, any beyond that are only counted
+ALERT_SUMMARY_LINES = 20
+
+# Attachment scanning defaults, overridable in the moderation config
+IMAGE_HASH_DISTANCE = 6
+IMAGE_MAX_BYTES = 8 * 1024 * 1024
+IMAGE_VERDICT_CACHE_SIZE = 4096
+# Recently checked messages and content remembered for edit re-scans
+MESSAGE_CACHE_SIZE = 10000
+# Compiled per-guild rule sets kept in memory
+RULES_CACHE_SIZE = 256
+# How often the link list files are checked for changes, in seconds
+LINK_LIST_CHECK_INTERVAL = 30
+# How often buffered audit log entries are written to disk, in seconds
+AUDIT_FLUSH_INTERVAL = 5
+AUDIT_LOG_FILE = "moderation_audit.db"
+
+# (rule, reason): the rule identifies what was hit for the audit log, e.g.
+# "word:spam"; the reason is what the moderators are shown
+Violation = Tuple[str, str]
+
+
+def message_fingerprint(content: str) -> bytes:
+    """Compute a compact fingerprint of message content."""
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()
+
 
 class Moderation(commands.Cog):
     """Moderation cog for handling message filtering and alerts."""
 
     def __init__(self, bot):
         self.bot = bot
+        # Flagged messages waiting to be bulk-deleted, keyed by channel ID
+        self.pending_deletes: Dict[int, List[discord.Message]] = {}
+        # Mod channel alerts sent as one summary per flush, keyed by channel ID
+        self.pending_alerts: Dict[int, List[Tuple[discord.TextChannel, str]]] = {}
+        self.flush_tasks: Dict[int, asyncio.Task] = {}
+        # Attachment scanning, set up in cog_load when a blocklist is configured
+        self.image_blocklist: Optional[ImageBlocklist] = None
+        self.image_pool: Optional[ProcessPoolExecutor] = None
+        # SHA-256 of attachment bytes -> matched label (or None if clean)
+        self.attachment_verdicts = LRUCache(IMAGE_VERDICT_CACHE_SIZE)
+        # Message ID -> fingerprint of the content it was last checked with
+        self.message_fingerprints = LRUCache(MESSAGE_CACHE_SIZE)
+        # (rules key, content fingerprint) -> blocked word found (or None if clean)
+        self.content_verdicts = LRUCache(MESSAGE_CACHE_SIZE)
+        # (guild ID, global version, guild version) -> compiled GuildRules
+        self.guild_rules = LRUCache(RULES_CACHE_SIZE)
+        # Link allow/deny lists, reloaded when their files change
+        self.link_allowlist: Optional[DomainList] = None
+        self.link_denylist: Optional[DomainList] = None
+        # Local record of every moderation action, queried by /modlog
+        self.audit_log: Optional[AuditLog] = None
+        # Config writes started from the message path, kept until they finish
+        self.config_writes: set = set()
+
+    async def cog_load(self):
+        """Load the blocklists and start the background workers."""
+        try:
+            config = get_moderation_config()
+            self.guild_rules.maxsize = max(
+                1, int(config.get("matcher_cache_size", RULES_CACHE_SIZE))
+            )
+        except Exception as e:
+            logger.error(f"Error loading moderation config: {e}")
+            return
+
+        await self.setup_audit_log(config)
+        await self.setup_link_lists(config)
+        await self.setup_image_scanning(config)
+
+    async def setup_audit_log(self, config: dict) -> None:
+        """Open the audit database and start the periodic flush."""
+        try:
+            path = get_data_path(config.get("audit_log") or AUDIT_LOG_FILE)
+            self.audit_log = await asyncio.to_thread(AuditLog, path)
+            if not self.flush_audit_log.is_running():
+                self.flush_audit_log.start()
+            logger.info(f"Moderation audit log opened at {path}")
+        except Exception as e:
+            logger.error(f"Error opening moderation audit log: {e}", exc_info=True)
+
+    async def write_audit_log(self) -> None:
+        """Write buffered audit entries to disk."""
+        if not self.audit_log:
+            return
+        try:
+            await self.audit_log.flush()
+        except Exception as e:
+            logger.error(f"Error writing moderation audit log: {e}")
+
+    @tasks.loop(seconds=AUDIT_FLUSH_INTERVAL)
+    async def flush_audit_log(self):
+        """Periodically write buffered audit entries in one batch."""
+        await self.write_audit_log()
+
+    async def setup_link_lists(self, config: dict) -> None:
+        """Load the link allow/deny lists and start watching them for changes."""
+        if config.get("link_allowlist"):
+            self.link_allowlist = DomainList(get_data_path(config["link_allowlist"]))
+        if config.get("link_denylist"):
+            self.link_denylist = DomainList(get_data_path(config["link_denylist"]))
+
+        if self.link_allowlist or self.link_denylist:
+            await self.reload_link_lists()
+            if not self.check_link_lists.is_running():
+                self.check_link_lists.start()
+
+    async def reload_link_lists(self) -> None:
+        """Reload any link list whose file changed on disk."""
+        for domain_list in (self.link_allowlist, self.link_denylist):
+            if domain_list and domain_list.needs_reload():
+                try:
+                    count = await asyncio.to_thread(domain_list.reload)
+                    logger.info(f"Loaded {count} domain(s) from {domain_list.path}")
+                except Exception as e:
+                    logger.error(f"Error loading domain list {domain_list.path}: {e}")
+
+    @tasks.loop(seconds=LINK_LIST_CHECK_INTERVAL)
+    async def check_link_lists(self):
+        """Periodically pick up edits to the link list files."""
+        await self.reload_link_lists()
+
+    async def setup_image_scanning(self, config: dict) -> None:
+        """Load the image blocklist and start the hashing process pool."""
+        try:
+            blocklist_file = config.get("image_blocklist")
+            if not blocklist_file:
+                return
+            if not pillow_available():
+                logger.warning(
+                    "image_blocklist is configured but Pillow is not installed - "
+                    "attachment scanning disabled"
+                )
+                return
+
+            path = get_data_path(blocklist_file)
+            self.image_blocklist = await asyncio.to_thread(ImageBlocklist.from_file, path)
+            workers = int(config.get("image_workers", min(2, os.cpu_count() or 1)))
+            # Spawn rather than fork, the parent is running an event loop and threads
+            self.image_pool = ProcessPoolExecutor(
+                max_workers=max(1, workers),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(
+                f"Loaded {len(self.image_blocklist)} blocked image hash(es) from {path}"
+            )
+        except FileNotFoundError as e:
+            logger.error(f"Image blocklist not found: {e}")
+        except Exception as e:
+            logger.error(f"Error setting up attachment scanning: {e}", exc_info=True)
+
+    async def cog_unload(self):
+        """Stop background work and flush any queued deletions."""
+        if self.check_link_lists.is_running():
+            self.check_link_lists.cancel()
+        if self.image_pool:
+            self.image_pool.shutdown(wait=False, cancel_futures=True)
+            self.image_pool = None
+        for task in self.flush_tasks.values():
+            task.cancel()
+        self.flush_tasks.clear()
+        for channel_id in set(self.pending_deletes) | set(self.pending_alerts):
+            channel = self.bot.get_channel(channel_id)
+            if channel:
+                await self.flush_deletes(channel)
+        if self.flush_audit_log.is_running():
+            self.flush_audit_log.cancel()
+        if self.audit_log:
+            await self.write_audit_log()
+            self.audit_log.close()
+            self.audit_log = None
+        self.pending_deletes.clear()
+        self.pending_alerts.clear()
+
+    def schedule_flush(self, channel: discord.TextChannel, now: bool = False) -> None:
+        """Start the channel's flush timer, or flush right away if now is set."""
+        if now:
+            task = self.flush_tasks.pop(channel.id, None)
+            if task:
+                task.cancel()
+            self.flush_tasks[channel.id] = asyncio.create_task(self.flush_deletes(channel))
+        elif channel.id not in self.flush_tasks:
+            self.flush_tasks[channel.id] = asyncio.create_task(
+                self.flush_deletes_later(channel)
+            )
+
+    def queue_delete(self, msg: discord.Message) -> None:
+        """Queue a flagged message for the next bulk delete in its channel."""
+        pending = self.pending_deletes.setdefault(msg.channel.id, [])
+        pending.append(msg)
+        # A full batch is ready, no point in waiting for the timer
+        self.schedule_flush(msg.channel, now=len(pending) >= BULK_DELETE_LIMIT)
+
+    def queue_alert(
+        self, msg: discord.Message, mod_channel: discord.TextChannel, line: str
+    ) -> None:
+        """Queue a mod channel alert line for the next flush of the message's channel."""
+        self.pending_alerts.setdefault(msg.channel.id, []).append((mod_channel, line))
+        self.schedule_flush(msg.channel)
+
+    async def flush_deletes_later(self, channel: discord.TextChannel) -> None:
+        """Wait for more flagged messages to arrive, then flush the channel."""
+        await asyncio.sleep(DELETE_FLUSH_DELAY)
+        await self.flush_deletes(channel)
+
+    async def flush_deletes(self, channel: discord.TextChannel) -> None:
+        """Delete every queued message in a channel, then send its queued alerts."""
+        self.flush_tasks.pop(channel.id, None)
+        messages = self.pending_deletes.pop(channel.id, [])
+        alerts = self.pending_alerts.pop(channel.id, [])
+        if messages:
+            await self.delete_messages(channel, messages)
+        if alerts:
+            await self.send_alerts(channel, alerts)
+
+    async def delete_messages(
+        self, channel: discord.TextChannel, messages: List[discord.Message]
+    ) -> None:
+        """Delete messages from one channel using bulk delete where possible."""
+        # Messages older than 14 days are rejected by bulk delete
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - BULK_DELETE_MAX_AGE
+        recent = [m for m in messages if m.created_at > cutoff]
+        stale = [m for m in messages if m.created_at <= cutoff]
+
+        for i in range(0, len(recent), BULK_DELETE_LIMIT):
+            batch = recent[i : i + BULK_DELETE_LIMIT]
+            try:
+                await channel.delete_messages(batch, reason="Blocked content")
+                logger.debug(f"Bulk deleted {len(batch)} message(s) in {channel}")
+            except discord.Forbidden:
+                logger.warning(f"No permission to delete messages in {channel}")
+                return
+            except discord.NotFound:
+                logger.debug("Message already deleted")
+            except discord.HTTPException as e:
+                logger.error(f"Error bulk deleting messages in {channel}: {e}")
+
+        for msg in stale:
+            try:
+                await msg.delete()
+            except discord.NotFound:
+                logger.debug("Message already deleted")
+            except Exception as e:
+                logger.error(f"Error deleting message: {e}")
+
+    async def send_alerts(
+        self, channel: discord.TextChannel, alerts: List[Tuple[discord.TextChannel, str]]
+    ) -> None:
+        """Send one summary embed per mod channel for a channel's flagged messages."""
+        by_mod_channel: Dict[discord.TextChannel, List[str]] = {}
+        for mod_channel, line in alerts:
+            by_mod_channel.setdefault(mod_channel, []).append(line)
+
+        mod_role = self.get_rules(channel.guild.id).mod_role
+        for mod_channel, lines in by_mod_channel.items():
+            description = f"In: {channel.mention}\n"
+            if len(lines) == 1:
+                description += f"Reason: {lines[0]}\n"
+            else:
+                description += f"Flagged {len(lines)} messages:\n"
+                description += "\n".join(f"- {line}" for line in lines[:ALERT_SUMMARY_LINES])
+                if len(lines) > ALERT_SUMMARY_LINES:
+                    description += (
+                        f"\n...and {len(lines) - ALERT_SUMMARY_LINES} more, see /modlog"
+                    )
+                description += "\n"
+            if mod_role:
+                description += f"<@&{mod_role}>"
+            embed = discord.Embed(
+                title="**ALERT!**",
+                description=description,
+                color=0x5A0C8A,
+                timestamp=datetime.datetime.now(datetime.timezone.utc),
+            )
+            try:
+                await mod_channel.send(embed=embed)
+            except Exception as e:
+                logger.error(f"Error sending alert to mod channel: {e}")
+
+    def get_rules(self, guild_id: int) -> GuildRules:
+        """Get the compiled moderation rules for a guild."""
+        moderation = get_moderation_config()
+        overrides = moderation.get("guilds", {}).get(str(guild_id), {})
+        key = (guild_id, moderation.get("version", 0), overrides.get("version", 0))
+
+        rules = self.guild_rules.get(key)
+        if rules is None:
+            rules = GuildRules(guild_id, get_guild_moderation_config(guild_id))
+            self.guild_rules.put(key, rules)
+            logger.debug(f"Compiled moderation rules for guild {guild_id}: {key}")
+        return rules
+
+    def get_mod_channel(self, rules: GuildRules) -> Optional[discord.TextChannel]:
+        """Look up the moderation channel for a guild's rules."""
+        if not rules.mod_channel:
+            logger.warning(f"Moderation channel not configured for guild {rules.guild_id}")
+            return None
+
+        channel = get_channel_safely(self.bot, int(rules.mod_channel))
+        if not channel:
+            logger.warning(f"Moderation channel {rules.mod_channel} not found")
+        return channel
+
+    async def moderate_message(
+        self, msg: discord.Message, rules: GuildRules, scan_attachments: bool
+    ) -> bool:
+        """
+        Check a message against a guild's rules and flag it if needed.
+
+        Returns:
+            bool: True if the message was flagged
+        """
+        self.message_fingerprints.put(msg.id, message_fingerprint(msg.content))
+
+        role_ids = [role.id for role in getattr(msg.author, "roles", [])]
+        if rules.is_exempt(msg.channel.id, role_ids):
+            return False
+
+        violation = self.find_violation(msg.content, rules)
+        if not violation:
+            violation = self.check_message_links(msg, rules)
+        if not violation and scan_attachments and msg.attachments:
+            violation = await self.scan_attachments(msg)
+        if not violation:
+            return False
+
+        channel = self.get_mod_channel(rules)
+        if not channel:
+            return False
+
+        await self.flag_message(msg, channel, violation, rules)
+        return True
+
+    def check_message_links(
+        self, msg: discord.Message, rules: GuildRules
+    ) -> Optional[Violation]:
+        """
+        Check a message for blocked links, invites and mass mentions.
+
+        Returns:
+            Optional[Violation]: (rule, reason) for flagging the message, or None
+        """
+        if rules.max_mentions:
+            mentions = len(set(msg.raw_mentions)) + len(set(msg.raw_role_mentions))
+            if msg.mention_everyone:
+                mentions += 1
+            if mentions >= rules.max_mentions:
+                return "mass_mention", f"mass mention ({mentions} mentions)"
+
+        if not rules.filter_links:
+            return None
+        return check_links(
+            msg.content,
+            self.link_allowlist.trie if self.link_allowlist else None,
+            self.link_denylist.trie if self.link_denylist else None,
+            rules.block_invites,
+        )
+
+    def find_violation(self, content: str, rules: GuildRules) -> Optional[Violation]:
+        """
+        Find a blocked word or custom pattern in a message.
+
+        Verdicts are cached by content fingerprint, so repeated content (spam,
+        or edits that revert to earlier text) is only matched once per rule set.
+
+        Returns:
+            Optional[Violation]: (rule, reason) for flagging the message, or None
+        """
+        if not rules.block_words and not rules.patterns:
+            return None
+
+        key = (rules.guild_id, rules.version, message_fingerprint(content))
+        if key in self.content_verdicts:
+            return self.content_verdicts.get(key)
+
+        word = rules.find_blocked_word(content)
+        verdict = (f"word:{word}", word) if word else None
+        complete = True
+        if verdict is None and rules.patterns:
+            pattern, over_budget, complete = rules.find_pattern_match(content)
+            if pattern:
+                verdict = (f"pattern:{pattern}", f"pattern {pattern}")
+            if over_budget:
+                logger.warning(
+                    f"Custom rule(s) {over_budget} in guild {rules.guild_id} ran past "
+                    f"their time budget and will be disabled"
+                )
+                self.disable_custom_rules(rules.guild_id, over_budget)
+
+        # A scan cut short by the time budget is not a verdict worth keeping
+        if complete:
+            self.content_verdicts.put(key, verdict)
+        return verdict
+
+    def disable_custom_rules(self, guild_id: int, patterns: List[str]) -> None:
+        """Disable custom rules in the background, without blocking the message path."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Called outside the bot, e.g. from the benchmark
+            disable_custom_rules(guild_id, patterns)
+            return
+        task = loop.create_task(asyncio.to_thread(disable_custom_rules, guild_id, patterns))
+        self.config_writes.add(task)
+        task.add_done_callback(self.config_writes.discard)
+
+    async def scan_attachments(self, msg: discord.Message) -> Optional[Violation]:
+        """
+        Check image attachments against the image blocklist.
+
+        Returns:
+            Optional[Violation]: (rule, reason) for flagging the message, or None if clean
+        """
+        if not self.image_blocklist or not self.image_pool:
+            return None
+
+        config = get_moderation_config()
+        max_distance = int(config.get("image_hash_distance", IMAGE_HASH_DISTANCE))
+        max_bytes = int(config.get("image_max_bytes", IMAGE_MAX_BYTES))
+        loop = asyncio.get_running_loop()
+
+        for attachment in msg.attachments:
+            content_type = attachment.content_type or ""
+            if not content_type.startswith("image/") or attachment.size > max_bytes:
+                continue
+
+            try:
+                data = await attachment.read()
+            except discord.HTTPException as e:
+                logger.warning(f"Could not download attachment {attachment.id}: {e}")
+                continue
+
+            # Reposts of the same file are never decoded twice
+            digest = hashlib.sha256(data).digest()
+            if digest in self.attachment_verdicts:
+                verdict = self.attachment_verdicts.get(digest)
+            else:
+                try:
+                    hashes = await loop.run_in_executor(
+                        self.image_pool, compute_hashes, data
+                    )
+                    verdict = self.image_blocklist.match(hashes, max_distance)
+                except Exception as e:
+                    logger.debug(f"Could not hash attachment {attachment.filename}: {e}")
+                    verdict = None
+                self.attachment_verdicts.put(digest, verdict)
+
+            if verdict:
+                return f"image:{verdict}", f"{attachment.filename} ({verdict})"
+        return None
+
+    async def flag_message(
+        self,
+        msg: discord.Message,
+        channel: discord.TextChannel,
+        violation: Violation,
+        rules: GuildRules,
+    ) -> None:
+        """Apply the guild's moderation action, record it and alert the moderators."""
+        rule, reason = violation
+        if rules.action in ("delete", "timeout"):
+            self.queue_delete(msg)
+
+        if rules.action == "timeout" and isinstance(msg.author, discord.Member):
+            try:
+                await msg.author.timeout(
+                    datetime.timedelta(minutes=rules.timeout_minutes),
+                    reason=f"Blocked content: {reason}",
+                )
+            except discord.Forbidden:
+                logger.warning(f"No permission to time out {msg.author} in {msg.guild}")
+            except Exception as e:
+                logger.error(f"Error timing out {msg.author}: {e}")
+
+        if self.audit_log:
+            self.audit_log.record(
+                msg.guild.id, msg.channel.id, msg.author.id, msg.id, rule, rules.action, reason
+            )
+            # Raids can flag faster than the timer flushes, write those in batches too
+            if self.audit_log.needs_flush:
+                await self.write_audit_log()
+
+        # Sent with the channel's next flush, so a raid gets one summary, not an embed each
+        self.queue_alert(msg, channel, f"{msg.author} said -> ||{reason}|| ({rules.action})")
 
     @commands.Cog.listener()
     async def on_message(self, msg: discord.Message) -> None:
@@ -32,55 +534,8 @@ class Moderation(commands.Cog):
             return
 
         try:
-            config = get_moderation_config()
-            mod_channel_id = config.get("mod_channel")
-            block_list = config.get("block_words", [])
-            mod_role = config.get("mod_role")
-
-            if not mod_channel_id:
-                logger.warning("Moderation channel not configured")
-                return
-
-            channel = get_channel_safely(self.bot, int(mod_channel_id))
-            if not channel:
-                logger.warning(f"Moderation channel {mod_channel_id} not found")
-                return
-
-            # Check for blocked words
-            if block_list:
-                msg_lower = msg.content.lower()
-                for text in block_list:
-                    # Use word boundaries to prevent false positives
-                    pattern = r"\b" + re.escape(text.lower()) + r"\b"
-                    if re.search(pattern, msg_lower):
-                        embed = discord.Embed(
-                            title="**ALERT!**",
-                            description=(
-                                f"In: {msg.channel.mention}\n"
-                                f"Reason: {msg.author} said -> ||{text}||\n"
-                                f"<@&{mod_role}>"
-                                if mod_role
-                                else ""
-                            ),
-                            color=0x5A0C8A,
-                            timestamp=datetime.datetime.now(datetime.timezone.utc),
-                        )
-                        try:
-                            await msg.delete()
-                        except discord.Forbidden:
-                            logger.warning(
-                                f"No permission to delete message in {msg.channel}"
-                            )
-                        except discord.NotFound:
-                            logger.debug("Message already deleted")
-                        except Exception as e:
-                            logger.error(f"Error deleting message: {e}")
-
-                        try:
-                            await channel.send(embed=embed)
-                        except Exception as e:
-                            logger.error(f"Error sending alert to mod channel: {e}")
-                        break  # Only flag once per message
+            rules = self.get_rules(msg.guild.id)
+            await self.moderate_message(msg, rules, scan_attachments=True)
 
             # Handle bot mentions
             if self.bot.user in msg.mentions:
@@ -103,6 +558,32 @@ class Moderation(commands.Cog):
         except Exception as e:
             logger.error(f"Error in on_message handler: {e}", exc_info=True)
 
+    @commands.Cog.listener()
+    async def on_message_edit(
+        self, before: discord.Message, after: discord.Message
+    ) -> None:
+        """Re-run moderation when a message's content is edited."""
+        if after.author == self.bot.user:
+            return
+
+        if not isinstance(after.channel, discord.TextChannel):
+            return
+
+        # Embed unfurls and pins also fire edits without touching the content
+        if before.content == after.content:
+            return
+
+        fingerprint = message_fingerprint(after.content)
+        if self.message_fingerprints.get(after.id) == fingerprint:
+            return
+
+        try:
+            rules = self.get_rules(after.guild.id)
+            # Attachments cannot be added by an edit, so only the text is re-checked
+            await self.moderate_message(after, rules, scan_attachments=False)
+        except Exception as e:
+            logger.error(f"Error in on_message_edit handler: {e}", exc_info=True)
+
     @app_commands.command(name="alert", description="Report an Issue")
     @app_commands.describe(issue="What is the issue?")
     async def alert(self, interaction: discord.Interaction, issue: str) -> None:
@@ -112,7 +593,11 @@ class Moderation(commands.Cog):
             f"in {interaction.guild.name if interaction.guild else 'DM'}: {issue[:100]}"
         )
         try:
-            config = get_moderation_config()
+            config = (
+                get_guild_moderation_config(interaction.guild.id)
+                if interaction.guild
+                else get_moderation_config()
+            )
             mod_channel_id = config.get("mod_channel")
             mod_role = config.get("mod_role")
 
@@ -165,6 +650,288 @@ class Moderation(commands.Cog):
                     "An error occurred while sending your report.", ephemeral=True
                 )
 
+    @app_commands.command(
+        name="purge", description="Bulk delete messages in this channel"
+    )
+    @app_commands.describe(
+        limit="How many recent messages to search through",
+        user="Only delete messages from this user",
+        pattern="Only delete messages containing this text",
+        minutes="Only delete messages sent in the last N minutes",
+    )
+    @app_commands.default_permissions(manage_messages=True)
+    async def purge(
+        self,
+        interaction: discord.Interaction,
+        limit: app_commands.Range[int, 1, 1000] = 100,
+        user: Optional[discord.User] = None,
+        pattern: Optional[str] = None,
+        minutes: Optional[app_commands.Range[int, 1, 20160]] = None,
+    ) -> None:
+        """Bulk delete messages matching the given filters."""
+        if (
+            not isinstance(interaction.channel, discord.TextChannel)
+            or not isinstance(interaction.user, discord.Member)
+            or not interaction.channel.permissions_for(
+                interaction.user
+            ).manage_messages
+        ):
+            logger.warning(
+                f"Unauthorized /purge attempt by {interaction.user} (ID: {interaction.user.id}) "
+                f"in {interaction.guild.name if interaction.guild else 'DM'}"
+            )
+            await interaction.response.send_message(
+                "❌ You don't have permission to use this command.", ephemeral=True
+            )
+            return
+
+        logger.info(
+            f"Command /purge used by {interaction.user} (ID: {interaction.user.id}) "
+            f"in {interaction.guild.name if interaction.guild else 'DM'} - "
+            f"Limit: {limit}, User: {user.id if user else 'any'}, "
+            f"Pattern: {pattern[:50] if pattern else 'N/A'}, Minutes: {minutes or 'N/A'}"
+        )
+
+        pattern_lower = pattern.lower() if pattern else None
+
+        def check(msg: discord.Message) -> bool:
+            if user and msg.author.id != user.id:
+                return False
+            if pattern_lower and pattern_lower not in msg.content.lower():
+                return False
+            return True
+
+        # Bulk delete cannot reach further back than 14 days anyway
+        now = datetime.datetime.now(datetime.timezone.utc)
+        window = (
+            datetime.timedelta(minutes=minutes) if minutes else BULK_DELETE_MAX_AGE
+        )
+        after = now - min(window, BULK_DELETE_MAX_AGE)
+
+        try:
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            deleted = await interaction.channel.purge(
+                limit=limit,
+                check=check,
+                after=after,
+                # Setting after= would otherwise make discord.py walk oldest first
+                oldest_first=False,
+                bulk=True,
+                reason=f"/purge by {interaction.user}",
+            )
+            await interaction.followup.send(
+                f"🧹 Deleted {len(deleted)} message(s).", ephemeral=True
+            )
+            logger.info(
+                f"Purge by {interaction.user.id} deleted {len(deleted)} message(s) "
+                f"in {interaction.channel}"
+            )
+        except discord.Forbidden:
+            logger.warning(f"No permission to purge messages in {interaction.channel}")
+            await interaction.followup.send(
+                "❌ I don't have permission to delete messages here.", ephemeral=True
+            )
+        except Exception as e:
+            logger.error(
+                f"Error in purge command for user {interaction.user.id}: {e}",
+                exc_info=True,
+            )
+            if not interaction.response.is_done():
+                await interaction.response.send_message(
+                    "An error occurred while purging messages.", ephemeral=True
+                )
+            else:
+                await interaction.followup.send(
+                    "An error occurred while purging messages.", ephemeral=True
+                )
+
+    @app_commands.command(
+        name="modrules", description="View or edit this server's moderation rules"
+    )
+    @app_commands.describe(
+        action=(
+            "show, add_word, remove_word, add_pattern, remove_pattern, enable_pattern, "
+            "exempt_role, unexempt_role, exempt_channel, unexempt_channel, "
+            "set_action, set_mod_channel or set_mod_role"
+        ),
+        value="Word, pattern, role/channel mention or ID, or action (delete/alert/timeout)",
+    )
+    @app_commands.default_permissions(manage_guild=True)
+    async def modrules(
+        self,
+        interaction: discord.Interaction,
+        action: str,
+        value: Optional[str] = None,
+    ) -> None:
+        """View or edit the moderation rules for this server."""
+        if (
+            not interaction.guild
+            or not isinstance(interaction.user, discord.Member)
+            or not interaction.user.guild_permissions.manage_guild
+        ):
+            logger.warning(
+                f"Unauthorized /modrules attempt by {interaction.user} (ID: {interaction.user.id}) "
+                f"in {interaction.guild.name if interaction.guild else 'DM'} - Action: {action}"
+            )
+            await interaction.response.send_message(
+                "❌ You don't have permission to use this command.", ephemeral=True
+            )
+            return
+
+        logger.info(
+            f"Command /modrules used by {interaction.user} (ID: {interaction.user.id}) "
+            f"in {interaction.guild.name} - Action: {action}, Value: {value or 'N/A'}"
+        )
+        action_lower = action.lower()
+
+        try:
+            if action_lower == "show":
+                rules = self.get_rules(interaction.guild.id)
+                embed = discord.Embed(
+                    title="Moderation Rules",
+                    description=f"Action: **{rules.action}**",
+                    color=0x5A0C8A,
+                )
+                words = ", ".join(f"||{w}||" for w in rules.block_words.values())
+                embed.add_field(
+                    name="Blocked Words", value=words[:1024] or "None", inline=False
+                )
+                patterns = "\n".join(
+                    f"{'✅' if rule.get('enabled', True) else '⛔'} `{rule.get('pattern')}`"
+                    for rule in get_guild_moderation_config(interaction.guild.id).get(
+                        "custom_rules", []
+                    )
+                )
+                embed.add_field(
+                    name="Custom Patterns", value=patterns[:1024] or "None", inline=False
+                )
+                embed.add_field(
+                    name="Exempt Roles",
+                    value=", ".join(f"<@&{r}>" for r in rules.exempt_roles) or "None",
+                    inline=False,
+                )
+                embed.add_field(
+                    name="Exempt Channels",
+                    value=", ".join(f"<#{c}>" for c in rules.exempt_channels) or "None",
+                    inline=False,
+                )
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+            else:
+                response = await asyncio.to_thread(
+                    update_guild_rules, interaction.guild.id, action_lower, value
+                )
+                await interaction.response.send_message(response, ephemeral=True)
+                logger.info(
+                    f"Modrules {action_lower} completed by {interaction.user.id} "
+                    f"in guild {interaction.guild.id}"
+                )
+        except Exception as e:
+            logger.error(
+                f"Error in modrules command for user {interaction.user.id}: {e}",
+                exc_info=True,
+            )
+            if not interaction.response.is_done():
+                await interaction.response.send_message(
+                    "❌ An error occurred while updating the rules.", ephemeral=True
+                )
+
+    @app_commands.command(
+        name="modlog", description="Look up moderation history for a user or rule"
+    )
+    @app_commands.describe(
+        user="Only show actions against this user",
+        rule='Only show hits of this rule, e.g. "word:spam", "link:example.com" or "invite"',
+        days="How many days back to look",
+    )
+    @app_commands.default_permissions(manage_messages=True)
+    async def modlog(
+        self,
+        interaction: discord.Interaction,
+        user: Optional[discord.User] = None,
+        rule: Optional[str] = None,
+        days: app_commands.Range[int, 1, 365] = 7,
+    ) -> None:
+        """Summarize moderation actions from the audit log."""
+        if (
+            not interaction.guild
+            or not isinstance(interaction.user, discord.Member)
+            or not interaction.user.guild_permissions.manage_messages
+        ):
+            logger.warning(
+                f"Unauthorized /modlog attempt by {interaction.user} (ID: {interaction.user.id}) "
+                f"in {interaction.guild.name if interaction.guild else 'DM'}"
+            )
+            await interaction.response.send_message(
+                "❌ You don't have permission to use this command.", ephemeral=True
+            )
+            return
+
+        logger.info(
+            f"Command /modlog used by {interaction.user} (ID: {interaction.user.id}) "
+            f"in {interaction.guild.name} - User: {user.id if user else 'any'}, "
+            f"Rule: {rule or 'any'}, Days: {days}"
+        )
+
+        if not self.audit_log:
+            await interaction.response.send_message(
+                "❌ The moderation audit log is not available.", ephemeral=True
+            )
+            return
+
+        try:
+            # Include entries that are still buffered
+            await self.write_audit_log()
+
+            guild_id = interaction.guild.id
+            user_id = user.id if user else None
+            since = int(time.time()) - days * 86400
+            started = time.perf_counter()
+            total, grouped, recent = await asyncio.gather(
+                self.audit_log.count(guild_id, since, user_id, rule),
+                # A user's history is broken down by rule, everything else by user
+                self.audit_log.top(
+                    "rule" if user_id else "user_id", guild_id, since, user_id, rule
+                ),
+                self.audit_log.recent(guild_id, since, user_id, rule),
+            )
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            scope = user.mention if user else "this server"
+            if rule:
+                scope += f", rule `{rule}`"
+            embed = discord.Embed(
+                title="Moderation Log",
+                description=f"**{total}** action(s) for {scope} in the last {days} day(s)",
+                color=0x5A0C8A,
+            )
+            if grouped:
+                if user_id:
+                    lines = [f"`{value}`: {hits}" for value, hits in grouped]
+                else:
+                    lines = [f"<@{value}>: {hits}" for value, hits in grouped]
+                embed.add_field(
+                    name="Top Rules" if user_id else "Top Users",
+                    value="\n".join(lines)[:1024],
+                    inline=False,
+                )
+            if recent:
+                lines = [
+                    f"<t:{ts}:R> <@{author_id}> in <#{channel_id}> - `{hit_rule}` ({action})"
+                    for ts, channel_id, author_id, hit_rule, action, _ in recent
+                ]
+                embed.add_field(name="Recent", value="\n".join(lines)[:1024], inline=False)
+            embed.set_footer(text=f"Query took {elapsed_ms:.1f} ms")
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+        except Exception as e:
+            logger.error(
+                f"Error in modlog command for user {interaction.user.id}: {e}",
+                exc_info=True,
+            )
+            if not interaction.response.is_done():
+                await interaction.response.send_message(
+                    "❌ An error occurred while reading the moderation log.", ephemeral=True
+                )
+
     @commands.Cog.listener()
     async def on_app_command_error(
         self, interaction: discord.Interaction, error: app_commands.AppCommandError
@@ -177,6 +944,134 @@ class Moderation(commands.Cog):
         )
 
 
+def update_guild_rules(guild_id: int, action: str, value: Optional[str]) -> str:
+    """Edit one guild's moderation rules and bump its rule version."""
+    if not value or not value.strip():
+        return "❌ A value is required for this action."
+    value = value.strip()
+
+    try:
+        response, changed = update_config(
+            lambda config: _edit_guild_rules(config, guild_id, action, value)
+        )
+        if changed:
+            logger.info(f"Updated moderation rules for guild {guild_id} ({action})")
+        return response
+    except Exception as e:
+        logger.error(f"Error in update_guild_rules: {e}", exc_info=True)
+        return f"❌ An error occurred: {e}"
+
+
+def _edit_guild_rules(config: dict, guild_id: int, action: str, value: str) -> Tuple[str, bool]:
+    """Apply a /modrules edit to the config, returning (response, whether it changed)."""
+    moderation = config.get("moderation", {})
+    # Only attached to the config once the edit succeeds, failed edits leave it untouched
+    guild_rules = moderation.get("guilds", {}).get(str(guild_id), {})
+
+    if action in ("add_word", "remove_word"):
+        # The first edit starts from the global list so it keeps applying
+        words = guild_rules.get("block_words", list(moderation.get("block_words", [])))
+        existing = [w for w in words if w.lower() == value.lower()]
+        if action == "add_word":
+            if existing:
+                return f"❌ ||{value}|| is already blocked.", False
+            words.append(value)
+            response = f"✅ ||{value}|| has been added to the blocked words."
+        else:
+            if not existing:
+                return f"❌ ||{value}|| is not blocked - cannot be removed.", False
+            words = [w for w in words if w.lower() != value.lower()]
+            response = f"✅ ||{value}|| has been removed from the blocked words."
+        guild_rules["block_words"] = words
+    elif action in ("add_pattern", "remove_pattern", "enable_pattern"):
+        # Copied deeply, the global rule dicts are shared by every guild using the defaults
+        rules = guild_rules.get(
+            "custom_rules", copy.deepcopy(moderation.get("custom_rules", []))
+        )
+        existing = [rule for rule in rules if rule.get("pattern") == value]
+        if action == "add_pattern":
+            if existing:
+                return f"❌ `{value}` is already a custom rule.", False
+            try:
+                SafePattern(value)
+            except PatternError as e:
+                return f"❌ Invalid or unsupported pattern: {e}", False
+            rules.append({"pattern": value, "enabled": True})
+            response = f"✅ `{value}` has been added to the custom rules."
+        elif not existing:
+            return f"❌ `{value}` is not a custom rule.", False
+        elif action == "remove_pattern":
+            rules = [rule for rule in rules if rule.get("pattern") != value]
+            response = f"✅ `{value}` has been removed from the custom rules."
+        else:
+            existing[0]["enabled"] = True
+            response = f"✅ `{value}` has been re-enabled."
+        guild_rules["custom_rules"] = rules
+    elif action in ("exempt_role", "unexempt_role", "exempt_channel", "unexempt_channel"):
+        key = "exempt_roles" if action.endswith("role") else "exempt_channels"
+        try:
+            target_id = int(value.strip("<@&#>"))
+        except ValueError:
+            return "❌ Invalid format. Please use a mention or ID.", False
+        ids = [int(i) for i in guild_rules.get(key, [])]
+        if action.startswith("exempt"):
+            if target_id in ids:
+                return "❌ That is already exempt.", False
+            ids.append(target_id)
+            response = "✅ Exemption added."
+        else:
+            if target_id not in ids:
+                return "❌ That is not exempt - cannot be removed.", False
+            ids.remove(target_id)
+            response = "✅ Exemption removed."
+        guild_rules[key] = ids
+    elif action == "set_action":
+        if value.lower() not in ACTIONS:
+            return f"❌ Invalid action. Use one of: {', '.join(ACTIONS)}.", False
+        guild_rules["action"] = value.lower()
+        response = f"✅ Flagged messages will now be handled with: {value.lower()}"
+    elif action in ("set_mod_channel", "set_mod_role"):
+        try:
+            target_id = int(value.strip("<@&#>"))
+        except ValueError:
+            return "❌ Invalid format. Please use a mention or ID.", False
+        key = "mod_channel" if action == "set_mod_channel" else "mod_role"
+        guild_rules[key] = str(target_id)
+        response = "✅ Moderation settings updated."
+    else:
+        return "❌ Invalid action. Use /modrules show to see the available actions.", False
+
+    # A new version means a new cache key, so the old matcher simply ages out
+    guild_rules["version"] = guild_rules.get("version", 0) + 1
+    config.setdefault("moderation", moderation).setdefault("guilds", {})[str(guild_id)] = guild_rules
+    return response, True
+
+
+def disable_custom_rules(guild_id: int, patterns: List[str]) -> None:
+    """Disable custom pattern rules that ran past their time budget."""
+    try:
+        if update_config(lambda config: _disable_custom_rules(config, guild_id, patterns)):
+            logger.info(f"Disabled custom rule(s) {patterns} for guild {guild_id}")
+    except Exception as e:
+        logger.error(f"Error in disable_custom_rules: {e}", exc_info=True)
+
+
+def _disable_custom_rules(config: dict, guild_id: int, patterns: List[str]) -> bool:
+    moderation = config.setdefault("moderation", {})
+    guild_rules = moderation.get("guilds", {}).get(str(guild_id), {})
+    # Rules come from the guild's own list if it has one, else the global one
+    section = guild_rules if "custom_rules" in guild_rules else moderation
+
+    changed = False
+    for rule in section.get("custom_rules", []):
+        if rule.get("pattern") in patterns and rule.get("enabled", True):
+            rule["enabled"] = False
+            changed = True
+    if changed:
+        section["version"] = section.get("version", 0) + 1
+    return changed
+
+
 async def setup(bot: commands.Bot):
     """Setup function for the moderation cog."""
     await bot.add_cog(Moderation(bot))
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Optional
@@ -8,10 +9,19 @@ from discord import app_commands
 from requests import post, get
 from requests.exceptions import RequestException, Timeout
 
-from config import get_twitch_config, get_bot_config, load_config, save_config
+from config import (
+    get_twitch_config,
+    get_bot_config,
+    reload_config_if_changed,
+    update_config,
+)
+from sharding import is_primary
 
 logger = logging.getLogger(__name__)
 
+# Gateway intents the cog needs, read by main.py for the low-memory mode
+REQUIRED_INTENTS = ()
+
 # HTTP request timeout in seconds
 REQUEST_TIMEOUT = 10
 
@@ -198,6 +208,11 @@ class Twitch(commands.Cog):
 
     async def cog_load(self):
         """Called when the cog is loaded."""
+        if not is_primary(self.bot):
+            # In a cluster one process polls Twitch, or every stream would be announced per process
+            logger.info("Twitch cog loaded – polling left to the primary process")
+            return
+
         logger.info("Twitch cog loaded – starting tasks")
 
         if not self.check_twitch_access_token.is_running():
@@ -297,17 +312,21 @@ class Twitch(commands.Cog):
         try:
             logger.debug("Running Twitch access token check")
             current_time = datetime.now(timezone.utc).timestamp()
-            config = load_config()
+            config = reload_config_if_changed()
             twitch_config = config.get("twitch", {})
             expire_date = twitch_config.get("expire_date", 0)
 
             if int(current_time) >= expire_date:
                 logger.info("Twitch access token expired, refreshing...")
                 access_token = get_app_access_token()
-                twitch_config["access_token"] = access_token
-                twitch_config["expire_date"] = calculate_unix_time_future(weeks=3)
-                config["twitch"] = twitch_config
-                save_config(config)
+                expire_date = calculate_unix_time_future(weeks=3)
+
+                def store_token(config: dict) -> None:
+                    twitch_config = config.setdefault("twitch", {})
+                    twitch_config["access_token"] = access_token
+                    twitch_config["expire_date"] = expire_date
+
+                await asyncio.to_thread(update_config, store_token)
                 logger.info("Access token regenerated successfully")
             else:
                 logger.debug("Access token still valid")
@@ -322,6 +341,8 @@ class Twitch(commands.Cog):
     async def check_twitch_online_streamers(self):
         """Periodically check for online streamers and send notifications."""
         try:
+            # Commands handled by other processes of a cluster may have changed the config
+            reload_config_if_changed()
             config = get_twitch_config()
             logger.debug("Running streamer check loop")
 
@@ -337,7 +358,10 @@ class Twitch(commands.Cog):
                 return
 
             channel = self.bot.get_channel(channel_id)
-            if not channel or not isinstance(channel, discord.TextChannel):
+            if channel is None and self.bot.shard_count and self.bot.shard_count > 1:
+                # The channel's guild is on another process's shards, send by ID
+                channel = self.bot.get_partial_messageable(channel_id)
+            elif not channel or not isinstance(channel, discord.TextChannel):
                 logger.warning(f"Channel {channel_id} not found or not a text channel")
                 return
 
@@ -434,7 +458,7 @@ class Twitch(commands.Cog):
                         "❌ Streamer name is required for adding.", ephemeral=True
                     )
                     return
-                response = followstreamer(streamer=streamername)
+                response = await asyncio.to_thread(followstreamer, streamername)
                 await interaction.response.send_message(response, ephemeral=True)
                 logger.info(
                     f"Watchlist add completed by {interaction.user.id}: {streamername}"
@@ -448,7 +472,7 @@ class Twitch(commands.Cog):
                         "❌ Streamer name is required for removing.", ephemeral=True
                     )
                     return
-                response = unfollowstreamer(streamer=streamername)
+                response = await asyncio.to_thread(unfollowstreamer, streamername)
                 await interaction.response.send_message(response, ephemeral=True)
                 logger.info(
                     f"Watchlist remove completed by {interaction.user.id}: {streamername}"
@@ -519,15 +543,18 @@ class Twitch(commands.Cog):
             )
             return
 
-        # Verify channel exists
+        # Verify channel exists, asking Discord if its guild is on another shard's process
         if not self.bot.get_channel(channel_id):
-            await interaction.response.send_message(
-                "❌ Channel not found.", ephemeral=True
-            )
-            return
+            try:
+                await self.bot.fetch_channel(channel_id)
+            except (discord.NotFound, discord.Forbidden, discord.InvalidData):
+                await interaction.response.send_message(
+                    "❌ Channel not found.", ephemeral=True
+                )
+                return
 
         try:
-            response = changelivechannel(channel_id=channel_id)
+            response = await asyncio.to_thread(changelivechannel, channel_id)
             await interaction.response.send_message(response, ephemeral=True)
             logger.info(
                 f"Live channel updated by {interaction.user.id} to channel {channel_id}"
@@ -580,7 +607,7 @@ class Twitch(commands.Cog):
             return
 
         try:
-            response = changemessage(newmessage=message, mentions=mentioned)
+            response = await asyncio.to_thread(changemessage, message, mentioned)
             await interaction.response.send_message(response, ephemeral=True)
             logger.info(f"Live message updated by {interaction.user.id}")
         except Exception as e:
@@ -611,21 +638,18 @@ def followstreamer(streamer: str) -> str:
         return "❌ Streamer name cannot be empty."
 
     streamer = streamer.lower().strip()
-    config = load_config()
-    twitch_config = config.get("twitch", {})
-    watchlist = twitch_config.get("watchlist", [])
 
-    if streamer in watchlist:
-        return f"❌ {streamer} is already on the list."
-
-    watchlist.append(streamer)
-    twitch_config["watchlist"] = watchlist
-    config["twitch"] = twitch_config
-
-    try:
-        save_config(config)
+    def edit(config: dict) -> str:
+        twitch_config = config.setdefault("twitch", {})
+        watchlist = twitch_config.setdefault("watchlist", [])
+        if streamer in watchlist:
+            return f"❌ {streamer} is already on the list."
+        watchlist.append(streamer)
         logger.info(f"Added {streamer} to watchlist")
         return f"✅ {streamer} has been successfully added to the list."
+
+    try:
+        return update_config(edit)
     except Exception as e:
         logger.error(f"Error in followstreamer: {e}", exc_info=True)
         return f"❌ An error occurred: {e}"
@@ -637,21 +661,17 @@ def unfollowstreamer(streamer: str) -> str:
         return "❌ Streamer name cannot be empty."
 
     streamer = streamer.lower().strip()
-    config = load_config()
-    twitch_config = config.get("twitch", {})
-    watchlist = twitch_config.get("watchlist", [])
-
-    if streamer not in watchlist:
-        return f"❌ {streamer} is not in the list - cannot be removed."
 
-    watchlist.remove(streamer)
-    twitch_config["watchlist"] = watchlist
-    config["twitch"] = twitch_config
-
-    try:
-        save_config(config)
+    def edit(config: dict) -> str:
+        watchlist = config.get("twitch", {}).get("watchlist", [])
+        if streamer not in watchlist:
+            return f"❌ {streamer} is not in the list - cannot be removed."
+        watchlist.remove(streamer)
         logger.info(f"Removed {streamer} from watchlist")
         return f"✅ {streamer} has been successfully removed from the list."
+
+    try:
+        return update_config(edit)
     except Exception as e:
         logger.error(f"Error in unfollowstreamer: {e}", exc_info=True)
         return f"❌ An error occurred: {e}"
@@ -665,14 +685,13 @@ def viewstreamers() -> list[str]:
 
 def changemessage(newmessage: str, mentions: str) -> str:
     """Change the live notification message."""
-    config = load_config()
-    twitch_config = config.get("twitch", {})
+    live_msg = f"{mentions}! {newmessage}"
+
+    def edit(config: dict) -> None:
+        config.setdefault("twitch", {})["live_msg"] = live_msg
 
     try:
-        live_msg = f"{mentions}! {newmessage}"
-        twitch_config["live_msg"] = live_msg
-        config["twitch"] = twitch_config
-        save_config(config)
+        update_config(edit)
         logger.info("Updated live notification message")
         return f"✅ Your new message has been set.\nNew Message: {live_msg}"
     except Exception as e:
@@ -682,13 +701,12 @@ def changemessage(newmessage: str, mentions: str) -> str:
 
 def changelivechannel(channel_id: int) -> str:
     """Change the channel for live notifications."""
-    config = load_config()
-    twitch_config = config.get("twitch", {})
+
+    def edit(config: dict) -> None:
+        config.setdefault("twitch", {})["channel_id"] = str(channel_id)
 
     try:
-        twitch_config["channel_id"] = str(channel_id)
-        config["twitch"] = twitch_config
-        save_config(config)
+        update_config(edit)
         logger.info(f"Updated live notification channel to {channel_id}")
         return f"✅ The channel has been set to: <#{channel_id}>"
     except Exception as e:
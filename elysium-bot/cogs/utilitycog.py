@@ -7,11 +7,15 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 
+from command_sync import sync_command_tree
 from config import get_bot_config
 from utils import get_channel_safely
 
 logger = logging.getLogger(__name__)
 
+# Gateway intents the cog needs, read by main.py for the low-memory mode
+REQUIRED_INTENTS = ()
+
 # Datetime for Client startup tracking
 start_time = datetime.now(timezone.utc)
 
@@ -135,6 +139,31 @@ class Utility(commands.Cog):
                     "An error occurred while shutting down.", ephemeral=True
                 )
 
+    @commands.command(name="sync")
+    async def sync_commands(self, ctx: commands.Context):
+        """Force a slash command sync with Discord (dev only)."""
+        if ctx.author.id != dev_id:
+            logger.warning(
+                f"Unauthorized sync attempt by {ctx.author} (ID: {ctx.author.id}) "
+                f"in {ctx.guild.name if ctx.guild else 'DM'}"
+            )
+            await ctx.send("❌ You don't have permission to use this command.")
+            return
+
+        logger.info(
+            f"Command !sync used by authorized user {ctx.author} (ID: {ctx.author.id}) "
+            f"in {ctx.guild.name if ctx.guild else 'DM'}"
+        )
+        try:
+            synced = await sync_command_tree(self.bot.tree, force=True)
+            await ctx.send(f"🔄 Synced {synced} command(s)")
+        except discord.HTTPException as e:
+            logger.error(f"Discord API error while syncing commands: {e}")
+            await ctx.send(f"❌ Error syncing commands: {str(e)}")
+        except Exception as e:
+            logger.error(f"Error in sync command: {e}", exc_info=True)
+            await ctx.send("An error occurred while syncing commands.")
+
     @app_commands.command(
         name="help", description="Shows the list of available commands."
     )
@@ -159,14 +188,20 @@ class Utility(commands.Cog):
                     "**/setlivemessage {message} {role}** - Allows for the creation of custom messages for stream notifications.\n"
                     "**/setlivechannel {channel}** - Allows for the changing of the channel the bot sends notifications in.\n"
                     "**/shutdown {reason}** - This command stops the bot (Authorised users only).\n"
+                    "**!sync** - Force a slash command sync (Authorised users only).\n"
                     "**/suggestion {suggestion}** - This command allows for the user to send a suggestion for update to the bot.\n"
                     "**/alert {issue}** - Report an issue to moderators.\n"
-                    "**!play {song}** - Play music in a voice channel.\n"
+                    "**/purge {limit} {user} {pattern} {minutes}** - Bulk delete messages (Moderators only).\n"
+                    "**/modrules {action} {value}** - View or edit this server's moderation rules (Moderators only).\n"
+                    "**/modlog {user} {rule} {days}** - Look up moderation history (Moderators only).\n"
+                    "**!play {song}** / **/play {song}** - Play music in a voice channel.\n"
                     "**!skip** - Skip the current song.\n"
+                    "**!seek {position}** - Jump to a position in the current song.\n"
                     "**!queue** - Show the current queue.\n"
                     "**!stop** - Stop playing and disconnect.\n"
                     "**!pause** - Pause the current song.\n"
-                    "**!resume** - Resume the paused song."
+                    "**!resume** - Resume the paused song.\n"
+                    "**!musicstats** - Show music playback timings."
                 ),
                 inline=False,
             )
@@ -1,42 +1,50 @@
 import logging
-import os
 import asyncio
-from pathlib import Path
-from typing import Optional
+from itertools import islice
+from typing import Dict, Optional
 
 import discord
-from discord.ext import commands
-import yt_dlp
+from discord import app_commands
+from discord.ext import commands, tasks
+
+from audio_cache import AUDIO_CACHE_MAX_MB, AUDIO_CACHE_MIN_PLAYS, AudioCache
+from config import get_data_path, get_music_config
+from loudness import LOUDNESS_TARGET, LOUDNESS_WORKERS, LoudnessIndex
+from music_cache import TrackCache, TrackIndex, parse_video_id, video_url
+from music_extractor import (
+    EXTRACTOR_WORKERS,
+    ExtractionError,
+    ExtractorPool,
+    TooManyRequests,
+    is_playlist_url,
+)
+from music_metrics import MusicMetrics, format_histograms
+from music_player import (
+    IDLE,
+    MAX_QUEUE_LENGTH,
+    GuildPlayer,
+    QueuedTrack,
+    format_timestamp,
+    parse_timestamp,
+)
+from music_store import QueueStore
+from sharding import owns_guild
+from utils import DeadlineScheduler
 
 logger = logging.getLogger(__name__)
 
-# Determine FFmpeg path based on OS
-if os.name == "nt":  # Windows
-    FFMPEG_PATH = Path(__file__).parent.parent.parent / "bin" / "ffmpeg.exe"
-else:  # Linux/Mac
-    FFMPEG_PATH = Path(__file__).parent.parent.parent / "bin" / "ffmpeg"
-
-# Fallback to system ffmpeg if not found in bin directory
-if not FFMPEG_PATH.exists():
-    FFMPEG_PATH = "ffmpeg"  # Use system ffmpeg
-
-FFMPEG_OPTIONS = {
-    "before_options": "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5",
-    "options": "-vn",
-    "executable": FFMPEG_PATH,
-}
-YDL_OPTIONS = {
-    "format": "bestaudio/best",
-    "noplaylist": True,
-    "extractaudio": True,
-    "audioformat": "mp3",
-    "outtmpl": "%(extractor)s-%(id)s-%(title)s.%(ext)s",
-    "restrictfilenames": True,
-    "logtostderr": False,
-    "ignoreerrors": False,
-    "default_search": "auto",
-    "source_address": "0.0.0.0",  # Bind to ipv4 since ipv6 addresses cause issues sometimes
-}
+# Gateway intents and member cache flags the cog needs, read by main.py for the
+# low-memory mode. VoiceChannel.members only lists cached members, so the
+# members in voice channels are kept.
+REQUIRED_INTENTS = ("voice_states",)
+MEMBER_CACHE_FLAGS = ("voice",)
+
+# Tracks listed by !queue, the embed cannot hold a long playlist
+QUEUE_DISPLAY_LIMIT = 20
+# Saved queues, see music.queue_store
+QUEUE_STORE_FILE = "music_queues.db"
+# Seconds between writes of queue changes and playback positions
+QUEUE_SAVE_INTERVAL = 10
 
 
 class MusicBot(commands.Cog):
@@ -45,18 +53,330 @@ class MusicBot(commands.Cog):
     def __init__(self, bot: commands.Bot):
         """Initialize the music bot."""
         self.bot = bot
-        self.queue: list[tuple[str, str]] = []  # List of (url, title) tuples
-        self.current_ctx: Optional[commands.Context] = None
-        self.disconnect_timer: Optional[asyncio.Task] = None
-        self.empty_channel_timer: Optional[asyncio.Task] = None
+        # One player per guild, created on first !play and removed on disconnect
+        self.players: Dict[int, GuildPlayer] = {}
+        # Repeat requests skip the search, and the extraction while the URL is valid
+        self.track_cache = TrackCache()
+        # Titles of played tracks for /play autocomplete, loaded from the queue store
+        self.track_index = TrackIndex()
+        self.extractors: Optional[ExtractorPool] = None
+        self.max_queue_length = MAX_QUEUE_LENGTH
+        # Optional local copies of popular tracks, see music.audio_cache_dir
+        self.audio_cache: Optional[AudioCache] = None
+        self.cache_fills: set[asyncio.Task] = set()
+        # Optional per-track gains, see music.loudness_index
+        self.loudness: Optional[LoudnessIndex] = None
+        self.loudness_jobs: set[asyncio.Task] = set()
+        # Playback timings for !musicstats
+        self.metrics = MusicMetrics()
+        # Idle and empty channel deadlines of every guild, driven by voice events
+        self.idle_scheduler = DeadlineScheduler(self.on_idle_deadline)
+        # Queues saved across restarts, see music.queue_store
+        self.queue_store: Optional[QueueStore] = None
+
+    async def cog_load(self):
+        """Start the yt-dlp extractor pool and restore saved queues."""
+        try:
+            config = get_music_config()
+        except Exception as e:
+            logger.error(f"Error loading music config: {e}")
+            config = {}
+        workers = int(config.get("extractor_workers", EXTRACTOR_WORKERS))
+        self.max_queue_length = int(config.get("max_queue_length", MAX_QUEUE_LENGTH))
+        self.extractors = ExtractorPool(workers)
+        # yt-dlp is imported and warmed up once the bot is online, not during startup
+        asyncio.create_task(self.warm_extractors())
+        await self.setup_audio_cache(config)
+        await self.setup_loudness(config)
+        await self.setup_queue_store(config)
+
+    async def warm_extractors(self) -> None:
+        """Start the extractor threads once startup is out of the way."""
+        await self.bot.wait_until_ready()
+        if self.extractors:
+            try:
+                await self.extractors.warm()
+            except Exception as e:
+                logger.error(f"Error warming up yt-dlp extractors: {e}")
 
-    @commands.command()
+    async def setup_audio_cache(self, config: dict) -> None:
+        """Open the on-disk track cache if one is configured."""
+        directory = config.get("audio_cache_dir")
+        if not directory:
+            return
+        try:
+            audio_cache = AudioCache(
+                get_data_path(directory),
+                int(config.get("audio_cache_max_mb", AUDIO_CACHE_MAX_MB)) * 1024 * 1024,
+                int(config.get("audio_cache_min_plays", AUDIO_CACHE_MIN_PLAYS)),
+            )
+            count = await asyncio.to_thread(audio_cache.load)
+            self.audio_cache = audio_cache
+            logger.info(
+                f"Audio cache at {audio_cache.directory}: {count} track(s), "
+                f"{audio_cache.total_bytes // (1024 * 1024)} MiB"
+            )
+        except Exception as e:
+            logger.error(f"Error setting up audio cache: {e}", exc_info=True)
+
+    async def setup_loudness(self, config: dict) -> None:
+        """Load the loudness index if normalization is configured."""
+        path = config.get("loudness_index")
+        if not path:
+            return
+        try:
+            loudness = LoudnessIndex(
+                get_data_path(path),
+                float(config.get("loudness_target", LOUDNESS_TARGET)),
+                int(config.get("loudness_workers", LOUDNESS_WORKERS)),
+            )
+            count = await asyncio.to_thread(loudness.load)
+            self.loudness = loudness
+            logger.info(f"Loudness index at {loudness.path}: {count} track(s)")
+        except Exception as e:
+            logger.error(f"Error loading loudness index: {e}", exc_info=True)
+
+    async def setup_queue_store(self, config: dict) -> None:
+        """Open the saved queue database and restore its sessions once the bot is ready."""
+        try:
+            path = get_data_path(config.get("queue_store") or QUEUE_STORE_FILE)
+            self.queue_store = await asyncio.to_thread(QueueStore, path)
+            self.track_index.load(
+                await asyncio.to_thread(self.queue_store.load_played, self.track_index.max_tracks)
+            )
+            if not self.save_queues.is_running():
+                self.save_queues.start()
+            asyncio.create_task(self.restore_sessions())
+            logger.info(
+                f"Music queue store opened at {path} - {len(self.track_index)} known track(s)"
+            )
+        except Exception as e:
+            logger.error(f"Error opening music queue store: {e}", exc_info=True)
+
+    async def write_queue_store(self) -> None:
+        """Write buffered queue changes to disk."""
+        if not self.queue_store:
+            return
+        try:
+            await self.queue_store.flush()
+        except Exception as e:
+            logger.error(f"Error saving music queues: {e}")
+
+    @tasks.loop(seconds=QUEUE_SAVE_INTERVAL)
+    async def save_queues(self):
+        """Periodically save playback positions and queue changes in one batch."""
+        if not self.queue_store:
+            return
+        for guild_id, player in self.players.items():
+            if player.current and player.is_active:
+                self.queue_store.save_position(guild_id, player.position)
+        await self.write_queue_store()
+
+    async def restore_sessions(self) -> None:
+        """Rejoin the voice channels that were playing when the bot last stopped."""
+        await self.bot.wait_until_ready()
+        if not self.queue_store:
+            return
+        try:
+            sessions = await asyncio.to_thread(self.queue_store.load)
+        except Exception as e:
+            logger.error(f"Error reading saved music queues: {e}", exc_info=True)
+            return
+
+        for session in sessions:
+            guild_id = session["guild_id"]
+            if not owns_guild(self.bot, guild_id):
+                # The store is shared by a cluster, another process restores this one
+                continue
+            try:
+                if not await self.restore_session(session):
+                    self.queue_store.forget(guild_id)
+            except Exception as e:
+                logger.error(f"Error restoring music session in guild {guild_id}: {e}")
+                self.queue_store.forget(guild_id)
+        await self.write_queue_store()
+
+    async def restore_session(self, session: dict) -> bool:
+        """
+        Reconnect one saved session and resume its queue.
+
+        Args:
+            session: Saved session from QueueStore.load()
+
+        Returns:
+            bool: True if playback was resumed, False if the session was stale
+        """
+        guild = self.bot.get_guild(session["guild_id"])
+        if guild and guild.id in self.players:
+            # Someone already started playing again, their queue is being saved
+            return True
+        if not guild or guild.voice_client:
+            return False
+        channel = guild.get_channel(session["voice_channel_id"])
+        # Nobody would be listening, the saved queue is dropped like on an idle timeout
+        if not isinstance(channel, (discord.VoiceChannel, discord.StageChannel)) or not any(
+            not m.bot for m in channel.members
+        ):
+            return False
+
+        tracks = [
+            QueuedTrack(
+                row["video_id"],
+                row["title"],
+                row["webpage_url"],
+                row["duration"],
+                row["requester_id"],
+            )
+            for row in ([session] if session["video_id"] else []) + session["queue"]
+        ]
+        if not tracks:
+            return False
+        if session["video_id"]:
+            # Pick the interrupted track up where it was
+            tracks[0].start_at = session["position"] or 0.0
+
+        await channel.connect()
+        player = self.get_player(guild)
+        text_channel = guild.get_channel(session["text_channel_id"] or 0)
+        if isinstance(text_channel, discord.abc.Messageable):
+            player.text_channel = text_channel
+        # Re-queued under fresh sequence numbers, the old rows go first
+        self.queue_store.clear_queue(guild.id)
+        added = player.enqueue(tracks)
+        await player.send(f"🔁 Restored the queue after a restart ({added} track(s))")
+        logger.info(
+            f"Restored music session in guild {guild.id} - {added} track(s) "
+            f"in {channel.name}"
+        )
+        await player.play_next()
+        return True
+
+    def track_started(self, track: QueuedTrack) -> None:
+        """
+        Start the background work for a track that began playing: counting
+        the play for autocomplete, measuring its loudness the first time, and
+        saving it locally once it is played often enough.
+        """
+        video_id = track.video_id
+        self.track_index.add(
+            {
+                "id": video_id,
+                "title": track.title,
+                "webpage_url": track.webpage_url,
+                "duration": track.duration,
+            }
+        )
+        if self.queue_store:
+            self.queue_store.record_play(track)
+
+        stream = self.track_cache.get_stream(video_id)
+        if self.loudness and self.loudness.needs_analysis(video_id):
+            cached = self.audio_cache.entries.get(video_id) if self.audio_cache else None
+            source = self.audio_cache.path(video_id) if cached else stream and stream["url"]
+            if source:
+                task = asyncio.create_task(self.loudness.analyze(video_id, source))
+                self.loudness_jobs.add(task)
+                task.add_done_callback(self.loudness_jobs.discard)
+
+        if not self.audio_cache or not self.audio_cache.should_cache(
+            video_id, track.duration
+        ):
+            return
+        if not stream:
+            return
+        task = asyncio.create_task(self.audio_cache.fill(video_id, stream))
+        self.cache_fills.add(task)
+        task.add_done_callback(self.cache_fills.discard)
+
+    def get_player(self, guild: discord.Guild) -> GuildPlayer:
+        """Get a guild's player, creating it if needed."""
+        player = self.players.get(guild.id)
+        if player is None:
+            player = self.players[guild.id] = GuildPlayer(
+                self, guild, self.max_queue_length
+            )
+        return player
+
+    def remove_player(self, guild_id: int) -> None:
+        """Drop a guild's player once it has disconnected."""
+        player = self.players.pop(guild_id, None)
+        if player:
+            player.cancel_timers()
+
+    async def cog_unload(self):
+        """Save the queues, disconnect every player and stop the extractor pool."""
+        if self.save_queues.is_running():
+            self.save_queues.cancel()
+        if self.queue_store:
+            # Saved before disconnecting so the sessions are restored on the next start
+            for guild_id, player in self.players.items():
+                if player.current:
+                    self.queue_store.save_position(guild_id, player.position)
+            await self.write_queue_store()
+            self.queue_store.close()
+            self.queue_store = None
+        for player in list(self.players.values()):
+            try:
+                await player.disconnect()
+            except Exception as e:
+                logger.error(f"Error disconnecting player in guild {player.guild.id}: {e}")
+        if self.extractors:
+            self.extractors.shutdown()
+            self.extractors = None
+        for task in self.cache_fills | self.loudness_jobs:
+            task.cancel()
+        self.idle_scheduler.stop()
+
+    async def on_idle_deadline(self, key: tuple[int, str]) -> None:
+        """Check a guild's player when one of its idle timers fires."""
+        guild_id, kind = key
+        player = self.players.get(guild_id)
+        if player:
+            await player.check_idle(kind)
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(
+        self,
+        member: discord.Member,
+        before: discord.VoiceState,
+        after: discord.VoiceState,
+    ):
+        """Track listeners joining and leaving the channels the bot plays in."""
+        if before.channel == after.channel:
+            return  # Mute, deafen and similar changes
+        player = self.players.get(member.guild.id)
+        if not player:
+            return
+
+        try:
+            if member.id == self.bot.user.id:
+                if after.channel is None:
+                    # Disconnected by a moderator or by Discord, release the player
+                    logger.info(f"Removed from voice in guild {member.guild.id}")
+                    await player.disconnect()
+                else:
+                    player.update_listeners()
+                return
+
+            voice_client = player.voice_client
+            if voice_client and voice_client.channel in (before.channel, after.channel):
+                player.update_listeners()
+        except Exception as e:
+            logger.error(f"Error in voice state handler: {e}", exc_info=True)
+
+    @commands.hybrid_command(name="play", description="Play a song from YouTube")
+    @commands.guild_only()
+    @app_commands.describe(search="Song name, YouTube link or playlist link")
     async def play(self, ctx: commands.Context, *, search: str):
         """Play a song from YouTube."""
         logger.info(
             f"Command !play used by {ctx.author} (ID: {ctx.author.id}) "
             f"in {ctx.guild.name if ctx.guild else 'DM'} - Search: {search[:50]}"
         )
+        # /play has 3 seconds to respond, and connecting to voice alone can take
+        # longer; does nothing for !play
+        await ctx.defer()
+
         # Check if user is in a voice channel
         if not ctx.author.voice:
             logger.warning(
@@ -88,107 +408,158 @@ class MusicBot(commands.Cog):
             await ctx.send("❌ You must be in the same voice channel as the bot!")
             return
 
+        player = self.get_player(ctx.guild)
+        # Report playback in the channel the latest request came from
+        player.text_channel = ctx.channel
+
         async with ctx.typing():
             try:
-                # Run yt-dlp in a thread to avoid blocking
-                def extract_info():
-                    with yt_dlp.YoutubeDL(YDL_OPTIONS) as ydl:
-                        return ydl.extract_info(f"ytsearch:{search}", download=False)
-
-                info = await asyncio.to_thread(extract_info)
-
-                if "entries" in info and len(info["entries"]) > 0:
-                    info = info["entries"][0]
+                if is_playlist_url(search):
+                    await self.queue_playlist(ctx, player, search)
                 else:
-                    await ctx.send("❌ No results found!")
-                    return
+                    await self.queue_search(ctx, player, search)
 
-                url = info.get("url")
-                title = info.get("title", "Unknown Title")
-
-                if not url:
-                    await ctx.send("❌ Could not get audio URL!")
-                    return
-
-                # Add to queue
-                self.queue.append((url, title))
-                await ctx.send(f"✅ Added to queue: **{title}**")
-                logger.info(
-                    f"Song '{title}' added to queue by {ctx.author.id} (Queue size: {len(self.queue)})"
-                )
-
-            except yt_dlp.DownloadError as e:
+            except LookupError:
+                await ctx.send("❌ No results found!")
+                return
+            except TooManyRequests:
+                logger.warning(f"Too many pending !play requests from {ctx.author.id}")
+                await ctx.send("⏳ Please wait for your previous requests to finish!")
+                return
+            except ExtractionError as e:
                 logger.error(f"yt-dlp error: {e}")
                 await ctx.send(f"❌ Error searching for video: {str(e)}")
             except Exception as e:
                 logger.error(f"Error in play command: {e}", exc_info=True)
                 await ctx.send(f"❌ An error occurred while searching: {str(e)}")
 
-        # Set current context for callbacks
-        self.current_ctx = ctx
-
         # Cancel any existing disconnect timer
-        if self.disconnect_timer:
-            self.disconnect_timer.cancel()
-            self.disconnect_timer = None
+        player.cancel_timer(IDLE)
 
         # Play next song if nothing is currently playing
-        if not ctx.voice_client.is_playing() and not ctx.voice_client.is_paused():
-            await self.play_next()
-
-        # Start monitoring for empty voice channel
-        self.start_empty_channel_timer(ctx)
-
-    async def play_next(self):
-        """Play the next song in the queue."""
-        if not self.current_ctx:
-            return
-
-        ctx = self.current_ctx
+        if ctx.voice_client and not player.is_active:
+            await player.play_next()
+
+    @play.autocomplete("search")
+    async def play_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ) -> list[app_commands.Choice[str]]:
+        """Suggest previously played tracks matching what has been typed."""
+        try:
+            return [
+                app_commands.Choice(name=track["title"][:100], value=video_url(track["id"]))
+                for track in self.track_index.search(current)
+            ]
+        except Exception as e:
+            logger.error(f"Error in play autocomplete: {e}", exc_info=True)
+            return []
+
+    async def queue_search(
+        self, ctx: commands.Context, player: GuildPlayer, search: str
+    ) -> None:
+        """Search for a single track and add it to the queue."""
+        video_id = parse_video_id(search)
+        track = self.track_index.get(video_id) if video_id else None
+        if track:
+            # Picked from autocomplete or linked, the stream is resolved when it is due
+            logger.debug(f"Known track {video_id}, skipping the search")
+        else:
+            track, stream = await self.resolve(search, ctx.author.id)
+            if not stream.get("url"):
+                await ctx.send("❌ Could not get audio URL!")
+                return
+        title = track["title"]
 
-        if not ctx.voice_client:
-            logger.warning("Voice client not available for play_next")
+        # Add to queue
+        if not player.enqueue([QueuedTrack.from_metadata(track, ctx.author.id)]):
+            await ctx.send(f"❌ The queue is full ({player.max_queue_length} tracks)!")
             return
+        await ctx.send(f"✅ Added to queue: **{title}**")
+        logger.info(
+            f"Song '{title}' added to queue by {ctx.author.id} "
+            f"in guild {ctx.guild.id} (Queue size: {len(player.queue)})"
+        )
 
-        if self.queue:
-            url, title = self.queue.pop(0)
-            try:
-                # Create audio source
-                source = await discord.FFmpegOpusAudio.from_probe(url, **FFMPEG_OPTIONS)
+    async def queue_playlist(
+        self, ctx: commands.Context, player: GuildPlayer, url: str
+    ) -> None:
+        """List a playlist and queue its tracks, each resolved only when it is due."""
+        info = await self.extractors.extract_playlist(url, ctx.author.id)
+        entries = info["entries"]
+        added = player.enqueue(
+            QueuedTrack(
+                entry["id"],
+                entry.get("title") or "Unknown Title",
+                entry.get("url"),
+                entry.get("duration"),
+                ctx.author.id,
+            )
+            for entry in entries
+        )
 
-                # Play the audio with after callback
-                ctx.voice_client.play(
-                    source,
-                    after=lambda error: asyncio.create_task(self.after_playing(error)),
-                )
-                await ctx.send(f"🎵 Now Playing: **{title}**")
-                logger.info(f"Now playing: {title}")
+        message = f"✅ Added {added} track(s) from **{info.get('title') or 'playlist'}**"
+        if added < len(entries):
+            message += f" ({len(entries) - added} skipped, the queue is full)"
+        if info.get("unavailable"):
+            message += f" ({info['unavailable']} private or deleted video(s) left out)"
+        await ctx.send(message)
+        logger.info(
+            f"Playlist {url} queued by {ctx.author.id} in guild {ctx.guild.id} - "
+            f"{added}/{len(entries)} track(s) (Queue size: {len(player.queue)})"
+        )
 
-            except discord.ClientException as e:
-                logger.error(f"Discord client error playing audio: {e}")
-                await ctx.send(f"❌ Error playing audio: {str(e)}")
-                # Try to play next song if there was an error
-                await self.play_next()
-            except Exception as e:
-                logger.error(f"Error playing audio: {e}", exc_info=True)
-                await ctx.send(f"❌ Error playing audio: {str(e)}")
-                # Try to play next song if there was an error
-                await self.play_next()
+    async def resolve(self, search: str, user_id: Optional[int] = None) -> tuple[dict, dict]:
+        """
+        Resolve a search to track metadata and a playable stream.
+
+        Args:
+            search: Search text as typed by the user
+            user_id: Requesting user, for per-user extraction queueing
+
+        Returns:
+            tuple: (track metadata, stream details)
+
+        Raises:
+            LookupError: If the search found nothing
+            TooManyRequests: If the user has too many extractions pending
+        """
+        track = self.track_cache.get_track(search)
+        if track:
+            stream = self.track_cache.get_stream(track["id"])
+            if stream:
+                logger.debug(f"Cache hit for '{search[:50]}' -> {track['id']}")
+                return track, stream
+            # Known video with an expired URL, skip the search and re-extract it
+            query = track["webpage_url"] or track["id"]
         else:
-            await ctx.send("📭 Queue is empty!")
-            # Start disconnect timer when queue is empty and nothing is playing
-            self.start_disconnect_timer(ctx)
-
-    async def after_playing(self, error: Optional[Exception]):
-        """Callback after a song finishes playing."""
-        if error:
-            logger.error(f"Player error: {error}")
-        # Cancel disconnect timer since we're about to play next song
-        if self.disconnect_timer:
-            self.disconnect_timer.cancel()
-            self.disconnect_timer = None
-        # Play next song after current one finishes
-        await self.play_next()
+            query = f"ytsearch:{search}"
+
+        with self.metrics.timer("extraction"):
+            info = await self.extractors.extract(query, user_id)
+        return self.track_cache.store(search, info)
+
+    async def get_stream(self, track: QueuedTrack) -> dict:
+        """
+        Get a playable stream for a queued track, re-extracting it if the
+        cached URL has expired.
+
+        Args:
+            track: Track to play
+
+        Returns:
+            dict: Stream details including "url"
+        """
+        stream = self.track_cache.get_stream(track.video_id)
+        if stream:
+            return stream
+        with self.metrics.timer("extraction"):
+            info = await self.extractors.extract(track.webpage_url or track.video_id)
+        metadata, stream = self.track_cache.store(None, info)
+        # Flat playlist entries do not always carry a duration
+        track.duration = track.duration or metadata["duration"]
+        if not stream.get("url"):
+            raise LookupError(track.video_id)
+        return stream
 
     @commands.command()
     async def skip(self, ctx: commands.Context):
@@ -214,6 +585,45 @@ class MusicBot(commands.Cog):
             )
             await ctx.send("❌ Nothing is currently playing!")
 
+    @commands.command()
+    @commands.guild_only()
+    async def seek(self, ctx: commands.Context, position: str):
+        """Jump to a position in the current song."""
+        logger.info(
+            f"Command !seek used by {ctx.author} (ID: {ctx.author.id}) "
+            f"in {ctx.guild.name} - Position: {position[:20]}"
+        )
+        player = self.players.get(ctx.guild.id)
+        if not player or not player.current or not player.is_active:
+            logger.warning(f"Seek command used by {ctx.author.id} but nothing is playing")
+            await ctx.send("❌ Nothing is currently playing!")
+            return
+
+        try:
+            seconds = parse_timestamp(position)
+        except ValueError:
+            await ctx.send("❌ Invalid position! Use seconds, `mm:ss` or `hh:mm:ss`.")
+            return
+        track = player.current
+        if track.duration and seconds >= track.duration:
+            await ctx.send(
+                f"❌ **{track.title}** is only {format_timestamp(track.duration)} long!"
+            )
+            return
+
+        try:
+            if await player.seek(seconds):
+                await ctx.send(f"⏩ Jumped to {format_timestamp(seconds)}")
+                logger.info(
+                    f"Seeked to {seconds:.0f}s in '{track.title}' by {ctx.author.id} "
+                    f"in guild {ctx.guild.id}"
+                )
+            else:
+                await ctx.send("❌ The song changed, try again!")
+        except Exception as e:
+            logger.error(f"Error seeking in guild {ctx.guild.id}: {e}", exc_info=True)
+            await ctx.send(f"❌ Error seeking: {str(e)}")
+
     @commands.command()
     async def queue(self, ctx: commands.Context):
         """Show the current queue."""
@@ -221,18 +631,22 @@ class MusicBot(commands.Cog):
             f"Command !queue used by {ctx.author} (ID: {ctx.author.id}) "
             f"in {ctx.guild.name if ctx.guild else 'DM'}"
         )
-        if not self.queue:
+        player = self.players.get(ctx.guild.id) if ctx.guild else None
+        if not player or not player.queue:
             await ctx.send("📭 Queue is empty!")
             return
 
         queue_list = "\n".join(
-            [f"{i + 1}. {title}" for i, (url, title) in enumerate(self.queue)]
+            f"{i + 1}. {track.title}"
+            for i, track in enumerate(islice(player.queue, QUEUE_DISPLAY_LIMIT))
         )
+        if len(player.queue) > QUEUE_DISPLAY_LIMIT:
+            queue_list += f"\n...and {len(player.queue) - QUEUE_DISPLAY_LIMIT} more"
         embed = discord.Embed(
             title="Current Queue", description=queue_list, color=0x5A0C8A
         )
         await ctx.send(embed=embed)
-        logger.debug(f"Queue displayed to {ctx.author.id} - {len(self.queue)} item(s)")
+        logger.debug(f"Queue displayed to {ctx.author.id} - {len(player.queue)} item(s)")
 
     @commands.command()
     async def stop(self, ctx: commands.Context):
@@ -242,13 +656,14 @@ class MusicBot(commands.Cog):
             f"in {ctx.guild.name if ctx.guild else 'DM'}"
         )
         if ctx.voice_client:
-            self.queue.clear()
-            ctx.voice_client.stop()
-            await ctx.voice_client.disconnect()
+            player = self.players.get(ctx.guild.id)
+            if player:
+                await player.disconnect()
+            else:
+                ctx.voice_client.stop()
+                await ctx.voice_client.disconnect()
             await ctx.send("🛑 Stopped playing and disconnected!")
             logger.info(f"Music stopped and disconnected by {ctx.author.id}")
-            # Cancel timers
-            self.cancel_timers()
         else:
             logger.warning(
                 f"Stop command used by {ctx.author.id} but bot not in voice channel"
@@ -289,69 +704,32 @@ class MusicBot(commands.Cog):
             )
             await ctx.send("❌ Audio is not paused!")
 
-    def cancel_timers(self):
-        """Cancel all active timers"""
-        if self.disconnect_timer:
-            self.disconnect_timer.cancel()
-            self.disconnect_timer = None
-        if self.empty_channel_timer:
-            self.empty_channel_timer.cancel()
-            self.empty_channel_timer = None
-
-    def start_disconnect_timer(self, ctx: commands.Context):
-        """Start timer to disconnect after 30 seconds of inactivity."""
-        if self.disconnect_timer:
-            self.disconnect_timer.cancel()
-
-        async def disconnect_callback():
-            try:
-                if (
-                    ctx.voice_client
-                    and not ctx.voice_client.is_playing()
-                    and not ctx.voice_client.is_paused()
-                    and not self.queue
-                ):
-                    await ctx.send("🔌 Disconnecting due to inactivity...")
-                    await ctx.voice_client.disconnect()
-                    self.cancel_timers()
-                    logger.info("Disconnected from voice channel due to inactivity")
-            except Exception as e:
-                logger.error(f"Error in disconnect callback: {e}", exc_info=True)
-
-        self.disconnect_timer = asyncio.create_task(asyncio.sleep(30))
-        self.disconnect_timer.add_done_callback(
-            lambda _: asyncio.create_task(disconnect_callback())
-        )
-
-    def start_empty_channel_timer(self, ctx: commands.Context):
-        """Start timer to disconnect if voice channel is empty."""
-        if self.empty_channel_timer:
-            self.empty_channel_timer.cancel()
-
-        async def empty_channel_callback():
-            try:
-                if ctx.voice_client and ctx.voice_client.channel:
-                    # Count members excluding bots
-                    human_members = [
-                        m for m in ctx.voice_client.channel.members if not m.bot
-                    ]
-                    if len(human_members) == 0:
-                        await ctx.send(
-                            "🔌 Disconnecting because no one is in the voice channel..."
-                        )
-                        await ctx.voice_client.disconnect()
-                        self.cancel_timers()
-                        logger.info("Disconnected from voice channel - no members")
-                    else:
-                        # Restart timer if there are still people
-                        self.start_empty_channel_timer(ctx)
-            except Exception as e:
-                logger.error(f"Error in empty channel callback: {e}", exc_info=True)
-
-        self.empty_channel_timer = asyncio.create_task(asyncio.sleep(30))
-        self.empty_channel_timer.add_done_callback(
-            lambda _: asyncio.create_task(empty_channel_callback())
+    @commands.command()
+    async def musicstats(self, ctx: commands.Context):
+        """Show playback timing histograms."""
+        logger.info(
+            f"Command !musicstats used by {ctx.author} (ID: {ctx.author.id}) "
+            f"in {ctx.guild.name if ctx.guild else 'DM'}"
         )
+        try:
+            summary = format_histograms(self.metrics)
+            if not summary:
+                await ctx.send("📊 No playback data yet!")
+                return
+            embed = discord.Embed(
+                title="Music Playback Stats",
+                description=(
+                    f"{len(self.players)} active player(s), "
+                    f"since <t:{int(self.metrics.started)}:R>"
+                ),
+                color=0x5A0C8A,
+            )
+            for name, value in summary:
+                embed.add_field(name=name, value=value, inline=False)
+            await ctx.send(embed=embed)
+        except Exception as e:
+            logger.error(f"Error in musicstats command: {e}", exc_info=True)
+            await ctx.send(f"❌ An error occurred while getting music stats: {str(e)}")
 
     @commands.Cog.listener()
     async def on_command_error(
@@ -0,0 +1,103 @@
+"""
+Application command syncing for Elysium Discord Bot.
+
+Syncing the command tree is a global REST call with a tight rate limit, and
+on_ready fires again after every gateway reconnect. The tree is therefore
+fingerprinted (a SHA-256 of its serialized command definitions) and the
+fingerprint of the last successful sync is kept next to config.json. The
+tree is only synced when the fingerprint differs, at most once per process,
+unless an admin forces it with !sync.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Optional
+
+from discord import app_commands
+
+from config import get_data_path
+
+logger = logging.getLogger(__name__)
+
+COMMAND_TREE_FILE = "command_tree.sha256"
+
+# Set once this process has synced, later on_ready calls leave the tree alone
+_synced = False
+
+
+def command_tree_fingerprint(tree: app_commands.CommandTree) -> str:
+    """
+    Hash the global command definitions as Discord would receive them.
+
+    Args:
+        tree: The bot's command tree
+
+    Returns:
+        str: Hex SHA-256 of the serialized commands
+    """
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands()),
+        key=lambda command: (command.get("type", 1), command["name"]),
+    )
+    serialized = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def _read_fingerprint(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as fingerprint_file:
+            return fingerprint_file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _write_fingerprint(path: str, fingerprint: str) -> None:
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as fingerprint_file:
+        fingerprint_file.write(fingerprint + "\n")
+    os.replace(temp_path, path)
+
+
+async def sync_command_tree(tree: app_commands.CommandTree, force: bool = False) -> Optional[int]:
+    """
+    Sync the global commands with Discord if they changed since the last sync.
+
+    Args:
+        tree: The bot's command tree
+        force: Sync even if the fingerprint matches or this process already synced
+
+    Returns:
+        Optional[int]: Number of commands synced, or None if the sync was skipped
+
+    Raises:
+        discord.HTTPException: If syncing failed
+    """
+    global _synced
+    if _synced and not force:
+        logger.debug("Command tree already synced by this process")
+        return None
+
+    fingerprint = command_tree_fingerprint(tree)
+    path = None
+    saved = None
+    try:
+        path = get_data_path(COMMAND_TREE_FILE)
+        saved = _read_fingerprint(path)
+    except OSError as e:
+        logger.warning(f"Could not read command tree fingerprint: {e}")
+
+    if saved == fingerprint and not force:
+        _synced = True
+        logger.info(f"Command tree unchanged ({fingerprint[:12]}), skipping sync")
+        return None
+
+    synced = await tree.sync()
+    _synced = True
+    if path:
+        try:
+            _write_fingerprint(path, fingerprint)
+        except OSError as e:
+            logger.warning(f"Could not save command tree fingerprint: {e}")
+    logger.info(f"Synced {len(synced)} command(s), fingerprint {fingerprint[:12]}")
+    return len(synced)
@@ -7,14 +7,24 @@ from config.json with caching and validation.
 import json
 import os
 import logging
-from typing import Dict, Any, Optional
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # Windows, where only one bot process runs anyway
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
 # Cache for loaded config
 _config_cache: Optional[Dict[str, Any]] = None
 _config_path: Optional[str] = None
+# Modification time of config.json when it was last read or written
+_config_mtime: Optional[float] = None
+
+T = TypeVar("T")
 
 
 def get_config_path() -> str:
@@ -55,6 +65,22 @@ def get_config_path() -> str:
     )
 
 
+def get_data_path(filename: str) -> str:
+    """
+    Resolve a data file path relative to the directory holding config.json.
+    
+    Args:
+        filename: File name or path; absolute paths are returned unchanged
+        
+    Returns:
+        str: Absolute path to the data file
+    """
+    path = Path(filename)
+    if path.is_absolute():
+        return str(path)
+    return str(Path(get_config_path()).parent / path)
+
+
 def load_config(force_reload: bool = False) -> Dict[str, Any]:
     """
     Load configuration from config.json file with caching.
@@ -69,7 +95,7 @@ def load_config(force_reload: bool = False) -> Dict[str, Any]:
         FileNotFoundError: If config.json cannot be found
         json.JSONDecodeError: If config.json is not valid JSON
     """
-    global _config_cache
+    global _config_cache, _config_mtime
     
     if _config_cache is not None and not force_reload:
         return _config_cache
@@ -78,6 +104,7 @@ def load_config(force_reload: bool = False) -> Dict[str, Any]:
     
     try:
         with open(config_path, encoding='utf-8') as config_file:
+            _config_mtime = os.fstat(config_file.fileno()).st_mtime
             _config_cache = json.load(config_file)
             logger.info(f"Successfully loaded config from: {config_path}")
             return _config_cache
@@ -93,6 +120,8 @@ def save_config(config: Dict[str, Any]) -> None:
     """
     Save configuration to config.json file.
     
+    The file is replaced atomically, so other processes never read it half written.
+    
     Args:
         config: Configuration dictionary to save
         
@@ -100,20 +129,65 @@ def save_config(config: Dict[str, Any]) -> None:
         IOError: If config file cannot be written
     """
     config_path = get_config_path()
+    temp_path = f"{config_path}.{os.getpid()}.tmp"
     
     try:
-        with open(config_path, 'w', encoding='utf-8') as config_file:
+        with open(temp_path, 'w', encoding='utf-8') as config_file:
             json.dump(config, config_file, indent=4, ensure_ascii=False)
+        os.replace(temp_path, config_path)
         logger.info(f"Successfully saved config to: {config_path}")
         
         # Update cache
-        global _config_cache
+        global _config_cache, _config_mtime
         _config_cache = config
+        _config_mtime = os.path.getmtime(config_path)
     except IOError as e:
         logger.error(f"Error saving config file: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
         raise
 
 
+@contextmanager
+def _config_lock() -> Iterator[None]:
+    """Hold an exclusive lock on config.json across the processes of a cluster."""
+    if fcntl is None:
+        yield
+        return
+    with open(get_config_path() + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def update_config(edit: Callable[[Dict[str, Any]], T]) -> T:
+    """
+    Edit config.json without losing edits made by other processes.
+    
+    Under a file lock, the config is re-read from disk, passed to edit() and,
+    if edit() changed it, saved again. Blocks while another process holds the
+    lock, so call it from a worker thread.
+    
+    Args:
+        edit: Function changing the config dict in place, its result is returned
+        
+    Returns:
+        The result of edit()
+        
+    Raises:
+        IOError: If config file cannot be read or written
+    """
+    with _config_lock():
+        config = load_config(force_reload=True)
+        before = json.dumps(config, sort_keys=True)
+        result = edit(config)
+        if json.dumps(config, sort_keys=True) != before:
+            save_config(config)
+        return result
+
+
 def get_bot_config() -> Dict[str, Any]:
     """
     Get bot-specific configuration.
@@ -147,6 +221,39 @@ def get_moderation_config() -> Dict[str, Any]:
     return config.get("moderation", {})
 
 
+def get_music_config() -> Dict[str, Any]:
+    """
+    Get music-specific configuration.
+    
+    Returns:
+        dict: Music configuration section
+    """
+    config = load_config()
+    return config.get("music", {})
+
+
+def get_guild_moderation_config(guild_id: int) -> Dict[str, Any]:
+    """
+    Get moderation configuration for one guild.
+    
+    Per-guild settings live under moderation.guilds.<guild_id> and override
+    the global moderation settings key by key.
+    
+    Args:
+        guild_id: Discord guild ID
+        
+    Returns:
+        dict: Merged moderation configuration, with "version" set to a
+        (global version, guild version) tuple
+    """
+    moderation = get_moderation_config()
+    overrides = moderation.get("guilds", {}).get(str(guild_id), {})
+    merged = {key: value for key, value in moderation.items() if key != "guilds"}
+    merged.update(overrides)
+    merged["version"] = (moderation.get("version", 0), overrides.get("version", 0))
+    return merged
+
+
 def reload_config() -> Dict[str, Any]:
     """
     Force reload configuration from disk.
@@ -155,3 +262,18 @@ def reload_config() -> Dict[str, Any]:
         dict: Reloaded configuration dictionary
     """
     return load_config(force_reload=True)
+
+
+def reload_config_if_changed() -> Dict[str, Any]:
+    """
+    Reload configuration if config.json changed on disk since it was last
+    read, e.g. when another process of a cluster saved it.
+    
+    Returns:
+        dict: Current configuration dictionary
+    """
+    try:
+        changed = os.path.getmtime(get_config_path()) != _config_mtime
+    except OSError:
+        changed = False
+    return load_config(force_reload=changed)
@@ -0,0 +1,252 @@
+"""
+Perceptual image hashing for the moderation attachment blocklist.
+
+Hashes are computed by compute_hashes(), which is meant to run inside a
+process pool so that image decoding never blocks the event loop. Known-bad
+hashes are stored in BK-trees so lookups only visit hashes that can be within
+the allowed Hamming distance.
+"""
+import io
+import logging
+import math
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional - attachment scanning is disabled without it
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+HASH_KINDS = ("phash", "dhash")
+
+# pHash works on a 32x32 grayscale image and keeps the 8x8 lowest frequencies
+_DCT_SIZE = 32
+_DCT_KEEP = 8
+_DCT_COS = [
+    [
+        math.cos(math.pi * (2 * x + 1) * u / (2 * _DCT_SIZE))
+        for x in range(_DCT_SIZE)
+    ]
+    for u in range(_DCT_KEEP)
+]
+
+
+def pillow_available() -> bool:
+    """Check whether Pillow is installed."""
+    return Image is not None
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Count the differing bits between two hashes."""
+    return (a ^ b).bit_count()
+
+
+def dhash(image: "Image.Image", size: int = 8) -> int:
+    """
+    Compute a 64-bit difference hash.
+
+    Args:
+        image: Image to hash
+        size: Hash side length in bits
+
+    Returns:
+        int: Hash value
+    """
+    small = image.convert("L").resize((size + 1, size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return value
+
+
+def phash(image: "Image.Image") -> int:
+    """
+    Compute a 64-bit DCT perceptual hash.
+
+    Args:
+        image: Image to hash
+
+    Returns:
+        int: Hash value
+    """
+    small = image.convert("L").resize((_DCT_SIZE, _DCT_SIZE), Image.BILINEAR)
+    pixels = list(small.getdata())
+
+    # Separable DCT, only computing the low frequencies we keep
+    rows = [
+        [
+            sum(c * p for c, p in zip(cosines, pixels[y * _DCT_SIZE : (y + 1) * _DCT_SIZE]))
+            for cosines in _DCT_COS
+        ]
+        for y in range(_DCT_SIZE)
+    ]
+    coefficients = [
+        sum(cosines[y] * rows[y][u] for y in range(_DCT_SIZE))
+        for cosines in _DCT_COS
+        for u in range(_DCT_KEEP)
+    ]
+
+    # The DC term only reflects overall brightness, leave it out of the median
+    ac_terms = sorted(coefficients[1:])
+    median = ac_terms[len(ac_terms) // 2]
+    value = 0
+    for coefficient in coefficients:
+        value = (value << 1) | (coefficient > median)
+    return value
+
+
+def compute_hashes(data: bytes) -> Tuple[int, int]:
+    """
+    Decode an image and compute its perceptual hashes.
+
+    This is the process pool entry point, so it only takes and returns
+    picklable values.
+
+    Args:
+        data: Raw image file contents
+
+    Returns:
+        tuple: (phash, dhash)
+
+    Raises:
+        RuntimeError: If Pillow is not installed
+        OSError: If the data is not a readable image
+    """
+    if Image is None:
+        raise RuntimeError("Pillow is required for image hashing")
+
+    with Image.open(io.BytesIO(data)) as image:
+        # Let the JPEG decoder downscale while decoding, we only need 32x32
+        image.draft("L", (_DCT_SIZE * 2, _DCT_SIZE * 2))
+        image.load()
+        return phash(image), dhash(image)
+
+
+class BKTree:
+    """BK-tree of hashes indexed by Hamming distance."""
+
+    def __init__(self):
+        # Each node is (hash, label, {distance: child node})
+        self.root: Optional[Tuple[int, str, Dict[int, tuple]]] = None
+        self.size = 0
+
+    def add(self, value: int, label: str) -> None:
+        """
+        Add a hash to the tree.
+
+        Args:
+            value: Hash value
+            label: Description reported when the hash is matched
+        """
+        if self.root is None:
+            self.root = (value, label, {})
+            self.size = 1
+            return
+
+        node = self.root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                return  # Already present
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (value, label, {})
+                self.size += 1
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> Optional[Tuple[int, str]]:
+        """
+        Find the closest hash within max_distance.
+
+        Args:
+            value: Hash to look up
+            max_distance: Largest Hamming distance that counts as a match
+
+        Returns:
+            Optional[tuple]: (distance, label) of the best match, or None
+        """
+        if self.root is None:
+            return None
+
+        best: Optional[Tuple[int, str]] = None
+        stack = [self.root]
+        while stack:
+            node_value, label, children = stack.pop()
+            distance = hamming_distance(value, node_value)
+            if distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, label)
+                if distance == 0:
+                    break
+            # Triangle inequality: only subtrees in this band can hold a match
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(
+                child for d, child in children.items() if low <= d <= high
+            )
+        return best
+
+
+class ImageBlocklist:
+    """Known-bad image hashes, one BK-tree per hash kind."""
+
+    def __init__(self):
+        self.trees: Dict[str, BKTree] = {kind: BKTree() for kind in HASH_KINDS}
+
+    def __len__(self) -> int:
+        return sum(tree.size for tree in self.trees.values())
+
+    @classmethod
+    def from_file(cls, path: str) -> "ImageBlocklist":
+        """
+        Load a blocklist file.
+
+        Each line holds a hash kind, a hex hash and an optional label, e.g.
+        ``phash 8f3c0e1e3c3c7e7e spam-image``. Blank lines and lines starting
+        with ``#`` are ignored.
+
+        Args:
+            path: Path to the blocklist file
+
+        Returns:
+            ImageBlocklist: Loaded blocklist
+        """
+        blocklist = cls()
+        with open(path, encoding="utf-8") as blocklist_file:
+            for line_no, line in enumerate(blocklist_file, start=1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                parts = line.split(maxsplit=2)
+                try:
+                    kind, value = parts[0].lower(), int(parts[1], 16)
+                except (IndexError, ValueError):
+                    logger.warning(f"Invalid image hash on line {line_no} of {path}")
+                    continue
+                if kind not in blocklist.trees:
+                    logger.warning(f"Unknown hash kind '{kind}' on line {line_no} of {path}")
+                    continue
+                label = parts[2] if len(parts) > 2 else f"{kind}:{parts[1]}"
+                blocklist.trees[kind].add(value, label)
+        return blocklist
+
+    def match(self, hashes: Tuple[int, int], max_distance: int) -> Optional[str]:
+        """
+        Check image hashes against the blocklist.
+
+        Args:
+            hashes: (phash, dhash) as returned by compute_hashes()
+            max_distance: Largest Hamming distance that counts as a match
+
+        Returns:
+            Optional[str]: Label of the matched entry, or None
+        """
+        matches: List[Tuple[int, str]] = []
+        for kind, value in zip(HASH_KINDS, hashes):
+            found = self.trees[kind].search(value, max_distance)
+            if found:
+                matches.append(found)
+        return min(matches)[1] if matches else None
@@ -0,0 +1,218 @@
+"""
+Link and invite scanning for the moderation cog.
+
+URLs are pulled out of messages with a single compiled scanner, and their
+hosts are checked against allow/deny lists stored in reversed-label tries,
+so a lookup costs one step per label of the host no matter how many domains
+are listed.
+"""
+import logging
+import os
+import re
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# One pass finds both full URLs and bare invite links. Hosts are limited to
+# hostname characters (\w covers IDNs), so markdown and punctuation around a
+# link, as in [text](https://evil.com) or **https://evil.com**, stay out of it
+LINK_SCANNER = re.compile(
+    r"(?:https?://|\bwww\.)(?:[^\s/?#<>@]*@)?(?P<host>[\w.-]+)(?P<path>/[^\s<>|]*)?"
+    r"|\b(?P<invite>discord(?:app)?\.com/invite/[\w-]+|discord\.gg/[\w-]+)",
+    re.IGNORECASE,
+)
+
+INVITE_HOSTS = {"discord.gg", "discord.com", "discordapp.com"}
+
+# Key marking that the labels walked so far form a listed domain
+_TERMINAL = ""
+TrieNode = Dict[str, Union["TrieNode", bool]]
+
+
+def normalize_host(host: str) -> str:
+    """Lowercase a host and strip the www. prefix and trailing dots, dashes and underscores."""
+    # Markdown around a link, e.g. __https://evil.com__, would otherwise stay on the host
+    host = host.lower().rstrip("._-")
+    return host[4:] if host.startswith("www.") else host
+
+
+def extract_links(content: str) -> Iterator[Tuple[str, str]]:
+    """
+    Find the links in a message.
+
+    Args:
+        content: Message content
+
+    Yields:
+        tuple: (normalized host, path) for each link; invites are reported
+        with the host "discord.gg"
+    """
+    for match in LINK_SCANNER.finditer(content):
+        invite = match.group("invite")
+        if invite:
+            yield "discord.gg", "/" + invite.split("/", 1)[1]
+        else:
+            yield normalize_host(match.group("host")), match.group("path") or ""
+
+
+def is_invite(host: str, path: str) -> bool:
+    """Check whether a link is a Discord server invite."""
+    if host == "discord.gg":
+        return len(path) > 1
+    return host in INVITE_HOSTS and path.lower().startswith("/invite/")
+
+
+class DomainTrie:
+    """Domain suffix set stored as a trie of reversed labels."""
+
+    def __init__(self):
+        # Leaf domains are stored as True rather than an empty dict to save memory
+        self.root: TrieNode = {}
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, domain: str) -> None:
+        """
+        Add a domain; it also covers all of its subdomains.
+
+        Args:
+            domain: Domain such as "example.com" or "*.example.com"
+        """
+        domain = normalize_host(domain.strip())
+        if domain.startswith("*."):
+            domain = domain[2:]
+        if not domain:
+            return
+
+        labels = domain.split(".")[::-1]
+        node = self.root
+        for label in labels[:-1]:
+            child = node.get(label)
+            if child is None:
+                child = node[label] = {}
+            elif child is True:
+                child = node[label] = {_TERMINAL: True}
+            node = child
+
+        last = labels[-1]
+        child = node.get(last)
+        if child is None:
+            node[last] = True
+        elif child is not True and _TERMINAL not in child:
+            child[_TERMINAL] = True
+        else:
+            return  # Already listed
+        self.size += 1
+
+    def match(self, host: str) -> Optional[str]:
+        """
+        Find the most specific listed domain that covers a host.
+
+        Args:
+            host: Normalized host name
+
+        Returns:
+            Optional[str]: The listed domain, or None
+        """
+        labels = host.split(".")
+        node: Union[TrieNode, bool] = self.root
+        matched_depth = 0
+        for depth, label in enumerate(reversed(labels), start=1):
+            child = node.get(label)
+            if child is None:
+                break
+            if child is True:
+                matched_depth = depth
+                break
+            if _TERMINAL in child:
+                matched_depth = depth
+            node = child
+        if not matched_depth:
+            return None
+        return ".".join(labels[-matched_depth:])
+
+
+def load_domain_file(path: str) -> DomainTrie:
+    """
+    Load a domain list file into a trie.
+
+    Each line holds one domain. Hosts-file style lines such as
+    ``0.0.0.0 example.com`` are accepted, and blank lines and lines starting
+    with ``#`` are ignored.
+
+    Args:
+        path: Path to the domain list
+
+    Returns:
+        DomainTrie: Loaded domains
+    """
+    trie = DomainTrie()
+    with open(path, encoding="utf-8") as domain_file:
+        for line in domain_file:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                trie.add(line.split()[-1])
+    return trie
+
+
+class DomainList:
+    """A domain list file that is reloaded when it changes on disk."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime: Optional[float] = None
+        self.trie = DomainTrie()
+
+    def needs_reload(self) -> bool:
+        """Check whether the file changed since it was last loaded."""
+        try:
+            return os.path.getmtime(self.path) != self.mtime
+        except OSError:
+            return False
+
+    def reload(self) -> int:
+        """
+        Load the file again. Meant to be run in a worker thread.
+
+        Returns:
+            int: Number of domains loaded
+        """
+        mtime = os.path.getmtime(self.path)
+        trie = load_domain_file(self.path)
+        # Swap in one assignment so lookups never see a half-built trie
+        self.trie, self.mtime = trie, mtime
+        return len(trie)
+
+
+def check_links(
+    content: str,
+    allowlist: Optional[DomainTrie],
+    denylist: Optional[DomainTrie],
+    block_invites: bool,
+) -> Optional[Tuple[str, str]]:
+    """
+    Check the links in a message against the link rules.
+
+    The most specific listed domain wins, and the allowlist wins ties.
+
+    Returns:
+        Optional[tuple]: (rule, reason) for flagging the message, or None
+    """
+    for host, path in extract_links(content):
+        if is_invite(host, path):
+            if block_invites:
+                return "invite", "server invite"
+            continue
+        if denylist is None:
+            continue
+        denied = denylist.match(host)
+        if not denied:
+            continue
+        allowed = allowlist.match(host) if allowlist is not None else None
+        if allowed and len(allowed) >= len(denied):
+            continue
+        return f"link:{denied}", f"blocked link ({denied})"
+    return None
+
@@ -0,0 +1,165 @@
+"""
+Loudness normalization for the music cog.
+
+Each track's integrated loudness is measured once, in the background with a
+small pool of ffmpeg processes, and the gain needed to bring it to a common
+target is kept in a JSON index keyed by video ID. Later plays apply that gain
+as a static volume filter, which costs next to nothing compared to running
+ffmpeg's realtime loudnorm filter on every stream.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+from typing import Dict, Optional
+
+from music_player import FFMPEG_PATH
+
+logger = logging.getLogger(__name__)
+
+# YouTube normalizes its own player to about -14 LUFS
+LOUDNESS_TARGET = -14.0
+# Gains are capped, boosting a quiet track too far only makes it clip
+LOUDNESS_MAX_BOOST = 6.0
+LOUDNESS_MAX_CUT = -20.0
+# Smaller corrections are not audible and not worth re-encoding an Opus stream for
+LOUDNESS_TOLERANCE = 1.0
+# ffmpeg analysis processes running at once
+LOUDNESS_WORKERS = 2
+# Long mixes are only measured up to here, the analysis has to read every second of them
+LOUDNESS_MAX_ANALYSIS = 10 * 60
+# ebur128 reports silence as -70 LUFS
+_SILENCE = -70.0
+
+_INTEGRATED = re.compile(r"I:\s+(-?[\d.]+) LUFS")
+
+
+class LoudnessIndex:
+    """Video ID -> gain index, filled by background loudness analysis."""
+
+    def __init__(
+        self,
+        path: str,
+        target: float = LOUDNESS_TARGET,
+        workers: int = LOUDNESS_WORKERS,
+    ):
+        """
+        Create the index. Call load() to read the gains measured on earlier runs.
+
+        Args:
+            path: JSON file holding the index
+            target: Integrated loudness to normalize to, in LUFS
+            workers: ffmpeg analysis processes running at once
+        """
+        self.path = path
+        self.target = target
+        # Video ID -> measured integrated loudness in LUFS
+        self.loudness: Dict[str, float] = {}
+        self.analyzing: set = set()
+        self._workers = asyncio.Semaphore(max(1, workers))
+        self._save_lock = asyncio.Lock()
+
+    def load(self) -> int:
+        """
+        Read the index file. Meant to run in a thread.
+
+        Returns:
+            int: Number of tracks in the index
+        """
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as index_file:
+                self.loudness = {
+                    video_id: float(value) for video_id, value in json.load(index_file).items()
+                }
+        return len(self.loudness)
+
+    def _write(self, loudness: Dict[str, float]) -> None:
+        # Other processes of a cluster write the same file, keep what they measured
+        try:
+            with open(self.path, "r", encoding="utf-8") as index_file:
+                loudness = {**json.load(index_file), **loudness}
+        except (OSError, ValueError):
+            pass
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as index_file:
+            json.dump(loudness, index_file, separators=(",", ":"))
+        os.replace(temp_path, self.path)
+
+    async def save(self) -> None:
+        """Write the index file atomically from a worker thread."""
+        async with self._save_lock:
+            await asyncio.to_thread(self._write, dict(self.loudness))
+
+    def gain(self, video_id: str) -> float:
+        """
+        Get the gain to apply to a track.
+
+        Args:
+            video_id: YouTube video ID
+
+        Returns:
+            float: Gain in dB, 0 if the track is unmeasured or already close enough
+        """
+        loudness = self.loudness.get(video_id)
+        if loudness is None or loudness <= _SILENCE:
+            return 0.0
+        gain = min(LOUDNESS_MAX_BOOST, max(LOUDNESS_MAX_CUT, self.target - loudness))
+        return gain if abs(gain) >= LOUDNESS_TOLERANCE else 0.0
+
+    def needs_analysis(self, video_id: str) -> bool:
+        """Check whether a track still has to be measured."""
+        return video_id not in self.loudness and video_id not in self.analyzing
+
+    async def analyze(self, video_id: str, source: str) -> Optional[float]:
+        """
+        Measure a track's integrated loudness and add it to the index.
+
+        Args:
+            video_id: YouTube video ID
+            source: Stream URL or local file to read the audio from
+
+        Returns:
+            Optional[float]: Integrated loudness in LUFS, or None on failure
+        """
+        self.analyzing.add(video_id)
+        reconnect = []
+        if source.startswith(("http://", "https://")):
+            reconnect = ["-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "5"]
+        process = None
+        try:
+            async with self._workers:
+                process = await asyncio.create_subprocess_exec(
+                    str(FFMPEG_PATH),
+                    "-nostdin", "-hide_banner", "-nostats", "-loglevel", "info",
+                    *reconnect,
+                    "-t", str(LOUDNESS_MAX_ANALYSIS), "-i", source,
+                    "-vn", "-threads", "1", "-af", "ebur128=framelog=verbose",
+                    "-f", "null", "-",
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+                _, stderr = await process.communicate()
+            output = stderr.decode(errors="replace")
+            # The summary comes last, earlier matches would be per-frame values
+            matches = _INTEGRATED.findall(output)
+            if process.returncode != 0 or not matches:
+                raise RuntimeError(output.strip()[-200:])
+
+            loudness = float(matches[-1])
+            self.loudness[video_id] = loudness
+            await self.save()
+            logger.info(
+                f"Measured loudness of {video_id}: {loudness:.1f} LUFS "
+                f"(gain {self.gain(video_id):+.1f} dB)"
+            )
+            return loudness
+        except asyncio.CancelledError:
+            if process and process.returncode is None:
+                process.kill()
+            raise
+        except Exception as e:
+            logger.warning(f"Could not measure loudness of {video_id}: {e}")
+            return None
+        finally:
+            self.analyzing.discard(video_id)
@@ -1,7 +1,13 @@
+import ast
 import asyncio
+import importlib
 import logging
 import os
-from typing import Final
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Process start, for the startup timing report
+STARTED_AT = time.perf_counter()
 
 # Configure logging FIRST before any other imports that might create loggers
 logging.basicConfig(
@@ -14,83 +20,315 @@ import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 
+from command_sync import sync_command_tree
 from config import get_bot_config
+from sharding import cluster_name, format_shard_ids, is_primary, shard_settings
+from utils import process_rss_mib
 
 # Get loggers for all modules
 logger = logging.getLogger(__name__)
 discord_logger = logging.getLogger("discord")
 discord_logger.setLevel(logging.INFO)  # Set discord.py logging level
 
-# Load .env file
-load_dotenv()
+# Set up by setup(). Spawned worker processes (e.g. the image hashing pool)
+# re-import this file as __mp_main__, so nothing here may read the config,
+# check the token or create the bot at import time.
+public_log: Optional[int] = None
+private_log: Optional[int] = None
+low_memory = False
+sharded = False
+TOKEN = ""
+Client: Optional[commands.Bot] = None
+
+
+def load_bot_settings() -> None:
+    """Read the log channels and startup modes from the bot config."""
+    global public_log, private_log, low_memory, sharded
+    try:
+        bot_config = get_bot_config()
+        public_log = bot_config.get("public_log")
+        private_log = bot_config.get("private_log")
+        low_memory = bool(bot_config.get("low_memory", False))
+        sharded = bool(bot_config.get("sharded", False))
+
+        if not public_log or not private_log:
+            logger.warning("Public or private log channel IDs not found in config")
+    except Exception as e:
+        logger.error(f"Error loading bot config: {e}")
+
+
+COGS_DIR = os.path.join(os.path.dirname(__file__), "cogs")
+# Intents the bot itself needs: guild and channel caches, and "!" prefix commands
+BASE_INTENTS = ("guilds", "guild_messages", "dm_messages", "message_content")
+
+
+def cog_requirements(cogs_dir: str) -> Optional[Tuple[Set[str], Set[str]]]:
+    """
+    Collect the intents and member cache flags the cogs declare, without
+    importing them (the intents are needed before the client exists).
+
+    Each cog lists them in module-level REQUIRED_INTENTS and, optionally,
+    MEMBER_CACHE_FLAGS tuples.
+
+    Args:
+        cogs_dir: Directory holding the cog files
+
+    Returns:
+        Optional[tuple]: (intent names, member cache flag names), or None if a
+        cog does not declare its intents
+    """
+    intent_names: Set[str] = set(BASE_INTENTS)
+    cache_flags: Set[str] = set()
+    for filename in sorted(os.listdir(cogs_dir)):
+        if not filename.endswith(".py") or filename.startswith("__"):
+            continue
+        with open(os.path.join(cogs_dir, filename), "r", encoding="utf-8") as cog_file:
+            module = ast.parse(cog_file.read(), filename)
+        declared = {}
+        for node in module.body:
+            if isinstance(node, ast.Assign) and len(node.targets) == 1:
+                target = node.targets[0]
+                if isinstance(target, ast.Name) and target.id in (
+                    "REQUIRED_INTENTS",
+                    "MEMBER_CACHE_FLAGS",
+                ):
+                    declared[target.id] = ast.literal_eval(node.value)
+        if "REQUIRED_INTENTS" not in declared:
+            logger.warning(f"{filename} does not declare REQUIRED_INTENTS")
+            return None
+        intent_names.update(declared["REQUIRED_INTENTS"])
+        cache_flags.update(declared.get("MEMBER_CACHE_FLAGS", ()))
+    return intent_names, cache_flags
+
+
+def client_options() -> Dict[str, Any]:
+    """Get the intents, and in low-memory mode the trimmed caches, for the bot."""
+    if low_memory:
+        try:
+            requirements = cog_requirements(COGS_DIR)
+        except (OSError, SyntaxError, ValueError) as e:
+            logger.error(f"Error reading cog intents: {e}")
+            requirements = None
+        if requirements:
+            intent_names, cache_flags = requirements
+            intents = discord.Intents.none()
+            for name in intent_names:
+                setattr(intents, name, True)
+            member_cache_flags = discord.MemberCacheFlags.none()
+            for name in cache_flags:
+                setattr(member_cache_flags, name, True)
+            logger.info(
+                f"Low-memory mode: intents {', '.join(sorted(intent_names))}; "
+                f"member cache {', '.join(sorted(cache_flags)) or 'off'}"
+            )
+            # No member chunking either, guilds are ready as soon as they arrive
+            return {
+                "intents": intents,
+                "member_cache_flags": member_cache_flags,
+                "chunk_guilds_at_startup": False,
+            }
+        logger.warning("Low-memory mode unavailable, starting with all intents")
+
+    # Declare intents
+    intents = discord.Intents.all()
+    intents.message_content = True
+    return {"intents": intents}
+
+
+def create_client() -> commands.Bot:
+    """
+    Create the bot. Started by cluster.py, or with "sharded" set in the config,
+    it is an AutoShardedBot connecting its shards over one process.
+    """
+    options = client_options()
+    shard_ids, shard_count = shard_settings()
+    if shard_count is not None:
+        logger.info(
+            f"Starting {cluster_name()} with shard(s) {format_shard_ids(shard_ids)} "
+            f"of {shard_count}"
+        )
+        return commands.AutoShardedBot(
+            command_prefix="!", shard_ids=shard_ids, shard_count=shard_count, **options
+        )
+    if sharded:
+        # Discord's recommended shard count is fetched on login
+        logger.info("Starting with automatic sharding")
+        return commands.AutoShardedBot(command_prefix="!", **options)
+    return commands.Bot(command_prefix="!", **options)
+
+
+# Cog name -> (dependency import ms, load ms, error), reported once the bot is ready
+cog_timings: Dict[str, tuple[float, float, Optional[str]]] = {}
+# Resident memory once the cogs are loaded, before any guild data is cached
+rss_after_load: Optional[float] = None
+startup_reported = False
+
+
+def cog_dependencies(cog_name: str) -> List[str]:
+    """
+    List the modules a cog imports at the top of its file.
+
+    Imports inside try blocks are left out, those are optional dependencies
+    the cog handles missing itself.
+
+    Args:
+        cog_name: Module name inside the cogs package
 
-# Load config for channel IDs
-try:
-    bot_config = get_bot_config()
-    public_log = bot_config.get("public_log")
-    private_log = bot_config.get("private_log")
+    Returns:
+        list: Absolute module names
+    """
+    path = os.path.join(COGS_DIR, f"{cog_name}.py")
+    with open(path, "r", encoding="utf-8") as cog_file:
+        module = ast.parse(cog_file.read(), path)
+    names = []
+    for node in module.body:
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.append(node.module)
+    return names
 
-    if not public_log or not private_log:
-        logger.warning("Public or private log channel IDs not found in config")
-except Exception as e:
-    logger.error(f"Error loading bot config: {e}")
-    public_log = None
-    private_log = None
 
-# Load Client token from environment variables
-TOKEN: Final[str] = os.getenv("ELYSIUM_TOKEN") or ""
+def import_dependencies(cog_name: str) -> None:
+    for name in cog_dependencies(cog_name):
+        importlib.import_module(name)
 
-if not TOKEN:
-    logger.error("ELYSIUM_TOKEN not found in environment variables!")
-    raise ValueError("Bot token is required. Please set ELYSIUM_TOKEN in .env file")
 
+async def import_cog(cog_name: str) -> Tuple[float, Optional[str]]:
+    """
+    Import a cog's dependencies in a worker thread.
 
-# Declare intents
-intents = discord.Intents.all()
-intents.message_content = True
+    The cog module itself is left to load_extension(), which always executes
+    it afresh, so only the modules it imports are loaded ahead of time.
 
-# Initialize the Client
-Client = commands.Bot(command_prefix="!", intents=intents)
+    Args:
+        cog_name: Module name inside the cogs package
+
+    Returns:
+        tuple: (import time in milliseconds, error message or None)
+    """
+    start = time.perf_counter()
+    error = None
+    try:
+        await asyncio.to_thread(import_dependencies, cog_name)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        logger.error(f"❌ Failed to import dependencies of {cog_name}.py Cog: {error}")
+    return (time.perf_counter() - start) * 1000, error
+
+
+async def load_cog(cog_name: str, import_ms: float, import_error: Optional[str]) -> None:
+    """Load one cog extension, recording how long it took."""
+    filename = f"{cog_name}.py"
+    if import_error:
+        cog_timings[cog_name] = (import_ms, 0.0, import_error)
+        return
+    start = time.perf_counter()
+    error = None
+    try:
+        await Client.load_extension(f"cogs.{cog_name}")
+        logger.info(f"✅ {filename} Cog Loaded!")
+    except commands.ExtensionError as e:
+        error = str(e)
+        logger.error(f"❌ Failed to load {filename} Cog: {e}")
+    except Exception as e:
+        error = str(e)
+        logger.error(f"❌ Unexpected error loading {filename} Cog: {e}", exc_info=True)
+    cog_timings[cog_name] = (import_ms, (time.perf_counter() - start) * 1000, error)
 
 
 async def load():
     """Load all cogs from the cogs directory."""
-    cogs_dir = os.path.join(os.path.dirname(__file__), "cogs")
+    cogs_dir = COGS_DIR
 
     if not os.path.exists(cogs_dir):
         logger.error(f"Cogs directory not found: {cogs_dir}")
         return
 
-    for filename in os.listdir(cogs_dir):
-        if filename.endswith(".py") and not filename.startswith("__"):
-            cog_name = filename[:-3]  # Remove .py extension
-            try:
-                await Client.load_extension(f"cogs.{cog_name}")
-                logger.info(f"✅ {filename} Cog Loaded!")
-            except commands.ExtensionError as e:
-                logger.error(f"❌ Failed to load {filename} Cog: {e}")
-            except Exception as e:
-                logger.error(
-                    f"❌ Unexpected error loading {filename} Cog: {e}", exc_info=True
-                )
+    cog_names = sorted(
+        filename[:-3]  # Remove .py extension
+        for filename in os.listdir(cogs_dir)
+        if filename.endswith(".py") and not filename.startswith("__")
+    )
+    # Dependencies are imported side by side in threads so the loop stays free;
+    # load_extension() then only executes each cog module itself
+    imports = await asyncio.gather(*(import_cog(name) for name in cog_names))
+    # Cogs do not depend on each other, so their cog_load() I/O can overlap too
+    await asyncio.gather(
+        *(
+            load_cog(name, import_ms, import_error)
+            for name, (import_ms, import_error) in zip(cog_names, imports)
+        )
+    )
+
+
+async def send_startup_report(channel: discord.abc.Messageable) -> None:
+    """Send the per-cog load times to the private log channel."""
+    lines = []
+    for cog_name, (import_ms, load_ms, error) in sorted(
+        cog_timings.items(), key=lambda item: -(item[1][0] + item[1][1])
+    ):
+        status = f"❌ {error[:80]}" if error else "✅"
+        lines.append(
+            f"{status} `{cog_name}` - dependencies {import_ms:.0f} ms, load {load_ms:.0f} ms"
+        )
+    embed = discord.Embed(
+        title="Startup Timing",
+        description="\n".join(lines) or "No cogs loaded.",
+    )
+    footer = f"Ready {time.perf_counter() - STARTED_AT:.1f}s after start"
+    if Client.shard_count and Client.shard_count > 1:
+        footer = f"{cluster_name().capitalize()} · {footer}"
+    rss_ready = process_rss_mib()
+    if rss_after_load is not None and rss_ready is not None:
+        footer += f" · RSS {rss_after_load:.0f} MiB after loading, {rss_ready:.0f} MiB when ready"
+    if low_memory:
+        footer += " · low-memory mode"
+    embed.set_footer(text=footer)
+    try:
+        await channel.send(embed=embed)
+    except discord.Forbidden:
+        logger.warning(f"No permission to send startup report to private log channel {private_log}")
+    except Exception as e:
+        logger.error(f"Error sending startup report: {e}")
+
+
+def log_channel(channel_id: int) -> discord.abc.Messageable:
+    """Get a log channel from the cache, or a partial channel to send to by ID."""
+    return Client.get_channel(channel_id) or Client.get_partial_messageable(channel_id)
 
 
-@Client.event
 async def on_ready():
     """Event handler for when the bot is ready."""
-    logger.info(f"Bot logged in as {Client.user} (ID: {Client.user.id})")
+    global startup_reported
+    rss = process_rss_mib()
+    logger.info(
+        f"Bot logged in as {Client.user} (ID: {Client.user.id})"
+        + (f", RSS {rss:.0f} MiB" if rss is not None else "")
+    )
 
-    channel1 = Client.get_channel(public_log) if public_log else None
-    channel2 = Client.get_channel(private_log) if private_log else None
+    # In a cluster the log channels' guilds may be on another process's shards
+    # and missing from this cache, so fall back to sending by ID
+    primary = is_primary(Client)
+    # Only the private log hears from every process
+    channel1 = log_channel(public_log) if public_log and primary else None
+    channel2 = log_channel(private_log) if private_log else None
 
     try:
-        synced = await Client.tree.sync()
-        logger.info(f"Synced {len(synced)} command(s)")
+        # Commands are global, one process syncing them is enough
+        synced = await sync_command_tree(Client.tree) if primary else None
+        if synced is None:
+            command_count = f"{len(Client.tree.get_commands())} (unchanged)"
+        else:
+            command_count = str(synced)
 
-        boot_msg = discord.Embed(
-            title="𝓔𝓵𝔂𝓼𝓲𝓾𝓶",
-            description=f"**Status**: 🟢 Online\n**Synced Commands**: {len(synced)}",
-        )
+        description = f"**Status**: 🟢 Online\n**Synced Commands**: {command_count}"
+        if Client.shard_count and Client.shard_count > 1:
+            description += (
+                f"\n**Shards**: {format_shard_ids(Client.shard_ids or range(Client.shard_count))} "
+                f"of {Client.shard_count} ({cluster_name()})"
+            )
+        boot_msg = discord.Embed(title="𝓔𝓵𝔂𝓼𝓲𝓾𝓶", description=description)
 
         if channel1:
             try:
@@ -111,17 +349,48 @@ async def on_ready():
                 )
             except Exception as e:
                 logger.error(f"Error sending to private log channel: {e}")
+
+            # on_ready fires again after reconnects, the timings only matter once
+            if not startup_reported:
+                startup_reported = True
+                await send_startup_report(channel2)
     except discord.HTTPException as e:
         logger.error(f"Discord API error while syncing commands: {e}")
     except Exception as e:
         logger.error(f"Unexpected error in on_ready: {e}", exc_info=True)
 
 
+def setup() -> None:
+    """Load the .env file and config, then create the bot."""
+    global TOKEN, Client
+    # Load .env file
+    load_dotenv()
+    load_bot_settings()
+
+    # Load Client token from environment variables
+    TOKEN = os.getenv("ELYSIUM_TOKEN") or ""
+    if not TOKEN:
+        logger.error("ELYSIUM_TOKEN not found in environment variables!")
+        raise ValueError("Bot token is required. Please set ELYSIUM_TOKEN in .env file")
+
+    # Initialize the Client
+    Client = create_client()
+    Client.event(on_ready)
+
+
 async def main():
+    global rss_after_load
     async with Client:
         await load()
+        rss_after_load = process_rss_mib()
+        logger.info(
+            f"Loaded {len(cog_timings)} cog(s) in {time.perf_counter() - STARTED_AT:.2f}s since start"
+            + (f", RSS {rss_after_load:.0f} MiB" if rss_after_load is not None else "")
+        )
         await Client.start(TOKEN)
 
 
-# Run the Client
-asyncio.run(main())
+# Run the Client (guarded so spawned worker processes don't start a second bot)
+if __name__ == "__main__":
+    setup()
+    asyncio.run(main())
@@ -0,0 +1,184 @@
+"""
+Per-guild moderation rule sets for Elysium Discord Bot.
+
+Each guild's rules are compiled once into a GuildRules object; the
+moderation cog keeps compiled rule sets in an LRU keyed by guild and
+rule version, so editing a guild's rules simply produces a new key.
+"""
+import logging
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Set, Tuple
+
+from safe_regex import BudgetExceeded, PatternError, SafePattern
+
+logger = logging.getLogger(__name__)
+
+# What happens to a message that breaks a rule
+ACTIONS = ("delete", "alert", "timeout")
+DEFAULT_ACTION = "delete"
+
+# Time budgets for custom pattern rules, in milliseconds
+PATTERN_BUDGET_MS = 20
+PATTERN_RULE_BUDGET_MS = 5
+
+
+# A run of word characters; a plain word matches \bword\b exactly when it is one
+_TOKEN = re.compile(r"\w+")
+
+
+def compile_word_matcher(words: Iterable[str]) -> Optional[Pattern[str]]:
+    """
+    Compile blocked words into a single word-boundary regex.
+
+    The regex engine tries every alternative at every position, so this is
+    only used for the few entries that are not plain words (phrases, words
+    with symbols); plain words are looked up by token instead.
+
+    Args:
+        words: Lowercase words to match
+
+    Returns:
+        Optional[Pattern]: Compiled pattern, or None if there are no words
+    """
+    unique = sorted({w for w in words if w}, key=len, reverse=True)
+    if not unique:
+        return None
+    # Longest first so overlapping words report the most specific match
+    alternation = "|".join(re.escape(w) for w in unique)
+    return re.compile(r"\b(" + alternation + r")\b")
+
+
+def _id_set(values: Iterable[Any]) -> Set[int]:
+    """Convert configured IDs (ints, strings or mentions) to a set of ints."""
+    ids = set()
+    for value in values:
+        try:
+            ids.add(int(str(value).strip("<@&#>")))
+        except ValueError:
+            logger.warning(f"Ignoring invalid ID in moderation rules: {value}")
+    return ids
+
+
+class GuildRules:
+    """Compiled moderation rules for one guild."""
+
+    def __init__(self, guild_id: int, config: Dict[str, Any]):
+        """
+        Compile a guild's moderation config.
+
+        Args:
+            guild_id: Guild the rules belong to
+            config: Merged moderation config for the guild
+        """
+        self.guild_id = guild_id
+        self.version = config.get("version", 0)
+        self.mod_channel = config.get("mod_channel")
+        self.mod_role = config.get("mod_role")
+        self.exempt_roles = _id_set(config.get("exempt_roles", []))
+        self.exempt_channels = _id_set(config.get("exempt_channels", []))
+
+        action = str(config.get("action", DEFAULT_ACTION)).lower()
+        if action not in ACTIONS:
+            logger.warning(
+                f"Unknown moderation action '{action}' for guild {guild_id}, "
+                f"using '{DEFAULT_ACTION}'"
+            )
+            action = DEFAULT_ACTION
+        self.action = action
+        self.timeout_minutes = int(config.get("timeout_minutes", 10))
+        self.block_invites = bool(config.get("block_invites", False))
+        self.filter_links = bool(config.get("filter_links", True))
+        # Most distinct users/roles one message may mention, 0 for no limit
+        self.max_mentions = int(config.get("max_mentions", 0))
+
+        # Lowercased word -> word as configured, so alerts show the original
+        self.block_words = {
+            str(w).lower(): str(w) for w in config.get("block_words", []) if w
+        }
+        # Plain words are found with one tokenizing pass and set lookups
+        self.token_words = {w for w in self.block_words if _TOKEN.fullmatch(w)}
+        self.word_matcher = compile_word_matcher(
+            w for w in self.block_words if w not in self.token_words
+        )
+
+        # Custom pattern rules, compiled by the linear-time engine
+        self.patterns: List[Tuple[str, SafePattern]] = []
+        for rule in config.get("custom_rules", []):
+            if not rule.get("enabled", True):
+                continue
+            try:
+                self.patterns.append((rule["pattern"], SafePattern(rule["pattern"])))
+            except (KeyError, PatternError) as e:
+                logger.warning(f"Skipping invalid custom rule for guild {guild_id}: {e}")
+        self.pattern_budget = float(config.get("pattern_budget_ms", PATTERN_BUDGET_MS)) / 1000
+        self.pattern_rule_budget = (
+            float(config.get("pattern_rule_budget_ms", PATTERN_RULE_BUDGET_MS)) / 1000
+        )
+
+    def is_exempt(self, channel_id: int, role_ids: Iterable[int]) -> bool:
+        """
+        Check whether a channel or any of a member's roles is exempt.
+
+        Args:
+            channel_id: Channel the message was sent in
+            role_ids: IDs of the author's roles
+
+        Returns:
+            bool: True if the message should not be moderated
+        """
+        if channel_id in self.exempt_channels:
+            return True
+        return not self.exempt_roles.isdisjoint(role_ids)
+
+    def find_blocked_word(self, content: str) -> Optional[str]:
+        """
+        Find a blocked word in message content.
+
+        Args:
+            content: Message content
+
+        Returns:
+            Optional[str]: The blocked word as configured, or None
+        """
+        text = content.lower()
+        if self.token_words:
+            for token in _TOKEN.findall(text):
+                if token in self.token_words:
+                    return self.block_words[token]
+        if self.word_matcher is not None:
+            match = self.word_matcher.search(text)
+            if match:
+                return self.block_words[match.group(1)]
+        return None
+
+    def find_pattern_match(self, content: str) -> Tuple[Optional[str], List[str], bool]:
+        """
+        Run the custom pattern rules within the per-message time budget.
+
+        Args:
+            content: Message content
+
+        Returns:
+            tuple: (pattern that matched or None, patterns that ran past their
+            own budget, whether every rule got to finish)
+        """
+        text = content.lower()
+        message_deadline = time.perf_counter() + self.pattern_budget
+        over_budget: List[str] = []
+
+        for pattern_text, pattern in self.patterns:
+            started = time.perf_counter()
+            if started >= message_deadline:
+                return None, over_budget, False
+            rule_deadline = started + self.pattern_rule_budget
+            try:
+                if pattern.search(text, min(rule_deadline, message_deadline)):
+                    return pattern_text, over_budget, True
+            except BudgetExceeded:
+                # Only blame the rule if it used up its own budget
+                if time.perf_counter() >= rule_deadline:
+                    over_budget.append(pattern_text)
+                    continue
+                return None, over_budget, False
+        return None, over_budget, not over_budget
@@ -0,0 +1,250 @@
+"""
+Search and stream URL caches for the music cog.
+
+A yt-dlp search takes seconds, so the metadata of the video a query resolved
+to is cached by normalized query, and the resolved audio stream URL is cached
+by video ID. Stream URLs handed out by YouTube stop working at the time in
+their ``expire`` parameter, so each one is only kept until shortly before that.
+
+Tracks that have been played are also kept in a title index, which serves
+/play autocomplete suggestions without asking YouTube at all.
+"""
+import bisect
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from utils import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Search results change slowly, a query keeps resolving to the same video for hours
+SEARCH_CACHE_SIZE = 2048
+SEARCH_CACHE_TTL = 6 * 3600
+STREAM_CACHE_SIZE = 512
+# Used when a stream URL does not say when it expires
+STREAM_URL_DEFAULT_TTL = 1800
+# A cached URL must still be valid for ffmpeg to reconnect near the end of the track
+STREAM_URL_MIN_MARGIN = 600
+
+# Metadata kept per video; the full yt-dlp info dict is large
+TRACK_FIELDS = ("id", "title", "webpage_url", "duration")
+# Stream details kept per video
+STREAM_FIELDS = ("url", "acodec", "abr", "asr", "ext", "http_headers")
+# Most tracks the autocomplete index holds, the least played are dropped first
+TRACK_INDEX_SIZE = 5000
+# Autocomplete choices Discord accepts per response
+MAX_SUGGESTIONS = 25
+# Matches looked at before ranking, keeps very short prefixes cheap
+MAX_CANDIDATES = 500
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so trivially different spellings share an entry."""
+    return " ".join(query.casefold().split())
+
+
+def stream_url_ttl(url: str, duration: Optional[float] = None) -> float:
+    """
+    Work out how long a stream URL can be cached.
+
+    Args:
+        url: Stream URL returned by yt-dlp
+        duration: Track length in seconds, if known
+
+    Returns:
+        float: Seconds the URL can be reused for, 0 or less if not at all
+    """
+    margin = max(STREAM_URL_MIN_MARGIN, duration or 0)
+    try:
+        expire = parse_qs(urlparse(url).query).get("expire")
+        if expire:
+            return float(expire[0]) - time.time() - margin
+    except ValueError:
+        pass
+    return STREAM_URL_DEFAULT_TTL
+
+
+def video_url(video_id: str) -> str:
+    """Short link to a YouTube video."""
+    return f"https://youtu.be/{video_id}"
+
+
+def parse_video_id(text: str) -> Optional[str]:
+    """
+    Get the video ID from a YouTube video link.
+
+    Args:
+        text: Text that may be a youtu.be or youtube.com/watch link
+
+    Returns:
+        Optional[str]: Video ID, or None if the text is not a video link
+    """
+    url = urlparse(text.strip())
+    if url.scheme not in ("http", "https"):
+        return None
+    # Matched on whole labels, "notyoutube.com" is not YouTube
+    host = url.hostname or ""
+    if host == "youtu.be":
+        return url.path.strip("/") or None
+    if (host == "youtube.com" or host.endswith(".youtube.com")) and url.path == "/watch":
+        return parse_qs(url.query).get("v", [None])[0]
+    return None
+
+
+class TrackCache:
+    """Query -> track metadata and video ID -> stream URL caches."""
+
+    def __init__(
+        self,
+        search_size: int = SEARCH_CACHE_SIZE,
+        search_ttl: float = SEARCH_CACHE_TTL,
+        stream_size: int = STREAM_CACHE_SIZE,
+    ):
+        self.searches = TTLCache(search_size, search_ttl)
+        self.streams = TTLCache(stream_size, STREAM_URL_DEFAULT_TTL)
+
+    def get_track(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up the track a query resolved to before.
+
+        Args:
+            query: Search text as typed by the user
+
+        Returns:
+            Optional[dict]: Track metadata, or None if not cached
+        """
+        return self.searches.get(normalize_query(query))
+
+    def get_stream(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up an unexpired stream for a video.
+
+        Args:
+            video_id: YouTube video ID
+
+        Returns:
+            Optional[dict]: Stream details including "url", or None
+        """
+        return self.streams.get(video_id)
+
+    def store(
+        self, query: Optional[str], info: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Cache a yt-dlp result for a video.
+
+        Args:
+            query: Search text that led to the video, or None
+            info: yt-dlp info dict for a single video
+
+        Returns:
+            tuple: (track metadata, stream details)
+        """
+        track = {field: info.get(field) for field in TRACK_FIELDS}
+        track["title"] = track["title"] or "Unknown Title"
+        stream = {field: info.get(field) for field in STREAM_FIELDS}
+
+        if query:
+            self.searches.put(normalize_query(query), track)
+        if track["id"] and stream["url"]:
+            self.streams.put(
+                track["id"], stream, ttl=stream_url_ttl(stream["url"], track["duration"])
+            )
+        return track, stream
+
+
+class TrackIndex:
+    """
+    Prefix index over the titles of played tracks.
+
+    Every word of a title starts a key, so "never gonna" finds "Rick Astley -
+    Never Gonna Give You Up". The keys live in one sorted list searched with
+    bisect, and matches are ranked by how often the track was played.
+    """
+
+    def __init__(self, max_tracks: int = TRACK_INDEX_SIZE):
+        self.max_tracks = max_tracks
+        # Video ID -> track metadata plus "plays"
+        self.tracks: Dict[str, Dict[str, Any]] = {}
+        # Sorted (title suffix, video ID) pairs
+        self._keys: List[Tuple[str, str]] = []
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+    @staticmethod
+    def _title_keys(title: str) -> List[str]:
+        words = normalize_query(title).split(" ")
+        return [" ".join(words[i:]) for i in range(len(words)) if words[i]]
+
+    def add(self, track: Dict[str, Any], plays: int = 1) -> None:
+        """
+        Add a play of a track, indexing it if it is new.
+
+        Args:
+            track: Track metadata with "id" and "title"
+            plays: Plays to count
+        """
+        video_id = track["id"]
+        entry = self.tracks.get(video_id)
+        if entry is not None:
+            entry["plays"] += plays
+            return
+        if len(self.tracks) >= self.max_tracks:
+            self._remove(min(self.tracks, key=lambda key: self.tracks[key]["plays"]))
+        self.tracks[video_id] = {**track, "plays": plays}
+        for key in self._title_keys(track["title"]):
+            bisect.insort(self._keys, (key, video_id))
+
+    def load(self, tracks: Iterable[Dict[str, Any]]) -> None:
+        """
+        Build the index from saved tracks in one go.
+
+        Args:
+            tracks: Track metadata with "id", "title" and "plays"
+        """
+        self.tracks = {track["id"]: dict(track) for track in tracks}
+        while len(self.tracks) > self.max_tracks:
+            self.tracks.pop(min(self.tracks, key=lambda key: self.tracks[key]["plays"]))
+        self._keys = sorted(
+            (key, video_id)
+            for video_id, track in self.tracks.items()
+            for key in self._title_keys(track["title"])
+        )
+
+    def _remove(self, video_id: str) -> None:
+        track = self.tracks.pop(video_id)
+        for key in self._title_keys(track["title"]):
+            index = bisect.bisect_left(self._keys, (key, video_id))
+            if index < len(self._keys) and self._keys[index] == (key, video_id):
+                del self._keys[index]
+
+    def get(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """Get an indexed track's metadata."""
+        return self.tracks.get(video_id)
+
+    def search(self, prefix: str, limit: int = MAX_SUGGESTIONS) -> List[Dict[str, Any]]:
+        """
+        Find played tracks with a title word starting with the given text.
+
+        Args:
+            prefix: Text typed so far
+            limit: Most tracks to return
+
+        Returns:
+            list: Track metadata, most played first
+        """
+        prefix = normalize_query(prefix)
+        if not prefix:
+            matches = self.tracks.values()
+        else:
+            found: Dict[str, Dict[str, Any]] = {}
+            start = bisect.bisect_left(self._keys, (prefix, ""))
+            for key, video_id in self._keys[start : start + MAX_CANDIDATES]:
+                if not key.startswith(prefix):
+                    break
+                found[video_id] = self.tracks[video_id]
+            matches = found.values()
+        return sorted(matches, key=lambda track: track["plays"], reverse=True)[:limit]
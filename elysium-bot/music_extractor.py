@@ -0,0 +1,247 @@
+"""
+Bounded pool of yt-dlp extractors for the music cog.
+
+Extractions run on a dedicated set of threads, each holding its own
+long-lived YoutubeDL instance so extractor setup is paid once per thread
+instead of once per request. Identical queries that are already in flight
+share one extraction, and each user can only have one extraction running at
+a time, so one person spamming !play cannot occupy the whole pool.
+
+yt-dlp itself is only imported by the worker threads, the first time one of
+them needs it, so loading the music cog does not pay for it.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+if TYPE_CHECKING:
+    import yt_dlp
+
+logger = logging.getLogger(__name__)
+
+EXTRACTOR_WORKERS = 4
+# Requests one user may have waiting or running before further ones are refused
+MAX_PENDING_PER_USER = 3
+
+YDL_OPTIONS = {
+    # Prefer Opus so playback can copy the stream instead of re-encoding it
+    "format": "bestaudio[acodec=opus]/bestaudio/best",
+    "noplaylist": True,
+    "extractaudio": True,
+    "audioformat": "mp3",
+    "outtmpl": "%(extractor)s-%(id)s-%(title)s.%(ext)s",
+    "restrictfilenames": True,
+    "logtostderr": False,
+    "ignoreerrors": False,
+    "default_search": "auto",
+    "source_address": "0.0.0.0",  # Bind to ipv4 since ipv6 addresses cause issues sometimes
+}
+# Flat playlist entries yt-dlp marks as unplayable, by availability or placeholder title
+UNAVAILABLE = {"private", "needs_auth", "premium_only", "subscriber_only"}
+UNAVAILABLE_TITLES = {"[Private video]", "[Deleted video]"}
+# Playlists are only listed (IDs and titles), each track is extracted when it is due
+PLAYLIST_OPTIONS = {
+    **YDL_OPTIONS,
+    "noplaylist": False,
+    "extract_flat": "in_playlist",
+    "ignoreerrors": True,
+}
+
+
+def is_playlist_url(text: str) -> bool:
+    """Check whether !play was given a YouTube playlist link."""
+    url = urlparse(text.strip())
+    if url.scheme not in ("http", "https"):
+        return False
+    # Matched on whole labels, "notyoutube.com" is not YouTube
+    host = url.hostname or ""
+    if not (host == "youtube.com" or host.endswith(".youtube.com") or host == "youtu.be"):
+        return False
+    return url.path == "/playlist" or "list" in parse_qs(url.query)
+
+
+def is_available(entry: Dict[str, Any]) -> bool:
+    """Check whether a flat playlist entry can be played by anyone."""
+    if entry.get("availability") in UNAVAILABLE:
+        return False
+    return entry.get("title") not in UNAVAILABLE_TITLES
+
+
+class TooManyRequests(Exception):
+    """Raised when a user already has the maximum number of pending extractions."""
+
+
+class ExtractionError(Exception):
+    """Raised when yt-dlp fails to extract a video or playlist."""
+
+
+class ExtractorPool:
+    """Thread pool of warm YoutubeDL instances with request coalescing."""
+
+    def __init__(self, workers: int = EXTRACTOR_WORKERS, options: Optional[dict] = None):
+        """
+        Create the pool. Call warm() to start the threads ahead of time.
+
+        Args:
+            workers: Number of extractor threads
+            options: YoutubeDL options, YDL_OPTIONS by default
+        """
+        self.workers = max(1, workers)
+        self.options = options or YDL_OPTIONS
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="ytdl"
+        )
+        # Query -> the extraction every caller asking for it waits on
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._user_locks: Dict[int, asyncio.Lock] = {}
+        self._user_pending: Dict[int, int] = {}
+
+    def _ydl(self) -> "yt_dlp.YoutubeDL":
+        """Get the calling thread's YoutubeDL, creating it on first use."""
+        ydl = getattr(self._local, "ydl", None)
+        if ydl is None:
+            import yt_dlp
+
+            ydl = self._local.ydl = yt_dlp.YoutubeDL(self.options)
+        return ydl
+
+    def _playlist_ydl(self) -> "yt_dlp.YoutubeDL":
+        """Get the calling thread's flat-listing YoutubeDL, creating it on first use."""
+        ydl = getattr(self._local, "playlist_ydl", None)
+        if ydl is None:
+            import yt_dlp
+
+            ydl = self._local.playlist_ydl = yt_dlp.YoutubeDL(PLAYLIST_OPTIONS)
+        return ydl
+
+    def _run(self, extract, query: str) -> Dict[str, Any]:
+        """Run an extraction, turning yt-dlp's errors into ExtractionError."""
+        import yt_dlp
+
+        try:
+            return extract(query)
+        except yt_dlp.utils.DownloadError as e:
+            raise ExtractionError(str(e)) from e
+
+    def _extract(self, query: str) -> Dict[str, Any]:
+        info = self._ydl().extract_info(query, download=False)
+        if "entries" in info:
+            entries = [entry for entry in info["entries"] if entry]
+            if not entries:
+                raise LookupError(query)
+            info = entries[0]
+        return info
+
+    def _extract_playlist(self, url: str) -> Dict[str, Any]:
+        info = self._playlist_ydl().extract_info(url, download=False)
+        if not info or not info.get("entries"):
+            raise LookupError(url)
+        # Unavailable videos come back as None with ignoreerrors, or as flat
+        # entries marked private/deleted that would only fail once they are due
+        entries = [entry for entry in info["entries"] if entry and entry.get("id")]
+        info["entries"] = [entry for entry in entries if is_available(entry)]
+        info["unavailable"] = len(entries) - len(info["entries"])
+        return info
+
+    async def warm(self) -> None:
+        """Start every worker thread and build its YoutubeDL up front."""
+        loop = asyncio.get_running_loop()
+        # The barrier keeps each task on its own thread until all have started
+        barrier = threading.Barrier(self.workers)
+
+        def init_worker():
+            self._ydl()
+            try:
+                barrier.wait(timeout=10)
+            except threading.BrokenBarrierError:
+                pass
+
+        await asyncio.gather(
+            *(loop.run_in_executor(self._executor, init_worker) for _ in range(self.workers))
+        )
+        logger.info(f"Started {self.workers} yt-dlp extractor thread(s)")
+
+    async def extract(
+        self, query: str, user_id: Optional[int] = None, playlist: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Extract info for a query on the pool.
+
+        Args:
+            query: "ytsearch:" query or video URL
+            user_id: Requesting user, whose requests are run one at a time
+            playlist: List the query as a playlist instead, see extract_playlist()
+
+        Returns:
+            dict: Info dict of the first matching video
+
+        Raises:
+            TooManyRequests: If the user already has too many pending requests
+            LookupError: If the search found nothing
+            ExtractionError: If extraction failed
+        """
+        if user_id is None:
+            return await self._coalesced(query, playlist)
+
+        pending = self._user_pending.get(user_id, 0)
+        if pending >= MAX_PENDING_PER_USER:
+            raise TooManyRequests(user_id)
+        self._user_pending[user_id] = pending + 1
+        lock = self._user_locks.setdefault(user_id, asyncio.Lock())
+        try:
+            async with lock:
+                return await self._coalesced(query, playlist)
+        finally:
+            self._user_pending[user_id] -= 1
+            if not self._user_pending[user_id]:
+                del self._user_pending[user_id]
+                self._user_locks.pop(user_id, None)
+
+    async def extract_playlist(self, url: str, user_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        List a playlist's tracks without extracting each of them.
+
+        Args:
+            url: Playlist URL
+            user_id: Requesting user, whose requests are run one at a time
+
+        Returns:
+            dict: Playlist info dict whose "entries" hold "id", "title", "url"
+            and, where known, "duration"
+
+        Raises:
+            TooManyRequests: If the user already has too many pending requests
+            LookupError: If the playlist is empty or unavailable
+            ExtractionError: If extraction failed
+        """
+        return await self.extract(url, user_id, playlist=True)
+
+    async def _coalesced(self, query: str, playlist: bool = False) -> Dict[str, Any]:
+        key = ("playlist:" if playlist else "") + query
+        future = self._inflight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            extract = self._extract_playlist if playlist else self._extract
+            future = asyncio.ensure_future(
+                loop.run_in_executor(self._executor, self._run, extract, query)
+            )
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            logger.debug(f"Joining in-flight extraction for {query[:50]}")
+        # One caller giving up must not cancel the extraction for the others
+        return await asyncio.shield(future)
+
+    def _forget(self, query: str, future: asyncio.Future) -> None:
+        self._inflight.pop(query, None)
+        # Mark the error as seen in case every caller was cancelled meanwhile
+        if not future.cancelled():
+            future.exception()
+
+    def shutdown(self) -> None:
+        """Stop the worker threads, abandoning queued extractions."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
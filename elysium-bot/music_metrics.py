@@ -0,0 +1,207 @@
+"""
+Playback instrumentation for the music cog.
+
+Each stage of getting a track to Discord is timed into an in-process
+histogram: yt-dlp extraction, ffprobe, the wait for the first audio packet,
+the CPU and memory of every ffmpeg process, and how evenly the voice thread
+pulls frames. When playback stutters, !musicstats shows which stage is off.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Bucket upper bounds per unit; a last, open bucket catches everything above
+MS_BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+PERCENT_BOUNDS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200)
+MIB_BOUNDS = (8, 16, 32, 64, 128, 256, 512, 1024)
+
+# Name -> (description, unit, bucket bounds)
+METRICS: Dict[str, Tuple[str, str, Sequence[float]]] = {
+    "extraction": ("yt-dlp extraction", "ms", MS_BOUNDS),
+    "probe": ("ffprobe", "ms", MS_BOUNDS),
+    "first_packet": ("Time to first packet", "ms", MS_BOUNDS),
+    "ffmpeg_cpu": ("ffmpeg CPU", "% of a core", PERCENT_BOUNDS),
+    "ffmpeg_rss": ("ffmpeg peak memory", "MiB", MIB_BOUNDS),
+    "frame_jitter": ("Frame interval jitter", "ms", MS_BOUNDS),
+    "frame_lateness": ("Packet send lateness", "ms", MS_BOUNDS),
+}
+
+# A gap this long between reads is a pause, not lateness
+PAUSE_GAP = 0.25
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+class Histogram:
+    """Fixed-bucket histogram, safe to update from the voice threads."""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Add a value."""
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Estimate a percentile from the buckets.
+
+        Args:
+            fraction: Percentile as a fraction, e.g. 0.95
+
+        Returns:
+            float: Upper bound of the bucket holding the percentile, capped at
+            the largest value seen
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                bound = self.bounds[index] if index < len(self.bounds) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class MusicMetrics:
+    """The music cog's playback histograms."""
+
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {
+            name: Histogram(bounds) for name, (_, _, bounds) in METRICS.items()
+        }
+        self.started = time.time()
+
+    def observe(self, name: str, value: float) -> None:
+        """Add a value to a histogram."""
+        self.histograms[name].observe(value)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Time a block into a millisecond histogram, if it completes."""
+        start = time.perf_counter()
+        yield
+        self.observe(name, (time.perf_counter() - start) * 1000)
+
+
+class FrameClock:
+    """
+    Timing of the frames one audio source hands to the voice thread.
+
+    The voice thread sends each packet as soon as read() returns it, and aims
+    to do so every 20 ms, so read times show both jitter between packets and
+    how far sending has drifted behind schedule.
+    """
+
+    __slots__ = ("metrics", "frame_seconds", "requested_at", "first", "last", "frames")
+
+    def __init__(
+        self,
+        metrics: MusicMetrics,
+        frame_seconds: float,
+        requested_at: Optional[float] = None,
+    ):
+        """
+        Args:
+            metrics: Histograms to record into
+            frame_seconds: Audio per packet
+            requested_at: perf_counter() time playback was asked for
+        """
+        self.metrics = metrics
+        self.frame_seconds = frame_seconds
+        self.requested_at = requested_at
+        # Start of the current run of frames, reset after pauses
+        self.first = 0.0
+        self.last = 0.0
+        self.frames = 0
+
+    def tick(self) -> None:
+        """Record a packet being read."""
+        now = time.perf_counter()
+        if self.requested_at is not None:
+            self.metrics.observe("first_packet", (now - self.requested_at) * 1000)
+            self.requested_at = None
+        if self.frames:
+            interval = now - self.last
+            if interval < PAUSE_GAP:
+                self.metrics.observe(
+                    "frame_jitter", abs(interval - self.frame_seconds) * 1000
+                )
+                expected = self.first + self.frames * self.frame_seconds
+                self.metrics.observe("frame_lateness", max(0.0, now - expected) * 1000)
+            else:
+                # Paused or reconnected, the voice thread restarts its schedule too
+                self.first, self.frames = now, 0
+        else:
+            self.first = now
+        self.last = now
+        self.frames += 1
+
+
+def process_usage(pid: int) -> Optional[Tuple[float, float]]:
+    """
+    Read a process's CPU time and peak memory from /proc.
+
+    Args:
+        pid: Process ID
+
+    Returns:
+        Optional[tuple]: (CPU seconds, peak RSS in MiB), or None where /proc is
+        unavailable or the process is gone
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "r") as stat_file:
+            # The command name may contain spaces, the fields after it do not
+            fields = stat_file.read().rpartition(")")[2].split()
+        cpu_seconds = (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+        peak_kib = 0
+        with open(f"/proc/{pid}/status", "r") as status_file:
+            for line in status_file:
+                if line.startswith("VmHWM:"):
+                    peak_kib = int(line.split()[1])
+                    break
+        return cpu_seconds, peak_kib / 1024
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def format_histograms(metrics: MusicMetrics) -> List[Tuple[str, str]]:
+    """
+    Summarize every histogram with samples.
+
+    Returns:
+        list: (title, "count · p50 · p95 · p99 · max") pairs
+    """
+    lines = []
+    for name, (description, unit, _) in METRICS.items():
+        histogram = metrics.histograms[name]
+        if not histogram.count:
+            continue
+        p50, p95, p99 = (histogram.percentile(f) for f in (0.5, 0.95, 0.99))
+        lines.append(
+            (
+                f"{description} ({unit})",
+                f"n={histogram.count} · p50 {p50:.1f} · p95 {p95:.1f} · "
+                f"p99 {p99:.1f} · max {histogram.max:.1f}",
+            )
+        )
+    return lines
@@ -0,0 +1,629 @@
+"""
+Per-guild music playback for Elysium Discord Bot.
+
+Each guild that uses the music commands gets its own GuildPlayer holding its
+queue, the channel to report to and its playback state, so any number of guilds
+can play at once without sharing state. Players are created on first use by
+the music cog and dropped again when they disconnect.
+"""
+import asyncio
+import logging
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Optional
+
+import discord
+
+from music_metrics import FrameClock, process_usage
+
+logger = logging.getLogger(__name__)
+
+# Determine FFmpeg path based on OS
+if os.name == "nt":  # Windows
+    FFMPEG_PATH = Path(__file__).parent.parent / "bin" / "ffmpeg.exe"
+else:  # Linux/Mac
+    FFMPEG_PATH = Path(__file__).parent.parent / "bin" / "ffmpeg"
+
+# Fallback to system ffmpeg if not found in bin directory
+if not FFMPEG_PATH.exists():
+    FFMPEG_PATH = "ffmpeg"  # Use system ffmpeg
+
+FFMPEG_OPTIONS = {
+    "before_options": "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5",
+    "options": "-vn",
+    "executable": FFMPEG_PATH,
+}
+
+# Discord only carries 48 kHz Opus, anything else has to be re-encoded
+OPUS_SAMPLE_RATE = 48000
+DEFAULT_BITRATE = 128
+
+# Seconds before leaving when the queue runs out or the channel empties
+IDLE_TIMEOUT = 30
+# Idle deadline kinds, scheduled on the cog's DeadlineScheduler as (guild ID, kind)
+IDLE = "idle"
+EMPTY_CHANNEL = "empty"
+# Most tracks a guild's queue may hold
+MAX_QUEUE_LENGTH = 1000
+# Upcoming tracks whose stream URLs are resolved while the current one plays
+PREFETCH_DEPTH = 2
+# Tracks in a row that may fail before playback stops, e.g. while YouTube rate limits
+MAX_FAILED_TRACKS = 5
+# Seconds before the current track ends that the next track's ffmpeg is started
+PREFETCH_LEAD = 20
+# Audio sent per packet read from a source
+FRAME_SECONDS = discord.opus.Encoder.FRAME_LENGTH / 1000
+
+
+def ffmpeg_options(offset: float = 0.0, **options) -> dict:
+    """
+    Build FFmpegOpusAudio options that start playback at an offset.
+
+    ``-ss`` goes before ``-i`` so ffmpeg seeks in the input itself, on a remote
+    stream that means requesting the byte range at the offset rather than
+    downloading and decoding everything before it.
+
+    Args:
+        offset: Seconds into the track to start at
+        **options: Options to start from, FFMPEG_OPTIONS by default
+
+    Returns:
+        dict: Keyword arguments for FFmpegOpusAudio
+    """
+    options = options or dict(FFMPEG_OPTIONS)
+    if offset > 0:
+        options["before_options"] = f"-ss {offset:.3f} {options.get('before_options', '')}".strip()
+    return options
+
+
+def parse_timestamp(text: str) -> float:
+    """
+    Parse a position given as seconds, "mm:ss" or "hh:mm:ss".
+
+    Args:
+        text: Position as typed by the user
+
+    Returns:
+        float: Position in seconds
+
+    Raises:
+        ValueError: If the text is not a valid position
+    """
+    parts = text.strip().split(":")
+    if len(parts) > 3:
+        raise ValueError(text)
+    seconds = 0.0
+    for part in parts:
+        value = float(part)
+        if value < 0:
+            raise ValueError(text)
+        seconds = seconds * 60 + value
+    return seconds
+
+
+def format_timestamp(seconds: float) -> str:
+    """Format seconds as "m:ss", or "h:mm:ss" for an hour or more."""
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+class QueuedTrack:
+    """A track waiting in (or playing from) a guild's queue."""
+
+    __slots__ = ("video_id", "title", "webpage_url", "duration", "requester_id", "seq", "start_at")
+
+    def __init__(
+        self,
+        video_id: str,
+        title: str,
+        webpage_url: Optional[str] = None,
+        duration: Optional[float] = None,
+        requester_id: Optional[int] = None,
+    ):
+        self.video_id = video_id
+        self.title = title
+        self.webpage_url = webpage_url
+        self.duration = duration
+        self.requester_id = requester_id
+        # Position in the guild's saved queue, assigned by GuildPlayer.enqueue()
+        self.seq = 0
+        # Seconds into the track to start at, set when resuming a saved session
+        self.start_at = 0.0
+
+    @classmethod
+    def from_metadata(cls, track: dict, requester_id: Optional[int] = None) -> "QueuedTrack":
+        """Create a queue entry from cached track metadata."""
+        return cls(
+            track["id"],
+            track["title"],
+            track.get("webpage_url"),
+            track.get("duration"),
+            requester_id,
+        )
+
+
+class TrackedSource(discord.AudioSource):
+    """
+    Wrapper that counts the packets played from an audio source.
+
+    Each packet is one Opus frame, so the count gives the exact position in
+    the track regardless of pauses or network stalls. The wrapped source can
+    also be replaced while playing, which is how seeking starts a new ffmpeg.
+    With a FrameClock, packet timing and ffmpeg usage are recorded as well.
+    """
+
+    def __init__(
+        self,
+        source: discord.AudioSource,
+        offset: float = 0.0,
+        clock: Optional[FrameClock] = None,
+    ):
+        """
+        Wrap a source.
+
+        Args:
+            source: Source to play
+            offset: Position in the track the source starts at
+            clock: Records packet timing into the music metrics
+        """
+        self.source = source
+        self.offset = offset
+        self.frames = 0
+        self.clock = clock
+        # (source, offset) to switch to, picked up by the voice thread on its next read
+        self._next: Optional[tuple[discord.AudioSource, float]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds into the track."""
+        pending = self._next
+        if pending:
+            return pending[1]
+        return self.offset + self.frames * FRAME_SECONDS
+
+    def replace(self, source: discord.AudioSource, offset: float) -> None:
+        """
+        Continue playback from another source.
+
+        Args:
+            source: Source to switch to
+            offset: Position in the track the new source starts at
+        """
+        with self._lock:
+            previous, self._next = self._next, (source, offset)
+        if previous:
+            previous[0].cleanup()
+
+    def read(self) -> bytes:
+        # Runs in the voice thread, so the old source is also closed there
+        if self._next is not None:
+            with self._lock:
+                pending, self._next = self._next, None
+            if pending:
+                previous, frames = self.source, self.frames
+                self.source, self.offset = pending
+                self.frames = 0
+                self._release(previous, frames)
+        data = self.source.read()
+        if data:
+            self.frames += 1
+            if self.clock:
+                self.clock.tick()
+        return data
+
+    def is_opus(self) -> bool:
+        return self.source.is_opus()
+
+    def cleanup(self) -> None:
+        with self._lock:
+            pending, self._next = self._next, None
+        if pending:
+            pending[0].cleanup()
+        self._release(self.source, self.frames)
+
+    def _release(self, source: discord.AudioSource, frames: int) -> None:
+        """Close a source, first recording what its ffmpeg used while playing."""
+        # FFmpegAudio keeps its Popen here until it is cleaned up
+        process = getattr(source, "_process", None)
+        if self.clock and frames and isinstance(process, subprocess.Popen):
+            usage = process_usage(process.pid)
+            if usage:
+                cpu_seconds, peak_mib = usage
+                metrics = self.clock.metrics
+                metrics.observe("ffmpeg_cpu", cpu_seconds / (frames * FRAME_SECONDS) * 100)
+                if peak_mib:
+                    metrics.observe("ffmpeg_rss", peak_mib)
+        source.cleanup()
+
+
+class GuildPlayer:
+    """Music queue, playback and idle deadlines for one guild."""
+
+    def __init__(self, cog, guild: discord.Guild, max_queue_length: int = MAX_QUEUE_LENGTH):
+        """
+        Create a player for a guild.
+
+        Args:
+            cog: The music cog that owns the player
+            guild: Guild the player plays in
+            max_queue_length: Most tracks the queue may hold
+        """
+        self.cog = cog
+        self.bot = cog.bot
+        self.guild = guild
+        # Playlist tracks are queued unresolved and only extracted shortly before playing
+        self.queue: deque[QueuedTrack] = deque()
+        self.max_queue_length = max_queue_length
+        self.next_seq = 0
+        self.current: Optional[QueuedTrack] = None
+        self.source: Optional[TrackedSource] = None
+        # Where "Now Playing" and disconnect notices go, the last !play channel
+        self.text_channel: Optional[discord.abc.Messageable] = None
+        # Background preparation of the next track's audio source
+        self.prefetch_task: Optional[asyncio.Task] = None
+        self.prefetch_track: Optional[QueuedTrack] = None
+        # Set once the player has disconnected and been released
+        self.closed = False
+
+    @property
+    def voice_client(self) -> Optional[discord.VoiceClient]:
+        """The guild's voice client, if connected."""
+        return self.guild.voice_client
+
+    @property
+    def is_active(self) -> bool:
+        """Check whether something is playing or paused."""
+        voice_client = self.voice_client
+        return bool(voice_client and (voice_client.is_playing() or voice_client.is_paused()))
+
+    @property
+    def position(self) -> float:
+        """Seconds into the current track."""
+        return self.source.elapsed if self.current and self.source else 0.0
+
+    @property
+    def store(self):
+        """The cog's QueueStore, if queues are being saved."""
+        return self.cog.queue_store
+
+    async def send(self, content: str) -> None:
+        """Send a message to the player's text channel."""
+        if not self.text_channel:
+            return
+        try:
+            await self.text_channel.send(content)
+        except Exception as e:
+            logger.error(f"Error sending music message in guild {self.guild.id}: {e}")
+
+    async def play_next(self):
+        """Play the next song in the queue."""
+        voice_client = self.voice_client
+        if not voice_client:
+            logger.warning(f"Voice client not available for play_next in guild {self.guild.id}")
+            return
+
+        # Failed tracks are skipped in a loop, a long run of them would otherwise
+        # recurse once per track and post an error for every one
+        failures = 0
+        while self.queue:
+            if not voice_client.is_connected():
+                return
+            track = self.queue.popleft()
+            title = track.title
+            self.save_track(track)
+            requested_at = time.perf_counter()
+            try:
+                source = TrackedSource(
+                    await self.take_source(track),
+                    track.start_at,
+                    FrameClock(self.cog.metrics, FRAME_SECONDS, requested_at),
+                )
+
+                # The after callback runs in the voice thread, hand it back to the loop
+                voice_client.play(
+                    source,
+                    after=lambda error: asyncio.run_coroutine_threadsafe(
+                        self.after_playing(error), self.bot.loop
+                    ),
+                )
+                self.current, self.source = track, source
+                self.schedule_prefetch()
+                self.cog.track_started(track)
+                await self.send(f"🎵 Now Playing: **{title}**")
+                logger.info(f"Now playing in guild {self.guild.id}: {title}")
+                return
+
+            except discord.ClientException as e:
+                logger.error(f"Discord client error playing audio: {e}")
+                error = str(e)
+            except Exception as e:
+                logger.error(f"Error playing audio: {e}", exc_info=True)
+                error = str(e)
+
+            failures += 1
+            if failures >= MAX_FAILED_TRACKS:
+                self.current = self.source = None
+                logger.warning(
+                    f"Stopped playback in guild {self.guild.id} after {failures} failed tracks"
+                )
+                await self.send(
+                    f"❌ {failures} tracks in a row could not be played, so playback stopped. "
+                    f"The {len(self.queue)} track(s) left in the queue play again with the next !play."
+                )
+                self.start_timer(IDLE)
+                return
+            # Try to play next song if there was an error
+            await self.send(f"❌ Error playing audio: {error}")
+
+        self.current = self.source = None
+        if self.store:
+            # Nothing left to pick up after a restart
+            self.store.forget(self.guild.id)
+        await self.send("📭 Queue is empty!")
+        # Start disconnect timer when queue is empty and nothing is playing
+        self.start_timer(IDLE)
+
+    def enqueue(self, tracks: Iterable[QueuedTrack]) -> int:
+        """
+        Add tracks to the end of the queue, up to the queue length limit.
+
+        Args:
+            tracks: Tracks in the order they should play
+
+        Returns:
+            int: Number of tracks added
+        """
+        first_index = len(self.queue)
+        space = self.max_queue_length - first_index
+        if space <= 0:
+            return 0
+        self.queue.extend(islice(tracks, space))
+        added = len(self.queue) - first_index
+        for track in islice(self.queue, first_index, None):
+            track.seq = self.next_seq
+            self.next_seq += 1
+        if added and self.store:
+            self.store.add_tracks(self.guild.id, islice(self.queue, first_index, None))
+
+        if added and self.current and first_index < PREFETCH_DEPTH:
+            if self.prefetch_task is None:
+                self.schedule_prefetch()
+            else:
+                # The head is already being prepared, just resolve the new URLs early
+                for track in islice(self.queue, first_index, PREFETCH_DEPTH):
+                    asyncio.create_task(self.warm_stream(track))
+        return added
+
+    def save_track(self, track: QueuedTrack) -> None:
+        """Save the session with the track that just started playing."""
+        store = self.store
+        voice_client = self.voice_client
+        if not store or not voice_client or not voice_client.channel:
+            return
+        text_channel_id = getattr(self.text_channel, "id", None)
+        store.save_session(self.guild.id, voice_client.channel.id, text_channel_id)
+        store.start_track(self.guild.id, track)
+
+    async def create_source(
+        self, track: QueuedTrack, offset: Optional[float] = None
+    ) -> discord.AudioSource:
+        """
+        Resolve a track's stream and start ffmpeg for it.
+
+        Args:
+            track: Track to play
+            offset: Seconds into the track to start at, track.start_at by default
+        """
+        if offset is None:
+            offset = track.start_at
+        # A measured track is brought to the common loudness with a static gain
+        loudness = self.cog.loudness
+        gain = loudness.gain(track.video_id) if loudness else 0.0
+        output_options = f"-vn -af volume={gain:.1f}dB" if gain else "-vn"
+
+        audio_cache = self.cog.audio_cache
+        cached = audio_cache.lookup(track.video_id) if audio_cache else None
+        if cached:
+            # Local Ogg Opus file, no extraction or network needed
+            options = ffmpeg_options(offset, executable=FFMPEG_PATH, options=output_options)
+            if gain:
+                return discord.FFmpegOpusAudio(cached, bitrate=self.target_bitrate({}), **options)
+            return discord.FFmpegOpusAudio(cached, codec="copy", **options)
+
+        stream = await self.cog.get_stream(track)
+        options = ffmpeg_options(offset)
+        options["options"] = output_options
+        codec = stream.get("acodec")
+        if gain:
+            # The filter needs decoded audio, so the stream is encoded whatever it holds
+            return discord.FFmpegOpusAudio(
+                stream["url"], bitrate=self.target_bitrate(stream), **options
+            )
+        if not codec or codec == "none":
+            # yt-dlp did not say what the stream holds, let ffprobe find out
+            with self.cog.metrics.timer("probe"):
+                return await discord.FFmpegOpusAudio.from_probe(stream["url"], **options)
+
+        if codec == "opus" and stream.get("asr") in (None, OPUS_SAMPLE_RATE):
+            # Already Opus (YouTube's WebM audio), ffmpeg only has to remux it
+            return discord.FFmpegOpusAudio(stream["url"], codec="copy", **options)
+        return discord.FFmpegOpusAudio(
+            stream["url"], bitrate=self.target_bitrate(stream), **options
+        )
+
+    async def seek(self, position: float) -> bool:
+        """
+        Jump to a position in the current track.
+
+        Args:
+            position: Seconds into the track
+
+        Returns:
+            bool: True if playback moved, False if the track changed meanwhile
+        """
+        track, source = self.current, self.source
+        if not track or not source:
+            return False
+        new_source = await self.create_source(track, position)
+        if self.current is not track or self.source is not source:
+            # Skipped or stopped while ffmpeg was starting
+            new_source.cleanup()
+            return False
+        source.replace(new_source, position)
+        # The next track is now due at a different time
+        self.schedule_prefetch()
+        return True
+
+    def target_bitrate(self, stream: dict) -> int:
+        """Pick an encoding bitrate in kbps no higher than the source or the channel."""
+        bitrate = DEFAULT_BITRATE
+        if stream.get("abr"):
+            bitrate = min(bitrate, int(stream["abr"]))
+        voice_client = self.voice_client
+        channel_bitrate = getattr(voice_client.channel, "bitrate", None) if voice_client else None
+        if channel_bitrate:
+            bitrate = min(bitrate, channel_bitrate // 1000)
+        return max(bitrate, 32)
+
+    async def take_source(self, track: QueuedTrack) -> discord.AudioSource:
+        """Get the audio source for a track, using the prefetched one if it matches."""
+        task, prefetched = self.prefetch_task, self.prefetch_track
+        if task is not None and task.done() and prefetched is track:
+            self.prefetch_task = self.prefetch_track = None
+            if not task.cancelled() and task.exception() is None:
+                return task.result()
+            logger.debug(f"Prefetch failed for {track.title}, retrying")
+        # After a skip the prefetch is usually still waiting, but the URL is warm
+        self.cancel_prefetch()
+        return await self.create_source(track)
+
+    def schedule_prefetch(self) -> None:
+        """Start preparing the upcoming tracks while the current one plays."""
+        self.cancel_prefetch()
+        if not self.queue:
+            return
+        upcoming = list(islice(self.queue, PREFETCH_DEPTH))
+        delay = 0.0
+        if self.current and self.current.duration:
+            delay = max(0.0, self.current.duration - self.position - PREFETCH_LEAD)
+        self.prefetch_track = upcoming[0]
+        self.prefetch_task = asyncio.create_task(self.prefetch(upcoming, delay))
+
+    async def prefetch(self, upcoming: list[QueuedTrack], delay: float) -> discord.AudioSource:
+        """
+        Resolve the upcoming tracks now and start the next one's ffmpeg shortly
+        before the current track ends.
+
+        Args:
+            upcoming: Next tracks in queue order
+            delay: Seconds to wait before starting ffmpeg for the first one
+        """
+        # Extraction is the slow part and can happen right away
+        for track in upcoming:
+            await self.warm_stream(track)
+        # ffmpeg holds a connection open, so it is only started near the switch
+        await asyncio.sleep(delay)
+        return await self.create_source(upcoming[0])
+
+    async def warm_stream(self, track: QueuedTrack) -> None:
+        """Make sure a track has a fresh stream URL in the cache."""
+        try:
+            await self.cog.get_stream(track)
+        except Exception as e:
+            logger.debug(f"Could not prefetch {track.title}: {e}")
+
+    def cancel_prefetch(self) -> None:
+        """Stop any prefetch and release a source that was prepared but not played."""
+        task = self.prefetch_task
+        self.prefetch_task = self.prefetch_track = None
+        if task is None:
+            return
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled() and task.exception() is None:
+            task.result().cleanup()
+
+    async def after_playing(self, error: Optional[Exception]):
+        """Callback after a song finishes playing."""
+        if error:
+            logger.error(f"Player error in guild {self.guild.id}: {error}")
+        if self.closed:
+            return
+        # Cancel disconnect timer since we're about to play next song
+        self.cancel_timer(IDLE)
+        # Play next song after current one finishes
+        await self.play_next()
+
+    async def disconnect(self, message: Optional[str] = None) -> None:
+        """
+        Stop playback, leave the voice channel and release the player.
+
+        Args:
+            message: Notice to send before leaving
+        """
+        # Idle players are not kept around, the next !play creates a fresh one
+        self.closed = True
+        self.cog.remove_player(self.guild.id)
+        if self.store:
+            self.store.forget(self.guild.id)
+        self.queue.clear()
+        self.current = self.source = None
+        self.cancel_prefetch()
+        self.cancel_timers()
+        if message:
+            await self.send(message)
+        voice_client = self.voice_client
+        if voice_client:
+            voice_client.stop()
+            await voice_client.disconnect()
+
+    def start_timer(self, kind: str) -> None:
+        """Schedule an idle check of the given kind IDLE_TIMEOUT seconds from now."""
+        self.cog.idle_scheduler.schedule((self.guild.id, kind), IDLE_TIMEOUT)
+
+    def cancel_timer(self, kind: str) -> None:
+        """Cancel a pending idle check."""
+        self.cog.idle_scheduler.cancel((self.guild.id, kind))
+
+    def cancel_timers(self):
+        """Cancel all active timers"""
+        self.cancel_timer(IDLE)
+        self.cancel_timer(EMPTY_CHANNEL)
+
+    def update_listeners(self) -> None:
+        """Start or cancel the empty channel timer after someone joins or leaves."""
+        voice_client = self.voice_client
+        if not voice_client or not voice_client.channel:
+            return
+        # Count members excluding bots
+        if any(not m.bot for m in voice_client.channel.members):
+            self.cancel_timer(EMPTY_CHANNEL)
+        elif (self.guild.id, EMPTY_CHANNEL) not in self.cog.idle_scheduler:
+            self.start_timer(EMPTY_CHANNEL)
+
+    async def check_idle(self, kind: str) -> None:
+        """
+        Leave the voice channel if the player is still idle when a timer fires.
+
+        Args:
+            kind: IDLE (queue ran out) or EMPTY_CHANNEL (no listeners left)
+        """
+        voice_client = self.voice_client
+        if not voice_client:
+            return
+        if kind == IDLE:
+            if not self.is_active and not self.queue:
+                await self.disconnect("🔌 Disconnecting due to inactivity...")
+                logger.info(f"Disconnected from voice in guild {self.guild.id} due to inactivity")
+        elif voice_client.channel and not any(not m.bot for m in voice_client.channel.members):
+            await self.disconnect("🔌 Disconnecting because no one is in the voice channel...")
+            logger.info(f"Disconnected from voice in guild {self.guild.id} - no members")
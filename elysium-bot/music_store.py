@@ -0,0 +1,197 @@
+"""
+Persistent music queues for Elysium Discord Bot.
+
+Each guild's voice session (channels, current track and position) and its
+queue are mirrored into a small SQLite database, so playback can pick up
+again after a restart or crash. The same database keeps a play count per
+track, which feeds /play autocomplete. Changes are buffered and written in batches
+from a worker thread. Only track IDs and metadata are stored: stream URLs
+expire, so they are resolved again when a restored track is due.
+"""
+import logging
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlite_buffer import BufferedDatabase
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    guild_id INTEGER PRIMARY KEY,
+    voice_channel_id INTEGER NOT NULL,
+    text_channel_id INTEGER,
+    video_id TEXT,
+    title TEXT,
+    webpage_url TEXT,
+    duration REAL,
+    requester_id INTEGER,
+    position REAL NOT NULL DEFAULT 0,
+    updated_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS queue_items (
+    guild_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    video_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    webpage_url TEXT,
+    duration REAL,
+    requester_id INTEGER,
+    PRIMARY KEY (guild_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS played_tracks (
+    video_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    webpage_url TEXT,
+    duration REAL,
+    plays INTEGER NOT NULL DEFAULT 0,
+    last_played INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+_UPSERT_SESSION = """
+INSERT INTO sessions (guild_id, voice_channel_id, text_channel_id, updated_at)
+VALUES (?, ?, ?, ?)
+ON CONFLICT (guild_id) DO UPDATE SET
+    voice_channel_id = excluded.voice_channel_id,
+    text_channel_id = excluded.text_channel_id,
+    updated_at = excluded.updated_at
+"""
+
+class QueueStore(BufferedDatabase):
+    """SQLite mirror of every guild's voice session and queue."""
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the queue database.
+
+        Args:
+            path: Path to the SQLite database file
+        """
+        super().__init__(path, _SCHEMA)
+
+    def save_session(
+        self, guild_id: int, voice_channel_id: int, text_channel_id: Optional[int]
+    ) -> None:
+        """Record which channels a guild's player uses."""
+        self.queue(
+            _UPSERT_SESSION, (guild_id, voice_channel_id, text_channel_id, int(time.time()))
+        )
+
+    def add_tracks(self, guild_id: int, tracks: Iterable[Any]) -> None:
+        """
+        Record tracks added to the end of a guild's queue.
+
+        Args:
+            guild_id: Guild the queue belongs to
+            tracks: QueuedTrack objects with their seq assigned
+        """
+        sql = (
+            "INSERT OR REPLACE INTO queue_items "
+            "(guild_id, seq, video_id, title, webpage_url, duration, requester_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)"
+        )
+        for track in tracks:
+            self.queue(
+                sql,
+                (
+                    guild_id,
+                    track.seq,
+                    track.video_id,
+                    track.title,
+                    track.webpage_url,
+                    track.duration,
+                    track.requester_id,
+                ),
+            )
+
+    def start_track(self, guild_id: int, track: Any) -> None:
+        """Record that a track left the queue and started playing."""
+        self.queue(
+            "DELETE FROM queue_items WHERE guild_id = ? AND seq = ?", (guild_id, track.seq)
+        )
+        self.queue(
+            "UPDATE sessions SET video_id = ?, title = ?, webpage_url = ?, duration = ?, "
+            "requester_id = ?, position = 0, updated_at = ? WHERE guild_id = ?",
+            (
+                track.video_id,
+                track.title,
+                track.webpage_url,
+                track.duration,
+                track.requester_id,
+                int(time.time()),
+                guild_id,
+            ),
+        )
+
+    def record_play(self, track: Any) -> None:
+        """Count a play of a track for autocomplete."""
+        self.queue(
+            "INSERT INTO played_tracks "
+            "(video_id, title, webpage_url, duration, plays, last_played) "
+            "VALUES (?, ?, ?, ?, 1, ?) "
+            "ON CONFLICT (video_id) DO UPDATE SET "
+            "title = excluded.title, plays = plays + 1, last_played = excluded.last_played",
+            (track.video_id, track.title, track.webpage_url, track.duration, int(time.time())),
+        )
+
+    def save_position(self, guild_id: int, position: float) -> None:
+        """Record how far into the current track a guild is."""
+        self.queue(
+            "UPDATE sessions SET position = ?, updated_at = ? WHERE guild_id = ?",
+            (position, int(time.time()), guild_id),
+        )
+
+    def clear_queue(self, guild_id: int) -> None:
+        """Record that a guild's queue was emptied."""
+        self.queue("DELETE FROM queue_items WHERE guild_id = ?", (guild_id,))
+
+    def forget(self, guild_id: int) -> None:
+        """Drop a guild's session and queue, e.g. after !stop."""
+        self.clear_queue(guild_id)
+        self.queue("DELETE FROM sessions WHERE guild_id = ?", (guild_id,))
+
+    def load(self) -> List[Dict[str, Any]]:
+        """
+        Read every saved session with its queue. Meant to run in a thread.
+
+        Returns:
+            list: Session dicts with the session columns plus "queue", a list
+            of track dicts in play order
+        """
+        with self._lock:
+            self._db.row_factory = sqlite3.Row
+            try:
+                sessions = [dict(row) for row in self._db.execute("SELECT * FROM sessions")]
+                for session in sessions:
+                    session["queue"] = [
+                        dict(row)
+                        for row in self._db.execute(
+                            "SELECT * FROM queue_items WHERE guild_id = ? ORDER BY seq",
+                            (session["guild_id"],),
+                        )
+                    ]
+            finally:
+                self._db.row_factory = None
+        return sessions
+
+    def load_played(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Read the most played tracks. Meant to run in a thread.
+
+        Args:
+            limit: Most tracks to read
+
+        Returns:
+            list: Track dicts with "id", "title", "webpage_url", "duration" and "plays"
+        """
+        rows = self._query(
+            "SELECT video_id, title, webpage_url, duration, plays FROM played_tracks "
+            "ORDER BY plays DESC, last_played DESC LIMIT ?",
+            (limit,),
+        )
+        return [
+            {"id": row[0], "title": row[1], "webpage_url": row[2], "duration": row[3], "plays": row[4]}
+            for row in rows
+        ]
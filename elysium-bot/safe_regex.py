@@ -0,0 +1,444 @@
+"""
+Linear-time pattern matching for custom moderation rules.
+
+Python's re module backtracks, so a careless pattern such as ``(a+)+$`` can
+take exponential time on a short message and stall the event loop. This
+module supports a vetted subset of regex syntax - literals, ``.``, character
+classes, ``\\d \\w \\s`` (and their negations), groups, alternation, greedy
+quantifiers and the ``^ $ \\b \\B`` assertions - and compiles it to a Thompson
+NFA. Matching runs the NFA as a lazily built DFA, so every input character is
+handled in bounded time no matter what the pattern looks like. Backreferences,
+lookarounds and inline flags are rejected.
+
+Matching is case-insensitive: callers pass lowercased text, and pattern
+literals and classes are compared case-insensitively. Unlike re, ``$`` only
+matches at the very end of the text, not before a trailing newline.
+"""
+import time
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+# Limits that keep compiled patterns and their DFA caches small
+MAX_PATTERN_LENGTH = 500
+MAX_REPEAT = 100
+MAX_PROGRAM_SIZE = 5000
+MAX_DFA_STATES = 2000
+# How often (in characters) the time budget is checked while matching
+BUDGET_CHECK_INTERVAL = 64
+
+# Kind of the character before the current position, for ^ and \b
+_START, _WORD, _OTHER = 0, 1, 2
+
+
+class PatternError(ValueError):
+    """Raised when a pattern is invalid or uses unsupported syntax."""
+
+
+class BudgetExceeded(Exception):
+    """Raised when matching runs past its deadline."""
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _char_kind(char: str) -> int:
+    return _WORD if _is_word(char) else _OTHER
+
+
+class CharSet:
+    """A set of characters: ranges plus digit/word/space categories."""
+
+    __slots__ = ("ranges", "categories", "negated")
+
+    def __init__(self, ranges=(), categories=(), negated: bool = False):
+        self.ranges: List[Tuple[str, str]] = list(ranges)
+        # Each category is (name, negated)
+        self.categories: List[Tuple[str, bool]] = list(categories)
+        self.negated = negated
+
+    def _contains(self, char: str) -> bool:
+        for low, high in self.ranges:
+            if low <= char <= high:
+                return True
+        for name, negated in self.categories:
+            if name == "d":
+                found = char.isdecimal()
+            elif name == "w":
+                found = _is_word(char)
+            elif name == "s":
+                found = char.isspace()
+            else:  # "." - anything but a newline
+                found = char != "\n"
+            if found != negated:
+                return True
+        return False
+
+    def matches(self, char: str) -> bool:
+        """Check whether a (lowercased) character is in the set."""
+        found = self._contains(char)
+        if not found:
+            upper = char.upper()
+            found = upper != char and self._contains(upper)
+        return found != self.negated
+
+
+_ESCAPE_CHARS = {"n": "\n", "t": "\t", "r": "\r", "f": "\f", "v": "\v"}
+
+
+class _Parser:
+    """Recursive descent parser producing a small AST of tuples."""
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.pos = 0
+
+    def error(self, message: str) -> PatternError:
+        return PatternError(f"{message} at position {self.pos}")
+
+    def peek(self) -> Optional[str]:
+        return self.pattern[self.pos] if self.pos < len(self.pattern) else None
+
+    def take(self) -> str:
+        char = self.pattern[self.pos]
+        self.pos += 1
+        return char
+
+    def parse(self) -> tuple:
+        node = self.parse_alternation()
+        if self.pos < len(self.pattern):
+            raise self.error("Unbalanced parenthesis")
+        return node
+
+    def parse_alternation(self) -> tuple:
+        branches = [self.parse_concat()]
+        while self.peek() == "|":
+            self.take()
+            branches.append(self.parse_concat())
+        return branches[0] if len(branches) == 1 else ("alt", branches)
+
+    def parse_concat(self) -> tuple:
+        items = []
+        while self.peek() not in (None, "|", ")"):
+            items.append(self.parse_repeat())
+        if not items:
+            return ("empty",)
+        return items[0] if len(items) == 1 else ("cat", items)
+
+    def parse_repeat(self) -> tuple:
+        node = self.parse_atom()
+        while True:
+            char = self.peek()
+            if char in ("*", "+", "?"):
+                self.take()
+                low, high = {"*": (0, None), "+": (1, None), "?": (0, 1)}[char]
+            elif char == "{" and self._looks_like_count():
+                low, high = self.parse_count()
+            else:
+                return node
+            if node[0] == "assert":
+                raise self.error("Nothing to repeat")
+            # Lazy and possessive suffixes make no difference to a yes/no match
+            if self.peek() in ("?", "+"):
+                self.take()
+            node = ("repeat", node, low, high)
+
+    def _looks_like_count(self) -> bool:
+        end = self.pattern.find("}", self.pos)
+        if end == -1:
+            return False
+        body = self.pattern[self.pos + 1 : end]
+        parts = body.split(",")
+        return (
+            len(parts) in (1, 2)
+            and parts[0].isdigit()
+            and (len(parts) == 1 or parts[1] == "" or parts[1].isdigit())
+        )
+
+    def parse_count(self) -> Tuple[int, Optional[int]]:
+        end = self.pattern.index("}", self.pos)
+        parts = self.pattern[self.pos + 1 : end].split(",")
+        self.pos = end + 1
+        low = int(parts[0])
+        if len(parts) == 1:
+            high: Optional[int] = low
+        else:
+            high = int(parts[1]) if parts[1] else None
+        if low > MAX_REPEAT or (high is not None and (high > MAX_REPEAT or high < low)):
+            raise self.error(f"Repeat counts must be between 0 and {MAX_REPEAT}")
+        return low, high
+
+    def parse_atom(self) -> tuple:
+        char = self.take()
+        if char == "(":
+            if self.peek() == "?":
+                self.take()
+                if self.peek() == ":":
+                    self.take()
+                elif self.peek() == "P" and self.pattern.startswith("<", self.pos + 1):
+                    end = self.pattern.find(">", self.pos)
+                    if end == -1:
+                        raise self.error("Unterminated group name")
+                    self.pos = end + 1
+                else:
+                    raise self.error("Lookarounds and inline flags are not supported")
+            node = self.parse_alternation()
+            if self.peek() != ")":
+                raise self.error("Missing closing parenthesis")
+            self.take()
+            return node
+        if char == "[":
+            return ("char", self.parse_class())
+        if char == ".":
+            return ("char", CharSet(categories=[(".", False)]))
+        if char == "^":
+            return ("assert", "^")
+        if char == "$":
+            return ("assert", "$")
+        if char in ("*", "+", "?"):
+            raise self.error("Nothing to repeat")
+        if char == "\\":
+            return self.parse_escape(in_class=False)
+        return ("char", CharSet(ranges=[(char.lower(), char.lower())]))
+
+    def parse_escape(self, in_class: bool):
+        if self.peek() is None:
+            raise self.error("Pattern ends with a backslash")
+        char = self.take()
+        if char.lower() in ("d", "w", "s"):
+            category = (char.lower(), char.isupper())
+            return category if in_class else ("char", CharSet(categories=[category]))
+        if char in ("b", "B") and not in_class:
+            return ("assert", char)
+        if char.isdigit():
+            raise self.error("Backreferences are not supported")
+        if char in _ESCAPE_CHARS:
+            char = _ESCAPE_CHARS[char]
+        elif char.isalnum():
+            raise self.error(f"Unsupported escape \\{char}")
+        char = char.lower()
+        return char if in_class else ("char", CharSet(ranges=[(char, char)]))
+
+    def parse_class(self) -> CharSet:
+        charset = CharSet()
+        if self.peek() == "^":
+            self.take()
+            charset.negated = True
+        first = True
+        while True:
+            if self.peek() is None:
+                raise self.error("Unterminated character class")
+            char = self.take()
+            if char == "]" and not first:
+                return charset
+            first = False
+            if char == "\\":
+                item = self.parse_escape(in_class=True)
+                if isinstance(item, tuple):
+                    charset.categories.append(item)
+                    continue
+                char = item
+            else:
+                char = char.lower()
+            # A range like a-z, unless the dash is the last thing in the class
+            if (
+                self.peek() == "-"
+                and self.pos + 1 < len(self.pattern)
+                and self.pattern[self.pos + 1] != "]"
+            ):
+                self.take()
+                high = self.take()
+                if high == "\\":
+                    high = self.parse_escape(in_class=True)
+                    if isinstance(high, tuple):
+                        raise self.error("Invalid range in character class")
+                high = high.lower()
+                if high < char:
+                    raise self.error("Invalid range in character class")
+                charset.ranges.append((char, high))
+            else:
+                charset.ranges.append((char, char))
+
+
+def _emit(node: tuple, program: list) -> None:
+    """Append the NFA instructions for an AST node to the program."""
+    if len(program) > MAX_PROGRAM_SIZE:
+        raise PatternError("Pattern is too large")
+
+    kind = node[0]
+    if kind in ("char", "assert"):
+        program.append(node)
+    elif kind == "cat":
+        for child in node[1]:
+            _emit(child, program)
+    elif kind == "alt":
+        jumps = []
+        for branch in node[1][:-1]:
+            split_at = len(program)
+            program.append(None)
+            _emit(branch, program)
+            jumps.append(len(program))
+            program.append(None)
+            program[split_at] = ("split", split_at + 1, len(program))
+        _emit(node[1][-1], program)
+        for jump in jumps:
+            program[jump] = ("jmp", len(program))
+    elif kind == "repeat":
+        child, low, high = node[1], node[2], node[3]
+        for _ in range(low):
+            _emit(child, program)
+        if high is None:
+            loop = len(program)
+            program.append(None)
+            _emit(child, program)
+            program.append(("jmp", loop))
+            program[loop] = ("split", loop + 1, len(program))
+        else:
+            splits = []
+            for _ in range(high - low):
+                splits.append(len(program))
+                program.append(None)
+                _emit(child, program)
+            for split_at in splits:
+                program[split_at] = ("split", split_at + 1, len(program))
+    # "empty" emits nothing
+
+
+class SafePattern:
+    """A compiled pattern that matches in linear time."""
+
+    def __init__(self, pattern: str):
+        """
+        Compile a pattern.
+
+        Args:
+            pattern: Pattern in the supported regex subset
+
+        Raises:
+            PatternError: If the pattern is invalid or unsupported
+        """
+        if not pattern:
+            raise PatternError("Pattern is empty")
+        if len(pattern) > MAX_PATTERN_LENGTH:
+            raise PatternError(f"Pattern is longer than {MAX_PATTERN_LENGTH} characters")
+
+        self.pattern = pattern
+        try:
+            program: list = []
+            _emit(_Parser(pattern).parse(), program)
+        except (IndexError, RecursionError):
+            raise PatternError("Invalid pattern")
+        program.append(("match",))
+        if len(program) > MAX_PROGRAM_SIZE:
+            raise PatternError("Pattern is too large")
+        self.program = program
+        self._reset_cache()
+
+    def _reset_cache(self) -> None:
+        # DFA states are (NFA positions, kind of previous char), interned to ints
+        self._state_ids: Dict[Tuple[FrozenSet[int], int], int] = {}
+        self._states: List[Tuple[FrozenSet[int], int]] = []
+        # Per state: next char -> next state, or -1 when the pattern has matched
+        self._transitions: List[Dict[str, int]] = []
+        self._end_matches: Dict[int, bool] = {}
+
+    def _state(self, positions: FrozenSet[int], prev_kind: int) -> int:
+        key = (positions, prev_kind)
+        state_id = self._state_ids.get(key)
+        if state_id is None:
+            state_id = len(self._states)
+            self._state_ids[key] = state_id
+            self._states.append(key)
+            self._transitions.append({})
+        return state_id
+
+    def _closure(
+        self, positions: FrozenSet[int], prev_kind: int, next_char: Optional[str]
+    ) -> Tuple[List[int], bool]:
+        """Follow epsilon edges; the start is re-added for unanchored search."""
+        program = self.program
+        stack = [0, *positions]
+        seen = set()
+        consumers = []
+        while stack:
+            pc = stack.pop()
+            if pc in seen:
+                continue
+            seen.add(pc)
+            op = program[pc]
+            kind = op[0]
+            if kind == "char":
+                consumers.append(pc)
+            elif kind == "match":
+                return consumers, True
+            elif kind == "jmp":
+                stack.append(op[1])
+            elif kind == "split":
+                stack.append(op[2])
+                stack.append(op[1])
+            elif self._assertion_holds(op[1], prev_kind, next_char):
+                stack.append(pc + 1)
+        return consumers, False
+
+    @staticmethod
+    def _assertion_holds(kind: str, prev_kind: int, next_char: Optional[str]) -> bool:
+        if kind == "^":
+            return prev_kind == _START
+        if kind == "$":
+            return next_char is None
+        at_boundary = (prev_kind == _WORD) != (
+            next_char is not None and _is_word(next_char)
+        )
+        return at_boundary if kind == "b" else not at_boundary
+
+    def _step(self, state_id: int, char: str) -> int:
+        positions, prev_kind = self._states[state_id]
+        consumers, matched = self._closure(positions, prev_kind, char)
+        if matched:
+            result = -1
+        else:
+            next_positions = frozenset(
+                pc + 1 for pc in consumers if self.program[pc][1].matches(char)
+            )
+            if len(self._states) >= MAX_DFA_STATES:
+                # Too many states: start over rather than grow without bound
+                self._reset_cache()
+                return self._state(next_positions, _char_kind(char))
+            result = self._state(next_positions, _char_kind(char))
+        self._transitions[state_id][char] = result
+        return result
+
+    def search(self, text: str, deadline: Optional[float] = None) -> bool:
+        """
+        Check whether the pattern matches anywhere in the text.
+
+        Args:
+            text: Lowercased text to search
+            deadline: time.perf_counter() value after which to give up
+
+        Returns:
+            bool: True if the pattern matches
+
+        Raises:
+            BudgetExceeded: If the deadline passes before matching finishes
+        """
+        state = self._state(frozenset(), _START)
+        transitions = self._transitions
+        for start in range(0, len(text), BUDGET_CHECK_INTERVAL):
+            for char in text[start : start + BUDGET_CHECK_INTERVAL]:
+                next_state = transitions[state].get(char)
+                if next_state is None:
+                    next_state = self._step(state, char)
+                    # The cache may have been reset, which replaces the table
+                    transitions = self._transitions
+                if next_state < 0:
+                    return True
+                state = next_state
+            if deadline is not None and time.perf_counter() > deadline:
+                raise BudgetExceeded(self.pattern)
+
+        matched = self._end_matches.get(state)
+        if matched is None:
+            positions, prev_kind = self._states[state]
+            matched = self._closure(positions, prev_kind, None)[1]
+            self._end_matches[state] = matched
+        return matched
@@ -0,0 +1,148 @@
+"""
+Shard helpers for Elysium Discord Bot.
+
+A cluster runs the bot as several processes, each connected with its own
+range of shards (see cluster.py). Guild events only reach the process whose
+shards include the guild, so per-guild state is naturally split between
+processes. These helpers let shared stores tell which guilds this process
+owns, and pick a single primary process for bot-wide work such as Twitch
+polling or command syncing, so it is not done once per process.
+"""
+import logging
+import os
+from typing import Iterable, List, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Set by cluster.py for each worker process
+SHARD_IDS_ENV = "ELYSIUM_SHARD_IDS"
+SHARD_COUNT_ENV = "ELYSIUM_SHARD_COUNT"
+CLUSTER_ID_ENV = "ELYSIUM_CLUSTER_ID"
+
+
+def parse_shard_ids(text: str) -> List[int]:
+    """
+    Parse a shard list such as "0-3,8,10-11".
+
+    Args:
+        text: Comma separated shard IDs and inclusive ranges
+
+    Returns:
+        list: Sorted shard IDs
+
+    Raises:
+        ValueError: If the list is malformed
+    """
+    shard_ids = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        first, last = int(start), int(end or start)
+        if first < 0 or last < first:
+            raise ValueError(f"Invalid shard range: {part}")
+        shard_ids.update(range(first, last + 1))
+    if not shard_ids:
+        raise ValueError("No shard IDs given")
+    return sorted(shard_ids)
+
+
+def format_shard_ids(shard_ids: Iterable[int]) -> str:
+    """Format shard IDs as ranges, the inverse of parse_shard_ids()."""
+    ranges = []
+    for shard_id in sorted(shard_ids):
+        if ranges and ranges[-1][1] == shard_id - 1:
+            ranges[-1][1] = shard_id
+        else:
+            ranges.append([shard_id, shard_id])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+
+def split_shards(shard_count: int, processes: int) -> List[List[int]]:
+    """
+    Spread shards over processes in contiguous, evenly sized ranges.
+
+    Args:
+        shard_count: Total number of shards
+        processes: Number of worker processes
+
+    Returns:
+        list: Shard IDs for each process, empty processes left out
+    """
+    processes = max(1, min(processes, shard_count))
+    size, extra = divmod(shard_count, processes)
+    ranges, start = [], 0
+    for index in range(processes):
+        end = start + size + (1 if index < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+def shard_settings() -> Tuple[Optional[List[int]], Optional[int]]:
+    """
+    Read this process's shards from the environment set by cluster.py.
+
+    Returns:
+        tuple: (shard IDs, shard count), or (None, None) when not in a cluster
+
+    Raises:
+        ValueError: If the variables are set but invalid
+    """
+    shard_count = os.getenv(SHARD_COUNT_ENV)
+    if not shard_count:
+        return None, None
+    count = int(shard_count)
+    shard_ids_text = os.getenv(SHARD_IDS_ENV)
+    shard_ids = parse_shard_ids(shard_ids_text) if shard_ids_text else list(range(count))
+    if shard_ids[-1] >= count:
+        raise ValueError(f"Shard {shard_ids[-1]} is out of range for {count} shard(s)")
+    return shard_ids, count
+
+
+def cluster_name() -> str:
+    """Name of this process in logs and reports, e.g. "cluster 2"."""
+    cluster_id = os.getenv(CLUSTER_ID_ENV)
+    return f"cluster {cluster_id}" if cluster_id else "main"
+
+
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    """Get the shard Discord sends a guild's events to."""
+    return (guild_id >> 22) % shard_count
+
+
+def _local_shards(bot: discord.Client) -> Tuple[Optional[List[int]], int]:
+    shard_count = bot.shard_count or 1
+    shard_ids = getattr(bot, "shard_ids", None)
+    if shard_ids is None and bot.shard_id is not None:
+        shard_ids = [bot.shard_id]
+    return shard_ids, shard_count
+
+
+def owns_guild(bot: discord.Client, guild_id: int) -> bool:
+    """
+    Check whether a guild is served by this process's shards.
+
+    Args:
+        bot: The bot
+        guild_id: Guild to check
+
+    Returns:
+        bool: True if this process receives the guild's events
+    """
+    shard_ids, shard_count = _local_shards(bot)
+    if shard_ids is None or shard_count == 1:
+        return True
+    return shard_for_guild(guild_id, shard_count) in shard_ids
+
+
+def is_primary(bot: discord.Client) -> bool:
+    """
+    Check whether this process does the bot-wide work, which the process
+    holding shard 0 does.
+    """
+    shard_ids, _ = _local_shards(bot)
+    return shard_ids is None or 0 in shard_ids
@@ -0,0 +1,75 @@
+"""
+Buffered SQLite writes for Elysium Discord Bot.
+
+Base of the local stores (moderation audit log, music queues). Writes are
+queued in memory and applied in one transaction from a worker thread by
+flush(), so recording something never blocks the event loop. Reads also run
+in worker threads and share the same connection under a lock.
+"""
+import asyncio
+import itertools
+import sqlite3
+import threading
+from typing import List, Tuple
+
+Operation = Tuple[str, tuple]
+
+
+class BufferedDatabase:
+    """SQLite database whose writes are queued and applied in batches."""
+
+    def __init__(self, path: str, schema: str):
+        """
+        Open (or create) the database.
+
+        Args:
+            path: Path to the SQLite database file
+            schema: SQL script creating the tables, run on every open
+        """
+        self.path = path
+        # Pending writes, applied in order by the next flush()
+        self.pending: List[Operation] = []
+        # Queries and batch writes run in worker threads and share one connection
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(schema)
+        self._db.commit()
+
+    def queue(self, sql: str, params: tuple) -> None:
+        """Queue a write for the next flush()."""
+        self.pending.append((sql, params))
+
+    async def flush(self) -> int:
+        """
+        Apply the pending writes in one transaction off the event loop.
+
+        Returns:
+            int: Number of writes applied
+        """
+        if not self.pending:
+            return 0
+        operations, self.pending = self.pending, []
+        try:
+            await asyncio.to_thread(self._write, operations)
+        except Exception:
+            # Keep the writes for the next attempt rather than losing them
+            self.pending[:0] = operations
+            raise
+        return len(operations)
+
+    def _write(self, operations: List[Operation]) -> None:
+        with self._lock, self._db:
+            # Runs of the same statement, e.g. a burst of inserts, go in one call
+            for sql, group in itertools.groupby(operations, key=lambda op: op[0]):
+                self._db.executemany(sql, [params for _, params in group])
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        """Close the database. Pending writes are lost, flush() first."""
+        with self._lock:
+            self._db.close()
@@ -1,8 +1,14 @@
 """
 Utility functions for Elysium Discord Bot.
 """
+import asyncio
+import heapq
+import itertools
 import logging
-from typing import Optional
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
 import discord
 
 logger = logging.getLogger(__name__)
@@ -27,6 +33,21 @@ def validate_channel_id(channel_id: str) -> Optional[int]:
         return None
 
 
+def process_rss_mib() -> Optional[float]:
+    """
+    Get this process's resident memory.
+
+    Returns:
+        Optional[float]: RSS in MiB, or None where /proc is unavailable
+    """
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
 def get_channel_safely(bot: discord.Client, channel_id: int) -> Optional[discord.TextChannel]:
     """
     Safely get a channel by ID, returning None if not found.
@@ -46,3 +67,213 @@ def get_channel_safely(bot: discord.Client, channel_id: int) -> Optional[discord
     except Exception as e:
         logger.error(f"Error getting channel {channel_id}: {e}")
         return None
+
+
+class LRUCache:
+    """
+    Size-bounded mapping that evicts the least recently used entry.
+
+    Args:
+        maxsize: Maximum number of entries kept in the cache
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = max(1, maxsize)
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a cached value and mark it as recently used.
+
+        Args:
+            key: Cache key
+            default: Value returned when the key is not cached
+
+        Returns:
+            Any: Cached value, or default if missing
+        """
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return default
+        return self._data[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value, evicting the least recently used entry if full.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a key from the cache and return its value."""
+        return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TTLCache(LRUCache):
+    """
+    LRU cache whose entries also expire after a time to live.
+
+    Args:
+        maxsize: Maximum number of entries kept in the cache
+        ttl: Default time to live in seconds
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        super().__init__(maxsize)
+        self.ttl = ttl
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a cached value that has not expired yet.
+
+        Args:
+            key: Cache key
+            default: Value returned when the key is missing or expired
+
+        Returns:
+            Any: Cached value, or default if missing or expired
+        """
+        entry = super().get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            self._data.pop(key, None)
+            return default
+        return value
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value with a time to live.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl: Seconds until the entry expires, the cache default if None
+        """
+        lifetime = self.ttl if ttl is None else ttl
+        if lifetime <= 0:
+            self._data.pop(key, None)
+            return
+        super().put(key, (time.monotonic() + lifetime, value))
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a key from the cache and return its value."""
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and time.monotonic() < entry[0]
+
+
+class DeadlineScheduler:
+    """
+    Calls back keys whose deadline has passed, for any number of keys, from a
+    single background task.
+
+    The task sleeps until the earliest deadline and waits on an event while
+    nothing is scheduled, so idle keys cost no wakeups at all.
+
+    Args:
+        callback: Coroutine function called with each key that comes due
+    """
+
+    def __init__(self, callback: Callable[[Hashable], Awaitable[None]]):
+        self.callback = callback
+        # Key -> its current deadline; heap entries that disagree are stale
+        self._deadlines: Dict[Hashable, float] = {}
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._order = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+    def schedule(self, key: Hashable, delay: float) -> None:
+        """
+        Set (or move) a key's deadline.
+
+        Args:
+            key: Key passed to the callback when the deadline passes
+            delay: Seconds from now
+        """
+        deadline = time.monotonic() + delay
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._order), key))
+        if self._heap[0][0] == deadline:
+            self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def cancel(self, key: Hashable) -> None:
+        """Forget a key's deadline, if it has one."""
+        if self._deadlines.pop(key, None) is None:
+            return
+        # Cancelled entries stay in the heap until popped, rebuild if they pile up
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [
+                entry for entry in self._heap if self._deadlines.get(entry[2]) == entry[0]
+            ]
+            heapq.heapify(self._heap)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._deadlines
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    async def _run(self) -> None:
+        while True:
+            heap = self._heap
+            while heap and self._deadlines.get(heap[0][2]) != heap[0][0]:
+                heapq.heappop(heap)
+
+            self._wakeup.clear()
+            if not heap:
+                await self._wakeup.wait()
+                continue
+            delay = heap[0][0] - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, key = heapq.heappop(heap)
+            del self._deadlines[key]
+            # Callbacks run on their own so a slow one cannot hold up the rest
+            task = asyncio.create_task(self._call(key))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _call(self, key: Hashable) -> None:
+        try:
+            await self.callback(key)
+        except Exception as e:
+            logger.error(f"Error in scheduled callback for {key}: {e}", exc_info=True)
+
+    def stop(self) -> None:
+        """Cancel the background task and every pending deadline."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._deadlines.clear()
+        self._heap.clear()
@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+import discord
+from discord.ext import commands
+
+BOT_DIR = os.path.join(os.path.dirname(__file__), "..", "elysium-bot")
+sys.path.insert(0, BOT_DIR)
+
+import config  # noqa: E402
+
+
+def cog_names() -> list:
+    return sorted(
+        filename[:-3]
+        for filename in os.listdir(os.path.join(BOT_DIR, "cogs"))
+        if filename.endswith(".py") and not filename.startswith("__")
+    )
+
+
+class LoadCogsTest(unittest.IsolatedAsyncioTestCase):
+    """Smoke test: every cog loads as an extension from the config template."""
+
+    async def asyncSetUp(self):
+        self.data_dir = tempfile.TemporaryDirectory()
+        with open(os.path.join(BOT_DIR, "config_template.json"), encoding="utf-8") as f:
+            template = json.load(f)
+        # Keep the Twitch token check from calling out to Twitch
+        template["twitch"]["expire_date"] = int(time.time()) + 3600
+        path = os.path.join(self.data_dir.name, "config.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(template, f)
+        self.saved_path = config._config_path
+        config._config_path = path
+        config.load_config(force_reload=True)
+        self.bot = commands.Bot(command_prefix="!", intents=discord.Intents.none())
+
+    async def asyncTearDown(self):
+        for extension in list(self.bot.extensions):
+            await self.bot.unload_extension(extension)
+        await self.bot.close()
+        config._config_path = self.saved_path
+        config._config_cache = None
+        self.data_dir.cleanup()
+
+    async def test_every_cog_loads(self):
+        for name in cog_names():
+            with self.subTest(cog=name):
+                await self.bot.load_extension(f"cogs.{name}")
+                self.assertIn(f"cogs.{name}", self.bot.extensions)
+        self.assertIn("watchlist", [c.name for c in self.bot.tree.get_commands()])
+
+
+if __name__ == "__main__":
+    unittest.main()
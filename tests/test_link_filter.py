@@ -0,0 +1,67 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "elysium-bot"))
+
+from link_filter import DomainTrie, check_links, extract_links  # noqa: E402
+
+
+def denylist(*domains: str) -> DomainTrie:
+    trie = DomainTrie()
+    for domain in domains:
+        trie.add(domain)
+    return trie
+
+
+class LinkFilterTest(unittest.TestCase):
+    def assertDenied(self, content: str):
+        self.assertEqual(
+            check_links(content, None, denylist("evil.com"), False),
+            ("link:evil.com", "blocked link (evil.com)"),
+            content,
+        )
+
+    def test_plain_link(self):
+        self.assertDenied("see https://evil.com/login")
+
+    def test_masked_link(self):
+        self.assertDenied("[free nitro](https://evil.com)")
+        self.assertDenied("[free nitro](<https://evil.com/claim>)")
+
+    def test_bold_italic_and_underlined_link(self):
+        self.assertDenied("**https://evil.com**")
+        self.assertDenied("*https://evil.com*")
+        self.assertDenied("__https://evil.com__")
+
+    def test_spoiler_link(self):
+        self.assertDenied("||https://evil.com||")
+
+    def test_punctuation_after_link(self):
+        self.assertDenied("see https://evil.com, now")
+        self.assertDenied("go to https://www.evil.com!")
+        self.assertDenied("it is https://evil.com.")
+        self.assertDenied("(https://sub.evil.com)")
+
+    def test_port_and_userinfo(self):
+        self.assertDenied("https://user@evil.com:8443/path")
+
+    def test_other_hosts_pass(self):
+        content = "[x](https://notevil.com) **https://good.org**"
+        self.assertIsNone(check_links(content, None, denylist("evil.com"), False))
+
+    def test_extracted_hosts(self):
+        self.assertEqual(
+            [host for host, _ in extract_links("[a](https://Evil.com) ~~https://b.org~~, https://c.net.")],
+            ["evil.com", "b.org", "c.net"],
+        )
+
+    def test_invites(self):
+        self.assertEqual(
+            check_links("[join](https://discord.gg/abc)", None, None, True),
+            ("invite", "server invite"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import datetime
+import os
+import sys
+import unittest
+from unittest import mock
+
+import discord
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "elysium-bot"))
+
+from cogs.moderationcog import ALERT_SUMMARY_LINES, Moderation  # noqa: E402
+
+
+def make_message(channel: mock.MagicMock, index: int) -> mock.MagicMock:
+    msg = mock.MagicMock(spec=discord.Message)
+    msg.id = index
+    msg.channel = channel
+    msg.author = f"user{index}"
+    msg.created_at = datetime.datetime.now(datetime.timezone.utc)
+    return msg
+
+
+class AlertBatchTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.cog = Moderation(mock.MagicMock())
+        self.rules = mock.MagicMock(action="delete", mod_role=42)
+        self.cog.get_rules = mock.MagicMock(return_value=self.rules)
+        self.channel = mock.MagicMock(spec=discord.TextChannel)
+        self.channel.id = 1
+        self.channel.mention = "#general"
+        self.channel.delete_messages = mock.AsyncMock()
+        self.mod_channel = mock.MagicMock(spec=discord.TextChannel)
+        self.mod_channel.send = mock.AsyncMock()
+
+    async def asyncTearDown(self):
+        for task in self.cog.flush_tasks.values():
+            task.cancel()
+
+    async def flag(self, count: int) -> None:
+        for index in range(count):
+            msg = make_message(self.channel, index)
+            await self.cog.flag_message(msg, self.mod_channel, ("word:spam", "spam"), self.rules)
+        self.mod_channel.send.assert_not_awaited()
+        await self.cog.flush_deletes(self.channel)
+
+    async def test_raid_sends_one_summary(self):
+        await self.flag(50)
+        self.channel.delete_messages.assert_awaited_once()
+        self.mod_channel.send.assert_awaited_once()
+        description = self.mod_channel.send.await_args.kwargs["embed"].description
+        self.assertIn("Flagged 50 messages", description)
+        self.assertEqual(description.count("||spam||"), ALERT_SUMMARY_LINES)
+        self.assertIn(f"and {50 - ALERT_SUMMARY_LINES} more", description)
+        self.assertIn("<@&42>", description)
+
+    async def test_single_message_alert(self):
+        await self.flag(1)
+        description = self.mod_channel.send.await_args.kwargs["embed"].description
+        self.assertIn("Reason: user0 said -> ||spam|| (delete)", description)
+
+    async def test_alert_only_action_still_flushes(self):
+        self.rules.action = "alert"
+        await self.flag(3)
+        self.channel.delete_messages.assert_not_awaited()
+        self.mod_channel.send.assert_awaited_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
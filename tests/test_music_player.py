@@ -0,0 +1,74 @@
+import importlib
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "elysium-bot"))
+
+from music_extractor import is_available  # noqa: E402
+from music_metrics import MusicMetrics  # noqa: E402
+from music_player import MAX_FAILED_TRACKS, GuildPlayer, QueuedTrack  # noqa: E402
+
+
+def make_player(tracks: int) -> GuildPlayer:
+    cog = mock.MagicMock(queue_store=None, metrics=MusicMetrics())
+    guild = mock.MagicMock(id=1)
+    guild.voice_client.is_connected.return_value = True
+    player = GuildPlayer(cog, guild)
+    player.text_channel = mock.MagicMock()
+    player.text_channel.send = mock.AsyncMock()
+    player.enqueue(QueuedTrack(f"id{i}", f"Track {i}", None, 60, 2) for i in range(tracks))
+    player.take_source = mock.AsyncMock(side_effect=RuntimeError("Video unavailable"))
+    return player
+
+
+class PlayNextTest(unittest.IsolatedAsyncioTestCase):
+    async def test_failing_queue_stops_without_recursion(self):
+        player = make_player(1000)
+        with mock.patch.object(GuildPlayer, "start_timer"):
+            await player.play_next()
+        self.assertEqual(player.take_source.await_count, MAX_FAILED_TRACKS)
+        self.assertEqual(len(player.queue), 1000 - MAX_FAILED_TRACKS)
+        # One error per failed track before the last, then one stop notice
+        self.assertEqual(player.text_channel.send.await_count, MAX_FAILED_TRACKS)
+        self.assertIn("stopped", player.text_channel.send.await_args.args[0])
+
+    async def test_failure_then_success_plays_next_track(self):
+        player = make_player(3)
+        source = mock.MagicMock()
+        player.take_source.side_effect = [RuntimeError("Video unavailable"), source]
+        with mock.patch.object(GuildPlayer, "schedule_prefetch"):
+            await player.play_next()
+        self.assertEqual(player.current.video_id, "id1")
+        player.voice_client.play.assert_called_once()
+
+
+class PlayCommandTest(unittest.IsolatedAsyncioTestCase):
+    async def test_slash_play_defers_before_connecting(self):
+        music = importlib.import_module("cogs.yt-musiccog")
+        cog = music.MusicBot(mock.MagicMock())
+        order = []
+
+        async def connect():
+            order.append("connect")
+            raise RuntimeError("stop here")
+
+        ctx = mock.MagicMock(voice_client=None)
+        ctx.defer = mock.AsyncMock(side_effect=lambda: order.append("defer"))
+        ctx.send = mock.AsyncMock()
+        ctx.author.voice.channel.connect = connect
+        await music.MusicBot.play.callback(cog, ctx, search="song")
+        self.assertEqual(order, ["defer", "connect"])
+
+
+class PlaylistEntryTest(unittest.TestCase):
+    def test_unavailable_entries(self):
+        self.assertTrue(is_available({"id": "a", "title": "Song"}))
+        self.assertFalse(is_available({"id": "a", "title": "[Private video]"}))
+        self.assertFalse(is_available({"id": "a", "title": "[Deleted video]"}))
+        self.assertFalse(is_available({"id": "a", "title": "x", "availability": "needs_auth"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
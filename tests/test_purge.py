@@ -0,0 +1,50 @@
+import datetime
+import os
+import sys
+import unittest
+from unittest import mock
+
+import discord
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "elysium-bot"))
+
+from cogs.moderationcog import BULK_DELETE_MAX_AGE, Moderation  # noqa: E402
+
+
+def make_interaction() -> mock.MagicMock:
+    interaction = mock.MagicMock()
+    interaction.channel = mock.MagicMock(spec=discord.TextChannel)
+    interaction.channel.permissions_for.return_value.manage_messages = True
+    interaction.channel.purge = mock.AsyncMock(return_value=[])
+    interaction.user = mock.MagicMock(spec=discord.Member)
+    interaction.user.id = 1
+    interaction.response.defer = mock.AsyncMock()
+    interaction.followup.send = mock.AsyncMock()
+    return interaction
+
+
+class PurgeTest(unittest.IsolatedAsyncioTestCase):
+    async def run_purge(self, **options) -> dict:
+        interaction = make_interaction()
+        cog = Moderation(mock.MagicMock())
+        await Moderation.purge.callback(cog, interaction, **options)
+        interaction.channel.purge.assert_awaited_once()
+        return interaction.channel.purge.await_args.kwargs
+
+    async def test_purge_deletes_most_recent_messages(self):
+        kwargs = await self.run_purge(limit=5)
+        self.assertEqual(kwargs["limit"], 5)
+        self.assertIs(kwargs["oldest_first"], False)
+        self.assertTrue(kwargs["bulk"])
+        age = datetime.datetime.now(datetime.timezone.utc) - kwargs["after"]
+        self.assertLessEqual(age, BULK_DELETE_MAX_AGE + datetime.timedelta(seconds=5))
+
+    async def test_purge_minutes_limits_window(self):
+        kwargs = await self.run_purge(limit=10, minutes=30)
+        self.assertIs(kwargs["oldest_first"], False)
+        age = datetime.datetime.now(datetime.timezone.utc) - kwargs["after"]
+        self.assertLess(age, datetime.timedelta(minutes=31))
+
+
+if __name__ == "__main__":
+    unittest.main()
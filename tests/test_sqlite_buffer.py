@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "elysium-bot"))
+
+from audit_log import AuditLog  # noqa: E402
+from music_store import QueueStore  # noqa: E402
+
+
+def make_track(seq: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        seq=seq, video_id=f"id{seq}", title=f"Track {seq}", webpage_url=None,
+        duration=60.0, requester_id=1,
+    )
+
+
+class BufferedStoreTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.data_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.data_dir.name, "test.db")
+
+    def tearDown(self):
+        self.data_dir.cleanup()
+
+    async def test_queue_writes_keep_their_order(self):
+        store = QueueStore(self.path)
+        store.save_session(1, 10, 20)
+        store.add_tracks(1, [make_track(seq) for seq in range(3)])
+        store.start_track(1, make_track(0))
+        store.add_tracks(1, [make_track(3)])
+        self.assertEqual(await store.flush(), 7)
+        sessions = store.load()
+        store.close()
+        self.assertEqual(sessions[0]["video_id"], "id0")
+        self.assertEqual([t["seq"] for t in sessions[0]["queue"]], [1, 2, 3])
+
+    async def test_failed_flush_keeps_writes(self):
+        log = AuditLog(self.path)
+        log.record(1, 2, 3, 4, "word:spam", "delete", "spam")
+        with mock.patch.object(AuditLog, "_write", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                await log.flush()
+        log.record(1, 2, 3, 5, "word:spam", "delete", "spam")
+        self.assertEqual(await log.flush(), 2)
+        self.assertEqual(await log.count(1, 0, user_id=3), 2)
+        log.close()
+
+
+if __name__ == "__main__":
+    unittest.main()